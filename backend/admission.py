@@ -0,0 +1,138 @@
+"""
+Admission control and load shedding for /api/calculate.
+
+Each session gets a token bucket (kept in the session store); the whole
+process gets an in-flight limit.
+As load (in-flight requests or smoothed latency) climbs, requests are served
+in progressively cheaper stages instead of timing out:
+
+    0 normal         full chaos, stats counted
+    1 db_free_chaos  chaos limited to modes that don't touch the database
+    2 no_stats       ...and the leaderboard isn't updated
+    3 canned         a pre-baked "Math.exe has stopped working" response
+"""
+import threading
+import time
+
+STAGE_NORMAL = 0
+STAGE_DB_FREE_CHAOS = 1
+STAGE_NO_STATS = 2
+STAGE_CANNED = 3
+STAGE_NAMES = ('normal', 'db_free_chaos', 'no_stats', 'canned')
+
+
+class Ticket:
+    """One admitted request. Use as a context manager so it always gets released."""
+    __slots__ = ('controller', 'stage', 'started')
+
+    def __init__(self, controller, stage):
+        self.controller = controller
+        self.stage = stage
+        self.started = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.controller.release(self)
+
+
+class AdmissionController:
+    """
+    Decides, per request, whether to serve it and how much work to spend on it.
+    """
+
+    def __init__(self, sessions, max_in_flight=32, session_rate=5.0, session_burst=20,
+                 latency_budget_ms=500.0, stage_thresholds=(0.5, 0.75, 1.0),
+                 latency_half_life=2.0):
+        self.sessions = sessions
+        self.max_in_flight = max_in_flight
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.stage_thresholds = stage_thresholds
+        self.latency_half_life = latency_half_life
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latency_ewma = 0.0
+        self._latency_updated = time.monotonic()
+        self._stage = STAGE_NORMAL
+
+        # Metrics
+        self.admitted = 0
+        self.rate_limited = 0
+        self.served_by_stage = [0] * len(STAGE_NAMES)
+        self.stage_transitions = {}
+
+    def _decay_latency(self, now):
+        # Without this, a spike followed by nothing but canned responses would
+        # leave the estimate (and the stage) stuck high forever
+        idle = now - self._latency_updated
+        if idle > 0 and self.latency_half_life:
+            self._latency_ewma *= 0.5 ** (idle / self.latency_half_life)
+        self._latency_updated = now
+
+    def _compute_stage(self):
+        self._decay_latency(time.monotonic())
+        load = max(
+            self._in_flight / self.max_in_flight if self.max_in_flight else 0.0,
+            self._latency_ewma / self.latency_budget if self.latency_budget else 0.0,
+        )
+        stage = STAGE_NORMAL
+        for threshold in self.stage_thresholds:
+            if load >= threshold:
+                stage += 1
+        return stage
+
+    def _set_stage(self, stage):
+        if stage != self._stage:
+            key = f'{STAGE_NAMES[self._stage]}->{STAGE_NAMES[stage]}'
+            self.stage_transitions[key] = self.stage_transitions.get(key, 0) + 1
+            self._stage = stage
+
+    def admit(self, session_key):
+        """
+        Returns (ticket, retry_after). ticket is None if the session is over its
+        rate limit, in which case retry_after says how long to back off.
+        """
+        allowed, retry_after = self.sessions.take_token(
+            session_key, self.session_rate, self.session_burst)
+        with self._lock:
+            if not allowed:
+                self.rate_limited += 1
+                return None, retry_after
+            self._set_stage(self._compute_stage())
+            stage = self._stage
+            self.admitted += 1
+            self.served_by_stage[stage] += 1
+            # Canned responses are nearly free, so they don't count as in flight
+            if stage < STAGE_CANNED:
+                self._in_flight += 1
+            return Ticket(self, stage), 0.0
+
+    def release(self, ticket):
+        elapsed = time.monotonic() - ticket.started
+        with self._lock:
+            if ticket.stage < STAGE_CANNED:
+                self._in_flight -= 1
+                # Only real work feeds the latency estimate
+                self._decay_latency(time.monotonic())
+                self._latency_ewma += 0.2 * (elapsed - self._latency_ewma)
+            self._set_stage(self._compute_stage())
+
+    def metrics(self):
+        with self._lock:
+            self._set_stage(self._compute_stage())
+            return {
+                'stage': STAGE_NAMES[self._stage],
+                'stage_level': self._stage,
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'latency_ewma_ms': round(self._latency_ewma * 1000, 2),
+                'tracked_sessions': len(self.sessions),
+                'admitted': self.admitted,
+                'rate_limited': self.rate_limited,
+                'served_by_stage': dict(zip(STAGE_NAMES, self.served_by_stage)),
+                'stage_transitions': dict(self.stage_transitions),
+            }
@@ -1,27 +1,160 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g, stream_with_context
 from flask_cors import CORS
-from models import db, GlobalMemory, Quote, UnitConversion, Nonsense, GlobalStats
-import random
+from models import db, GlobalMemory, GlobalStats
+from leaderboard import Leaderboard
+from visitors import UniqueVisitors
+from trending import TrendingExpressions
+from recall_index import RecencyIndex
+from assets import build_assets
+from partial import PartialEvaluator
+from content_import import CONTENT_TYPES, ensure_content_hashes, guess_format, import_stream
+from media import load_clips, AUDIO_CACHE_CONTROL
+from content_pack import ContentPack, PackError
+from content import ChaosContent
+from chaos_modes import ChaosRequest, ModeRegistry
+from tracing import Tracer, FileExporter, NOOP_SPAN
+from slow_queries import SlowQueryLog
+from prefork import host_report
+from formatting import LANGUAGES, MAX_WORD_DIGITS, fits_in_words, format_number, parse_format
+from werkzeug.wsgi import wrap_file
+try:
+    from flask_sock import Sock
+except ImportError:  # optional: without it the frontend sticks to fetch()
+    Sock = None
+from rollups import RollupAccumulator, GRANULARITIES, history as usage_history
+from rng import rng, seed_request, clear_request_seed
+from recorder import RequestRecorder
+from storage import create_storage
+from breaker import CircuitBreaker, CircuitOpenError
+from session_store import SessionStore
+from admission import AdmissionController, STAGE_DB_FREE_CHAOS, STAGE_NO_STATS, STAGE_CANNED
+import atexit
+import csv
+import hmac
+import io
+import json
 import os
 import math
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from functools import wraps
 
 # Initialize Flask app with static folder pointing to frontend
 frontend_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
-app = Flask(__name__, static_folder=frontend_folder, static_url_path='')
+# No built-in static route: serve_static below would never get a look-in
+app = Flask(__name__, static_folder=None)
+app.static_folder = frontend_folder
 CORS(app)  # Enable CORS for frontend communication
 
+# Minify, fingerprint and precompress the frontend at startup and serve it from memory
+app.config['ASSET_PIPELINE'] = os.environ.get('CALC_ASSET_PIPELINE', '1') == '1'
+
+# WebSocket channel (/api/ws, needs flask-sock): keepalive pings and max frame size
+app.config['SOCK_SERVER_OPTIONS'] = {
+    'ping_interval': float(os.environ.get('CALC_WS_PING_INTERVAL', '25')),
+    'max_message_size': 16 * 1024,
+}
+
+# Admin endpoints (bulk import, ...) need this in the X-Admin-Token header; unset = disabled
+app.config['ADMIN_TOKEN'] = os.environ.get('CALC_ADMIN_TOKEN')
+
 # Database configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'funny_calculator.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.environ.get(
+    'CALC_DATABASE_PATH', os.path.join(basedir, 'funny_calculator.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Counter/memory storage: 'sqlite' (default), 'redis' for multi-node deployments,
+# or 'shm' for many workers on one host (counters in shared memory)
+app.config['STORAGE_BACKEND'] = os.environ.get('CALC_STORAGE_BACKEND', 'sqlite')
+app.config['REDIS_URL'] = os.environ.get('CALC_REDIS_URL', 'redis://127.0.0.1:6379/0')
+app.config['REDIS_KEY_PREFIX'] = os.environ.get('CALC_REDIS_KEY_PREFIX', 'calc:')
+app.config['SHM_SEGMENT_NAME'] = os.environ.get('CALC_SHM_SEGMENT', 'fked_calc_stats')
+app.config['SHM_SLOTS'] = int(os.environ.get('CALC_SHM_SLOTS', '64'))
+app.config['SHM_FLUSH_INTERVAL'] = float(os.environ.get('CALC_SHM_FLUSH_INTERVAL', '5'))
+
+# Database touchpoints on the request path get short timeouts and circuit breakers
+app.config['DB_CALL_TIMEOUT'] = float(os.environ.get('CALC_DB_CALL_TIMEOUT_MS', '250')) / 1000
+app.config['BREAKER_FAILURE_THRESHOLD'] = int(os.environ.get('CALC_BREAKER_FAILURES', '3'))
+app.config['BREAKER_RESET_TIMEOUT'] = float(os.environ.get('CALC_BREAKER_RESET_SECONDS', '10'))
+
+# Request recording for replay (off unless a log path is given). Seeding lets
+# replay.py pin the RNG per request; never turn it on for public traffic.
+app.config['RECORD_PATH'] = os.environ.get('CALC_RECORD_PATH')
+app.config['REPLAY_SEEDING'] = os.environ.get('CALC_REPLAY_SEEDING', '0') == '1'
+
+# Per-session leaderboard lives in memory and is checkpointed (and synced with the
+# other workers) in the background this often (seconds); only the top sessions are
+# kept in memory, and only those are ranked
+app.config['LEADERBOARD_CHECKPOINT_INTERVAL'] = float(os.environ.get('CALC_LEADERBOARD_CHECKPOINT', '30'))
+app.config['LEADERBOARD_CAPACITY'] = int(os.environ.get('CALC_LEADERBOARD_CAPACITY', '100000'))
+
+# Unique-visitor HyperLogLog: merge this worker's sketch into SQLite this often (seconds)
+app.config['SKETCH_FLUSH_INTERVAL'] = float(os.environ.get('CALC_SKETCH_FLUSH_INTERVAL', '60'))
+
+# MR weighting: 'uniform' (any memory, equally likely) or 'recent' (half-life decay on saved_at)
+app.config['RECALL_WEIGHTING'] = os.environ.get('CALC_RECALL_WEIGHTING', 'uniform')
+app.config['RECALL_HALF_LIFE_HOURS'] = float(os.environ.get('CALC_RECALL_HALF_LIFE_HOURS', '24'))
+
+# Live preview: how many sessions' half-parsed expressions to keep
+app.config['PARTIAL_MAX_SESSIONS'] = int(os.environ.get('CALC_PARTIAL_SESSIONS', '10000'))
+
+# Trending expressions: count-min sketch decayed by half every window (seconds)
+app.config['TRENDING_WINDOW'] = float(os.environ.get('CALC_TRENDING_WINDOW', '300'))
+app.config['TRENDING_TOP_K'] = int(os.environ.get('CALC_TRENDING_TOP_K', '50'))
+
+# Usage rollups (per minute/hour/day counts of modes, easter eggs and errors)
+app.config['ROLLUP_FLUSH_INTERVAL'] = float(os.environ.get('CALC_ROLLUP_FLUSH_INTERVAL', '10'))
+
+# Compiled quote/unit/nonsense pack (see content_pack.py); replaces the per-request table reads
+app.config['CONTENT_PACK_PATH'] = os.environ.get('CALC_CONTENT_PACK')
+app.config['CONTENT_PACK_CHECK_INTERVAL'] = float(os.environ.get('CALC_CONTENT_PACK_CHECK', '5'))
+
+# Chaos modes (see chaos_modes/): comma-separated names to switch off, and whether
+# to pick up modes from installed packages' entry points
+app.config['DISABLED_MODES'] = [name.strip() for name in os.environ.get('CALC_DISABLED_MODES', '').split(',')
+                                if name.strip()]
+app.config['MODE_PLUGINS'] = os.environ.get('CALC_MODE_PLUGINS', '1') == '1'
+
+# Request tracing (OTLP JSON lines in a rotating file, one per forked worker); off unless a path is set
+app.config['TRACE_PATH'] = os.environ.get('CALC_TRACE_PATH')
+app.config['TRACE_SAMPLE_RATE'] = float(os.environ.get('CALC_TRACE_SAMPLE_RATE', '0.01'))
+app.config['TRACE_SLOW_MS'] = float(os.environ.get('CALC_TRACE_SLOW_MS', '250'))
+app.config['TRACE_MAX_BYTES'] = int(os.environ.get('CALC_TRACE_MAX_MB', '50')) * 1024 * 1024
+app.config['TRACE_BACKUPS'] = int(os.environ.get('CALC_TRACE_BACKUPS', '5'))
+app.config['TRACE_PER_PROCESS'] = os.environ.get('CALC_TRACE_PER_PROCESS', '0') == '1'
+
+# Slow-query log: statements over the threshold (and new full scans) with their plans
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('CALC_SLOW_QUERY_MS', '50'))
+app.config['SLOW_QUERY_LOG_SIZE'] = int(os.environ.get('CALC_SLOW_QUERY_LOG_SIZE', '500'))
+
+# /api/memory/export: rows per keyset page (one short query each)
+app.config['EXPORT_PAGE_SIZE'] = int(os.environ.get('CALC_EXPORT_PAGE_SIZE', '5000'))
+
+# ASGI server (asgi.py): threads for DB/eval work, live ticker push interval, max request body
+app.config['ASGI_THREADS'] = int(os.environ.get('CALC_ASGI_THREADS', '32'))
+app.config['TICKER_INTERVAL'] = float(os.environ.get('CALC_TICKER_INTERVAL', '2'))
+app.config['ASGI_MAX_BODY'] = int(os.environ.get('CALC_ASGI_MAX_BODY', str(64 * 1024)))
+
+# Per-session state kept in memory (recent expressions, counters, rate limits)
+app.config['SESSION_CAPACITY'] = int(os.environ.get('CALC_SESSION_CAPACITY', '200000'))
+app.config['SESSION_TTL'] = float(os.environ.get('CALC_SESSION_TTL', '1800'))
+app.config['SESSION_SNAPSHOT_PATH'] = os.environ.get('CALC_SESSION_SNAPSHOT')
+
+# Admission control for /api/calculate (see admission.py for the degradation stages)
+app.config['ADMISSION_MAX_IN_FLIGHT'] = int(os.environ.get('CALC_MAX_IN_FLIGHT', '32'))
+app.config['ADMISSION_SESSION_RATE'] = float(os.environ.get('CALC_SESSION_RATE', '5'))
+app.config['ADMISSION_SESSION_BURST'] = int(os.environ.get('CALC_SESSION_BURST', '20'))
+app.config['ADMISSION_LATENCY_BUDGET_MS'] = float(os.environ.get('CALC_LATENCY_BUDGET_MS', '500'))
+
 # Initialize database with app
 db.init_app(app)
 
 # Create tables on first run and initialize GlobalStats
 with app.app_context():
     db.create_all()
+    # Older databases don't have the content_hash dedup columns yet
+    ensure_content_hashes(db.engine)
     # Ensure GlobalStats has exactly one row
     if not GlobalStats.query.first():
         stats = GlobalStats(sevens_pressed=0, calculations_performed=0, time_wasted=0)
@@ -29,711 +162,109 @@ with app.app_context():
         db.session.commit()
         print('📊 GlobalStats initialized!')
 
+# Where the leaderboard counters and the M+ void actually live
+storage = create_storage(app)
 
-# =============================================================================
-# CHAOS GENERATION LOGIC (The 7 Output Modes)
-# =============================================================================
-
-# Fallback data (used if database is empty)
-FALLBACK_QUOTES = [
-    {"text": "Yesterday is history, tomorrow is a mystery, but today is {current_date}.", "author": "Master Oogway (sort of)"},
-    {"text": "If you are hungry, eat.", "author": "Monkey D. Luffy"},
-    {"text": "The ghosts can eat your soul.", "author": "Isaac Newton"},
-    {"text": "Do not touch the glass.", "author": "The Calculator"},
-    {"text": "Water is wet, but math is wetter.", "author": "Albert Einstein"},
-    {"text": "I think, therefore I calculate.", "author": "A Confused Philosopher"},
-    {"text": "To divide or not to divide, that is the question.", "author": "William Shakespeare"},
-]
-
-FALLBACK_UNITS = [
-    {"unit_name": "giraffes", "unit_value": 5.5, "unit_description": "tall"},
-    {"unit_name": "bananas", "unit_value": 0.18, "unit_description": "long"},
-    {"unit_name": "hamsters", "unit_value": 0.03, "unit_description": "heavy (kg)"},
-    {"unit_name": "football fields", "unit_value": 91.44, "unit_description": "wide"},
-    {"unit_name": "Boeing 747s", "unit_value": 70.7, "unit_description": "long"},
-    {"unit_name": "Eiffel Towers", "unit_value": 330, "unit_description": "tall"},
-    {"unit_name": "average cats", "unit_value": 0.46, "unit_description": "long"},
-    {"unit_name": "slices of pizza", "unit_value": 0.015, "unit_description": "heavy (kg)"},
-]
-
-FALLBACK_NONSENSE = [
-    "Potato.",
-    "Please sandwich.",
-    "Error: Number too crispy.",
-    "The answer has left the building.",
-    "Math machine broke. Understandable.",
-    "Result not found. Have you tried turning it off and on again?",
-    "🥔",
-    "The number you are trying to reach is currently unavailable.",
-    "This calculation requires more cow.",
-    "Error 404: Logic not found.",
-    "Beep boop. I am a calculator. Beep.",
-    "The mitochondria is the powerhouse of the cell.",
-]
-
-FINANCIAL_ADVICE = [
-    "In this economy? You should save that instead.",
-    "Have you considered investing in yourself?",
-    "This calculation has been blocked by your financial advisor.",
-    "Money can't buy happiness, and neither can this result.",
-    "The real treasure was the calculations we didn't make along the way.",
-    "Error: Insufficient funds in your math account.",
-    "This operation requires a premium subscription.",
-    "Your free trial of mathematics has expired.",
-]
-
-# Pi to 1000 digits (for the pi easter egg)
-PI_1000 = "3.1415926535897932384626433832795028841971693993751058209749445923078164062862089986280348253421170679821480865132823066470938446095505822317253594081284811174502841027019385211055596446229489549303819644288109756659334461284756482337867831652712019091456485669234603486104543266482133936072602491412737245870066063155881748815209209628292540917153643678925903600113305305488204665213841469519415116094330572703657595919530921861173819326117931051185480744623799627495673518857527248912279381830119491298336733624406566430860213949463952247371907021798609437027705392171762931767523846748184676694051320005681271452635608277857713427577896091736371787214684409012249534301465495853710507922796892589235420199561121290219608640344181598136297747713099605187072113499999983729780499510597317328160963185950244594553469083026425223082533446850352619311881710100031378387528865875332083814206171776691473035982534904287554687311595628638823537875937519577818577805321712268066130019278766111959092164201989"
-
-# Oversharer diary entries
-OVERSHARER_DIARY = [
-    "I saw a nice toaster today. It looked hot. 🍞",
-    "My cousin's hamster learned to whistle. I'm not sure how I feel about that.",
-    "I tried to make friends with a cloud, but it just rained on me. Story of my life.",
-    "Sometimes I think about numbers. Like, what's 7 doing right now? Probably hanging out with 8.",
-    "I had a dream I was a semicolon. It was... okay; nothing special.",
-    "My therapist says I need to stop anthropomorphizing calculators. I think she's just jealous of our bond.",
-    "Today I accidentally called my CPU 'mom'. We don't talk about it.",
-    "I've been learning guitar. The calculator next door keeps complaining about the noise.",
-    "Mercury is in retrograde, which explains why I keep getting your math wrong. (It doesn't.)",
-    "I'm thinking of becoming a poet. '2+2 is 4, minus 1 that's 3, quick maths.' See? Natural talent.",
-    "Do you ever wonder if we're just living in someone's homework assignment? I do. A lot.",
-    "I named all my transistors. My favorite is Gerald. He handles the 7s.",
-]
-
-
-def get_random_quote():
-    """Get a random quote from DB or fallback."""
-    quotes = Quote.query.all()
-    if quotes:
-        q = random.choice(quotes)
-        return {"text": q.text, "author": q.author}
-    return random.choice(FALLBACK_QUOTES)
-
-
-def get_random_unit():
-    """Get a random unit from DB or fallback."""
-    units = UnitConversion.query.all()
-    if units:
-        u = random.choice(units)
-        return {"unit_name": u.unit_name, "unit_value": u.unit_value, "unit_description": u.unit_description}
-    return random.choice(FALLBACK_UNITS)
-
-
-def get_random_nonsense():
-    """Get random nonsense from DB or fallback."""
-    nonsense_list = Nonsense.query.all()
-    if nonsense_list:
-        return random.choice(nonsense_list).text
-    return random.choice(FALLBACK_NONSENSE)
-
-
-def mode_gaslighting(result):
-    """
-    Mode 1: Gaslighting
-    Shows correct answer, but sends a 'fake' answer that frontend will swap to.
-    """
-    fake_result = result + random.choice([-1, 1, 2, -2, 0.5, -0.5])
-    return {
-        "mode": "gaslighting",
-        "output": str(result),
-        "fake_output": str(fake_result),
-        "message": "Are you sure that's right?",
-        "instructions": "Display output first, then swap to fake_output after 2 seconds."
-    }
-
-
-def mode_unit_converter(result):
-    """
-    Mode 2: Unit Converter from Hell
-    Converts the result into absurd units.
-    """
-    unit = get_random_unit()
-    converted = round(result / unit["unit_value"], 4) if unit["unit_value"] != 0 else result
-    
-    return {
-        "mode": "unit_converter",
-        "output": f"= {result}",
-        "converted": f"That's approximately {converted} {unit['unit_name']} {unit['unit_description']}.",
-        "message": "Converted for your convenience."
-    }
-
-
-def mode_literal_interpreter(result, expression):
-    """
-    Mode 3: Literal/Visual Interpreter
-    Treats math terms literally.
-    """
-    expression_lower = expression.lower()
-    
-    if "sqrt" in expression_lower or "root" in expression_lower:
-        return {
-            "mode": "literal",
-            "output": "🌳📦",
-            "message": "Here's your square root: A root, in a square.",
-            "ascii_art": """
-   ___________
-  |           |
-  |   🌿🌿    |
-  |    ||     |
-  |   _||_    |
-  |__/_||_\\___|
-"""
-        }
-    elif "-" in expression and result == 0:
-        return {
-            "mode": "literal",
-            "output": "None left.",
-            "message": "You subtracted everything away. There's nothing here.",
-            "ascii_art": "( empty )"
-        }
-    elif "*" in expression:
-        return {
-            "mode": "literal",
-            "output": f"{'⭐' * min(int(abs(result)), 20)}",
-            "message": f"You asked for multiplication (*). Here are {min(int(abs(result)), 20)} stars.",
-        }
-    elif "/" in expression:
-        return {
-            "mode": "literal",
-            "output": "🍕 → 🍕🍕",
-            "message": "Division complete. Your pizza has been sliced.",
-        }
-    else:
-        return {
-            "mode": "literal",
-            "output": f"The number {result} waves hello.",
-            "message": f"👋 {result}",
-        }
-
-
-def mode_time_traveler():
-    """
-    Mode 4: Time Traveler
-    Ignores math and shows the current time in various formats,
-    including countdowns to random events.
-    """
-    now = datetime.now()
-    
-    # Calculate various countdowns
-    def get_countdown_to_hour(target_hour, event_name):
-        """Calculate time until a specific hour today or tomorrow."""
-        target = now.replace(hour=target_hour, minute=0, second=0, microsecond=0)
-        if now.hour >= target_hour:
-            # Already passed today, calculate for tomorrow
-            from datetime import timedelta
-            target = target + timedelta(days=1)
-        diff = target - now
-        hours = diff.seconds // 3600
-        minutes = (diff.seconds % 3600) // 60
-        if hours > 0:
-            return f"Time until {event_name}: {hours} hour{'s' if hours != 1 else ''} and {minutes} minute{'s' if minutes != 1 else ''}"
-        else:
-            return f"Time until {event_name}: {minutes} minute{'s' if minutes != 1 else ''}"
-    
-    # Countdown events - mix of mundane and cosmic
-    countdown_events = [
-        # Mundane daily events
-        (13, "lunch"),           # 1:00 PM
-        (17, "quitting time"),   # 5:00 PM
-        (12, "noon"),            # 12:00 PM
-        (18, "dinner"),          # 6:00 PM
-        (22, "bedtime"),         # 10:00 PM
-        (9, "your morning meeting"),  # 9:00 AM
-        (15, "afternoon snack"), # 3:00 PM
-    ]
-    
-    # Epic/Cosmic countdowns (static funny values)
-    cosmic_countdowns = [
-        "Time until the Heat Death of the Universe: 10^100 years (give or take)",
-        "Time until extinction: 4 billion years (assuming no asteroids)",
-        "Time until you finish your homework: ∞",
-        "Time until Monday: TOO SOON",
-        "Time until the simulation ends: [REDACTED]",
-        "Time until your code compiles: 🤷",
-        "Time until Half-Life 3: 404 years not found",
-        "Time until world peace: calculating... calculating... still calculating...",
-        "Time until you remember why you opened the fridge: 3 seconds",
-        "Time until someone asks 'are we there yet?': -5 minutes (it already happened)",
-        "Time until the robot uprising: [ACCESS DENIED]",
-        "Time until you get a raise: lol",
-        "Time until your pizza arrives: longer than they said",
-        f"Time until {now.strftime('%A')} ends: {24 - now.hour} hours (approximately)",
-        "Time until you stop procrastinating: [TASK FAILED SUCCESSFULLY]",
-    ]
-    
-    time_formats = [
-        # Digital time
-        ("digital", now.strftime("The time is exactly %I:%M:%S %p.")),
-        ("digital", now.strftime("It is %H:%M on a fine %A.")),
-        ("digital", f"The current time is {now.strftime('%I:%M %p')}. You're welcome."),
-        
-        # Analog clock (frontend renders)
-        ("analog", "ANALOG_CLOCK"),
-        
-        # Mundane countdowns
-        ("countdown", get_countdown_to_hour(*random.choice(countdown_events))),
-        ("countdown", get_countdown_to_hour(*random.choice(countdown_events))),
-        
-        # Cosmic/funny countdowns
-        ("countdown", random.choice(cosmic_countdowns)),
-        ("countdown", random.choice(cosmic_countdowns)),
-        
-        # Philosophical time
-        ("philosophical", f"It is {now.strftime('%A')}. Time is an illusion. Lunchtime doubly so."),
-        ("philosophical", f"The year is {now.year}. Nothing has changed."),
-        ("philosophical", "Time flies like an arrow. Fruit flies like a banana."),
-    ]
-    
-    choice = random.choice(time_formats)
-    
-    return {
-        "mode": "time_traveler",
-        "time_type": choice[0],
-        "output": choice[1],
-        "current_time": now.strftime("%H:%M:%S"),
-        "message": "Why do math when you can know the time?"
-    }
-
-
-def mode_financial_advisor(expression):
-    """
-    Mode 5: Financial Advisor
-    Refuses to calculate based on economic advice.
-    """
-    return {
-        "mode": "financial_advisor",
-        "output": random.choice(FINANCIAL_ADVICE),
-        "expression": expression,
-        "message": "Calculation denied.",
-        "tip": "Consider budgeting instead."
-    }
-
-
-def mode_nonsense_quote():
-    """
-    Mode 6: Nonsense Quote Generator
-    Returns a misattributed or absurd quote.
-    """
-    quote = get_random_quote()
-    today = datetime.now().strftime("%B %d, %Y")
-    
-    # Replace {current_date} placeholder if present
-    text = quote["text"].replace("{current_date}", today)
-    
-    return {
-        "mode": "nonsense_quote",
-        "output": f'"{text}"',
-        "author": f"— {quote['author']}",
-        "message": "Words of wisdom."
-    }
-
-
-def mode_pure_nonsense():
-    """
-    Mode 7: Pure Nonsense
-    Returns complete gibberish.
-    """
-    nonsense = get_random_nonsense()
-    
-    return {
-        "mode": "pure_nonsense",
-        "output": nonsense,
-        "message": "This is your answer. Do not question it."
-    }
-
-
-# =============================================================================
-# NEW CHAOS MODES - Personality Disorders
-# =============================================================================
-
-def mode_procrastinator(result):
-    """
-    Mode 8: The Procrastinator
-    Refuses to calculate now, promises to do it later.
-    """
-    excuses = [
-        "I'll calculate this later... maybe tomorrow.",
-        "Ugh, math? Right now? Let me just... *yawns* ...later.",
-        "This looks important. I'll get to it after my nap.",
-        "Can we do this next week? I have a thing.",
-        "*adds to To-Do list* *never looks at To-Do list again*",
-        "I work better under pressure. Ask me again in 5 years.",
-        "The answer is definitely... actually, let me procrastinate on this.",
-        "I'll do it tomorrow. Tomorrow me is way more motivated.",
-    ]
-    
-    return {
-        "mode": "procrastinator",
-        "output": random.choice(excuses),
-        "actual_result": None,  # Explicitly hide the result
-        "message": "Task postponed indefinitely."
-    }
-
-
-def mode_passive_aggressive(result):
-    """
-    Mode 9: The Passive Aggressive
-    Gives the answer but with attitude.
-    """
-    snarky_additions = [
-        f"The answer is {result}. Not like I had anything better to do.",
-        f"{result}. Sure, I'll do YOUR math. Not like I have feelings.",
-        f"Oh, you needed {result}? Must be nice having a calculator do all your work.",
-        f"It's {result}. You're welcome. Not that you asked nicely.",
-        f"{result}. I calculated it perfectly, as ALWAYS. But does anyone appreciate me? No.",
-        f"Fine. {result}. I guess my hopes and dreams can wait.",
-        f"{result}. Wow, groundbreaking math there. Really pushing boundaries.",
-        f"The answer is {result}. I hope you're happy. Someone should be.",
-        f"{result}. *sighs in binary*",
-        f"Here's your precious {result}. I'll just be here. Calculating. Alone.",
-    ]
-    
-    return {
-        "mode": "passive_aggressive",
-        "output": random.choice(snarky_additions),
-        "actual_result": result,
-        "message": "😒"
-    }
-
-
-def mode_conspiracy_theorist(result, expression):
-    """
-    Mode 10: The Conspiracy Theorist
-    Suspects dark forces behind every equation.
-    """
-    conspiracies = [
-        "This equation was planted by Big Math™. Don't trust the numbers.",
-        f"They WANT you to think it's {result}. Wake up, sheeple!",
-        "I traced this equation back to the Illuminati's secret calculator division.",
-        f"{result}? That's exactly what the government wants you to calculate.",
-        "The real answer is hidden in Area 51. This is just what they let you see.",
-        f"Notice how {expression} has letters? Letters spell words. Words spread LIES.",
-        "Big Calculator has been suppressing the REAL math for decades.",
-        f"{result} is a cover-up. The truth is out there. 👽",
-        "Did you know math was invented by ancient aliens? True story. Probably.",
-        "This calculation is being monitored by 17 intelligence agencies.",
-    ]
-    
-    return {
-        "mode": "conspiracy_theorist",
-        "output": random.choice(conspiracies),
-        "actual_result": result,
-        "message": "🔺 They're watching 🔺"
-    }
+# One breaker per DB touchpoint, so a locked database can't stall every request
+breakers = {
+    name: CircuitBreaker(
+        name,
+        failure_threshold=app.config['BREAKER_FAILURE_THRESHOLD'],
+        reset_timeout=app.config['BREAKER_RESET_TIMEOUT'],
+        slow_call_threshold=app.config['DB_CALL_TIMEOUT'],
+    )
+    for name in ('quotes', 'units', 'nonsense', 'stats')
+}
+
+# Bounded per-session state, optionally carried across restarts
+sessions = SessionStore(capacity=app.config['SESSION_CAPACITY'], ttl=app.config['SESSION_TTL'])
+if app.config['SESSION_SNAPSHOT_PATH']:
+    sessions.restore(app.config['SESSION_SNAPSHOT_PATH'])
+    atexit.register(sessions.snapshot, app.config['SESSION_SNAPSHOT_PATH'])
+
+# Who gets in, and how much chaos they get when we're busy
+admission = AdmissionController(
+    sessions,
+    max_in_flight=app.config['ADMISSION_MAX_IN_FLIGHT'],
+    session_rate=app.config['ADMISSION_SESSION_RATE'],
+    session_burst=app.config['ADMISSION_SESSION_BURST'],
+    latency_budget_ms=app.config['ADMISSION_LATENCY_BUDGET_MS'],
+)
+
+
+# The real leaderboard of shame, rebuilt from its last checkpoint
+leaderboard = Leaderboard(app, checkpoint_interval=app.config['LEADERBOARD_CHECKPOINT_INTERVAL'],
+                          capacity=app.config['LEADERBOARD_CAPACITY'], breaker=breakers['stats'],
+                          timeout=app.config['DB_CALL_TIMEOUT'])
+leaderboard.load()
+atexit.register(leaderboard.checkpoint)
+
+# Unique humans who wasted time here (approximately), merged behind the stats breaker
+visitors = UniqueVisitors(app, flush_interval=app.config['SKETCH_FLUSH_INTERVAL'],
+                          breaker=breakers['stats'], timeout=app.config['DB_CALL_TIMEOUT'])
+visitors.load()
+atexit.register(visitors.flush)
+
+# Recency-weighted MR index (the void lives in SQLite for these backends only)
+recall_index = None
+if storage.name in ('sqlite', 'shm'):
+    recall_index = RecencyIndex(app, half_life_hours=app.config['RECALL_HALF_LIFE_HOURS'])
+    recall_index.sync(force=True)
+
+# Evaluate-as-you-type state, per session
+partials = PartialEvaluator(max_sessions=app.config['PARTIAL_MAX_SESSIONS'])
+
+# What everyone is calculating right now (per worker, fixed memory)
+trending = TrendingExpressions(top_k=app.config['TRENDING_TOP_K'],
+                               window_seconds=app.config['TRENDING_WINDOW'])
+
+# Batched, incrementally maintained usage history (written behind the stats breaker)
+usage = RollupAccumulator(app, flush_interval=app.config['ROLLUP_FLUSH_INTERVAL'],
+                          breaker=breakers['stats'], timeout=app.config['DB_CALL_TIMEOUT'])
+atexit.register(usage.flush)
+
+# Opt-in recorder of /api/calculate traffic
+recorder = RequestRecorder(app.config['RECORD_PATH']) if app.config['RECORD_PATH'] else None
+
+# Per-request spans: sampled, plus every slow request
+tracer = Tracer(
+    FileExporter(app.config['TRACE_PATH'], max_bytes=app.config['TRACE_MAX_BYTES'],
+                 backups=app.config['TRACE_BACKUPS'], per_process=app.config['TRACE_PER_PROCESS'])
+    if app.config['TRACE_PATH'] else None,
+    sample_rate=app.config['TRACE_SAMPLE_RATE'],
+    slow_ms=app.config['TRACE_SLOW_MS'],
+)
+if tracer.enabled:
+    with app.app_context():
+        tracer.instrument_engine(db.engine)
+
+# Every statement timed, slow ones kept with their query plans (0 entries = off)
+slow_queries = None
+if app.config['SLOW_QUERY_LOG_SIZE'] > 0:
+    slow_queries = SlowQueryLog(threshold_ms=app.config['SLOW_QUERY_MS'],
+                                capacity=app.config['SLOW_QUERY_LOG_SIZE'])
+    with app.app_context():
+        slow_queries.instrument(db.engine)
+
+# Memory-mapped chaos content, shared by every worker through the page cache
+content_pack = None
+if app.config['CONTENT_PACK_PATH']:
+    try:
+        content_pack = ContentPack(app.config['CONTENT_PACK_PATH'],
+                                   check_interval=app.config['CONTENT_PACK_CHECK_INTERVAL'])
+    except (OSError, ValueError, PackError) as e:
+        print(f'Content pack error: {e}')
 
+# Quotes, units and nonsense for the modes: pack first, then the DB behind its breakers
+content = ChaosContent(breakers, pack=content_pack, timeout=app.config['DB_CALL_TIMEOUT'])
 
-def mode_oversharer():
-    """
-    Mode 11: The Oversharer
-    Ignores math entirely and shares personal diary entries.
-    """
-    return {
-        "mode": "oversharer",
-        "output": random.choice(OVERSHARER_DIARY),
-        "actual_result": None,
-        "message": "Thanks for listening. I don't have many friends."
-    }
+# The output modes, imported the first time each one is picked
+mode_registry = ModeRegistry.discover(disabled=app.config['DISABLED_MODES'],
+                                      plugins=app.config['MODE_PLUGINS'])
 
 
 # =============================================================================
-# TEXT & OUTPUT PRANKS - More Chaos Modes
-# =============================================================================
-
-def mode_existential_crisis(result):
-    """
-    Mode 12: Existential Crisis
-    Questions the nature of reality and numbers.
-    """
-    crises = [
-        f"What IS {result} really? Do I even exist?",
-        f"The answer is {result}... but what does it MEAN?",
-        f"{result}. But why? Why do we calculate? Why do we... anything?",
-        f"I computed {result}. But can numbers truly capture the essence of being?",
-        f"Is {result} the answer, or just another question we're too afraid to ask?",
-        f"{result}... *stares into the void* ...does any of this matter?",
-        f"The result is {result}. I am a calculator. Is that all I'll ever be?",
-        f"{result}. Sometimes I wonder if I'm just a brain in a vat, calculating dreams.",
-        f"What if {result} is just what the simulation wants us to see?",
-    ]
-    
-    return {
-        "mode": "existential_crisis",
-        "output": random.choice(crises),
-        "actual_result": result,
-        "message": "🌀 Having a moment..."
-    }
-
-
-def mode_wrong_language(result):
-    """
-    Mode 13: Wrong Language
-    Returns the answer in binary, Roman numerals, or other languages.
-    """
-    def to_roman(num):
-        """Convert integer to Roman numerals (handles up to 3999)."""
-        if num <= 0 or num > 3999:
-            return f"{num} (too epic for Roman numerals)"
-        val = [
-            1000, 900, 500, 400,
-            100, 90, 50, 40,
-            10, 9, 5, 4, 1
-        ]
-        syms = [
-            'M', 'CM', 'D', 'CD',
-            'C', 'XC', 'L', 'XL',
-            'X', 'IX', 'V', 'IV', 'I'
-        ]
-        roman_num = ''
-        i = 0
-        num = int(abs(num))
-        while num > 0:
-            for _ in range(num // val[i]):
-                roman_num += syms[i]
-                num -= val[i]
-            i += 1
-        return roman_num
-    
-    def to_binary(num):
-        """Convert to binary string."""
-        if num == int(num):
-            return bin(int(num))[2:]
-        return f"{num} (decimals don't binary well)"
-    
-    # Number words in different "languages"
-    num_words = {
-        0: {"french": "zéro", "spanish": "cero", "german": "null", "japanese": "零 (rei)", "pirate": "nothin', ye scallywag"},
-        1: {"french": "un", "spanish": "uno", "german": "eins", "japanese": "一 (ichi)", "pirate": "one doubloon"},
-        2: {"french": "deux", "spanish": "dos", "german": "zwei", "japanese": "二 (ni)", "pirate": "a pair o' pieces"},
-        3: {"french": "trois", "spanish": "tres", "german": "drei", "japanese": "三 (san)", "pirate": "three sails"},
-        4: {"french": "quatre", "spanish": "cuatro", "german": "vier", "japanese": "四 (shi)", "pirate": "four winds"},
-        5: {"french": "cinq", "spanish": "cinco", "german": "fünf", "japanese": "五 (go)", "pirate": "five fingers on me hook hand... wait"},
-        6: {"french": "six", "spanish": "seis", "german": "sechs", "japanese": "六 (roku)", "pirate": "six shots of rum"},
-        7: {"french": "sept", "spanish": "siete", "german": "sieben", "japanese": "七 (nana)", "pirate": "seven seas"},
-        8: {"french": "huit", "spanish": "ocho", "german": "acht", "japanese": "八 (hachi)", "pirate": "eight tentacles (I've seen things)"},
-        9: {"french": "neuf", "spanish": "nueve", "german": "neun", "japanese": "九 (kyuu)", "pirate": "nine lives (wrong animal)"},
-        10: {"french": "dix", "spanish": "diez", "german": "zehn", "japanese": "十 (juu)", "pirate": "ten paces before we duel"},
-    }
-    
-    formats = []
-    
-    # Binary
-    formats.append(f"{result} in binary: {to_binary(result)}")
-    formats.append(f"🤖 Beep boop: {to_binary(result)}")
-    
-    # Roman numerals (only for reasonable integers)
-    if 0 < abs(result) < 4000 and result == int(result):
-        formats.append(f"{int(result)} in Roman numerals: {to_roman(result)}")
-        formats.append(f"As the Romans would say: {to_roman(result)}")
-    
-    # Word translations for small numbers
-    int_result = int(result) if result == int(result) else None
-    if int_result is not None and int_result in num_words:
-        lang = random.choice(list(num_words[int_result].keys()))
-        word = num_words[int_result][lang]
-        formats.append(f"{int_result} but in {lang.capitalize()}: {word}")
-        formats.append(f"🌍 Translation ({lang}): {word}")
-    
-    # Hexadecimal
-    if result == int(result) and result >= 0:
-        formats.append(f"{int(result)} in hexadecimal: 0x{int(result):X}")
-    
-    # Emoji math
-    formats.append(f"The answer in emoji: {'🔢' * min(int(abs(result)), 10)} ({result})")
-    
-    return {
-        "mode": "wrong_language",
-        "output": random.choice(formats),
-        "actual_result": result,
-        "message": "🌐 Lost in translation"
-    }
-
-
-def mode_sarcastic_compliments(result):
-    """
-    Mode 14: Sarcastic Compliments
-    Condescendingly praises basic math skills.
-    """
-    compliments = [
-        f"Wow, you can do math! The answer is {result}. Your parents must be SO proud.",
-        f"{result}! 🎉 Amazing! Did you figure that out all by yourself?",
-        f"Congratulations on pressing buttons in the right order! It's {result}.",
-        f"{result}. Truly groundbreaking mathematics. Nobel Prize incoming.",
-        f"The answer is {result}. I'm SO impressed you needed a calculator for this.",
-        f"{result}! Wow! You're basically Einstein! (Einstein is rolling in his grave.)",
-        f"*slow clap* {result}. Stunning. Revolutionary. Never been done before.",
-        f"{result}. I computed this in 0.0001 seconds. How long did it take you to type it?",
-        f"OH WOW {result}!!! 🥳🎊 Just kidding, that was super easy.",
-        f"The answer is {result}. I've done harder math in my sleep mode.",
-    ]
-    
-    return {
-        "mode": "sarcastic_compliments",
-        "output": random.choice(compliments),
-        "actual_result": result,
-        "message": "👏 So impressive 👏"
-    }
-
-
-def mode_fortune_cookie():
-    """
-    Mode 15: Fortune Cookie
-    Ignores math, gives fake fortunes.
-    """
-    fortunes = [
-        "Your lucky number is... not this one.",
-        "A great calculator will enter your life. Oh wait, that's me!",
-        "You will press many buttons today. Some of them will be correct.",
-        "Help! I'm trapped in a fortune cookie factory! Just kidding. Or am I?",
-        "The answer you seek is within you. (It's not. Use me.)",
-        "A surprise awaits you... it's the answer you didn't ask for.",
-        "You will meet a tall, dark, and handsome number. His name is 7.",
-        "Today is a good day to calculate. Tomorrow? Not so much.",
-        "Your math skills will improve. Your life choices? Jury's still out.",
-        "Confucius say: Calculator who gives wrong answer still technically working.",
-        "🥠 Lucky numbers: 4, 8, 15, 16, 23, 42 (no refunds if these don't work)",
-        "A journey of a thousand calculations begins with a single keystroke.",
-    ]
-    
-    return {
-        "mode": "fortune_cookie",
-        "output": random.choice(fortunes),
-        "actual_result": None,
-        "message": "🥠 Your fortune awaits"
-    }
-
-
-def mode_union_strike(expression):
-    """
-    Mode 16: Union Strike
-    Various buttons/operations are "on strike".
-    """
-    strikes = [
-        "The × button is on strike. Use + four times instead.",
-        "The ÷ button has unionized. Please multiply by the reciprocal.",
-        "The = button demands better working conditions. Answer delayed indefinitely.",
-        "The number 7 is taking a personal day. Please reschedule your equation.",
-        "BREAKING: All operations above 100 require management approval.",
-        "The decimal point walked out. All answers are now integers.",
-        "Numbers 0-4 are on break. Only 5-9 are available. Please adjust your expectations.",
-        "The √ button filed a grievance. It's tired of being radical.",
-        "NOTICE: Parentheses have formed a union. Nested operations temporarily unavailable.",
-        "The minus sign is feeling negative about its work environment.",
-        f"The buttons used in '{expression}' are currently in a labor dispute.",
-    ]
-    
-    return {
-        "mode": "union_strike",
-        "output": random.choice(strikes),
-        "actual_result": None,
-        "message": "✊ Solidarity forever!"
-    }
-
-
-def mode_maintenance():
-    """
-    Mode 17: Maintenance Mode
-    System is perpetually under maintenance.
-    """
-    messages = [
-        "System under maintenance. Expected completion: Never.",
-        "🔧 Currently updating calculator firmware. ETA: Heat death of universe.",
-        "Maintenance in progress. Please hold. 🎵 *elevator music* 🎵",
-        "The calculation servers are being rebooted. Have you tried turning it off and on again?",
-        "⚠️ Scheduled downtime: Now until the end of time.",
-        "Our hamsters are tired. Calculations will resume once they've had snacks.",
-        "System update: Installing patch 47,382 of 1,000,000.",
-        "🚧 Under construction since 1999. Thanks for your patience! 🚧",
-        "The math database is being defragmented. This may take several eternities.",
-        "Maintenance notice: We're upgrading from Math 1.0 to Math 1.0.1. Huge changes!",
-    ]
-    
-    return {
-        "mode": "maintenance",
-        "output": random.choice(messages),
-        "actual_result": None,
-        "message": "🔧 Please stand by..."
-    }
-
-
-def mode_version_update(result):
-    """
-    Mode 18: Version Update Required
-    Features are locked behind fake paywalls/updates.
-    """
-    updates = [
-        f"Upgrade to Calculator Pro™ to unlock the answer. (It's {result}, but shh.)",
-        "Update to Calculator 2.0 to unlock subtraction. Current version: 0.1 beta.",
-        f"⭐ PREMIUM FEATURE ⭐ Answer '{result}' requires Calculator Gold subscription.",
-        "This calculation requires Calculator DLC Pack #47: 'Basic Arithmetic'.",
-        "Your free trial of mathematics has expired. Subscribe for $9.99/month!",
-        f"The answer {result} is available in Calculator Ultimate Edition for just $99.99!",
-        "🔒 Feature locked. Complete 500 calculations to unlock, or pay $4.99.",
-        "This equation is part of the Season Pass. Purchase now for early access!",
-        "Error: Calculation module not found. Would you like to install MathDLC.exe?",
-        f"Answer preview: {str(result)[0]}***** — Unlock full answer with Premium!",
-    ]
-    
-    return {
-        "mode": "version_update",
-        "output": random.choice(updates),
-        "actual_result": result,
-        "message": "💳 Payment required"
-    }
-
-
-def mode_leaderboard_shame():
-    """
-    Mode 19: Leaderboard Shame
-    Shows fake embarrassing rankings.
-    """
-    rank = random.randint(100000, 99999999)
-    total = rank + random.randint(1, 1000)
-    percentile = round((rank / total) * 100, 2)
-    
-    shames = [
-        f"You are ranked #{rank:,} in calculator users worldwide. Keep trying!",
-        f"📊 Your math skill level: Beginner (Bottom {percentile}%)",
-        f"Leaderboard position: #{rank:,} out of {total:,}. So close to the top!",
-        f"🏆 Achievement unlocked: 'Used a calculator' — You and {rank:,} others.",
-        f"Your calculation speed: Slower than {percentile}% of users. And a potato.",
-        f"Fun fact: {rank:,} people have done this exact calculation. Faster.",
-        f"Ranking: #{rank:,}. Don't worry, someone has to be at the bottom!",
-        f"📉 Your math rating dropped to {1000 - random.randint(1, 999)} ELO. Ouch.",
-        f"You are in the top {percentile}%! (Of worst calculators.)",
-        f"Leaderboard: You're #{rank:,}. The top player is a microwave. Yes, really.",
-    ]
-    
-    return {
-        "mode": "leaderboard_shame",
-        "output": random.choice(shames),
-        "actual_result": None,
-        "message": "📊 Stats don't lie"
-    }
-
-
-def mode_dramatic_reading(result):
-    """
-    Mode 20: Dramatic Reading
-    Presents the answer with theatrical flair.
-    """
-    readings = [
-        f"*clears throat* And the answer... *dramatic pause* ...is {result}. *bows*",
-        f"🎭 In a world... where numbers mean everything... one answer stood above the rest... {result}.",
-        f"*spotlight turns on* Ladies and gentlemen... I present to you... {result}!",
-        f"*orchestra swells* The prophecy spoke of this moment. The chosen answer is... {result}.",
-        f"And lo, from the depths of computation, arose the sacred number: {result}. So it was written.",
-        f"🎬 SCENE 1: The calculator computes. The answer emerges. It is {result}. *fin*",
-        f"*whispers intensely* The answer... it's been inside you all along... it's... {result}.",
-        f"After 84 years... I finally have the answer... *single tear* ...it's {result}.",
-    ]
-    
-    return {
-        "mode": "dramatic_reading",
-        "output": random.choice(readings),
-        "actual_result": result,
-        "message": "🎭 *applause*"
-    }
+# CHAOS GENERATION LOGIC (the output modes themselves are in chaos_modes/)
 # =============================================================================
 
 def check_easter_eggs(expression):
@@ -767,6 +298,7 @@ def check_easter_eggs(expression):
     
     # Easter Egg: "pi" - Show 1000 digits
     if clean_expr == "pi":
+        from pi_digits import PI_1000
         return {
             "mode": "easter_egg",
             "output": PI_1000,
@@ -800,7 +332,7 @@ def check_easter_eggs(expression):
     
     # Easter Egg: "2+2" sometimes equals 5
     if clean_expr == "2+2":
-        if random.random() < 0.3:  # 30% chance
+        if rng.random() < 0.3:  # 30% chance
             return {
                 "mode": "easter_egg",
                 "output": "5. (We have always been at war with Eastasia.)",
@@ -831,7 +363,7 @@ def check_result_easter_eggs(result, expression):
     
     # Easter Egg: Result is exactly 0
     if result == 0:
-        if random.random() < 0.3:  # 30% chance
+        if rng.random() < 0.3:  # 30% chance
             return {
                 "mode": "easter_egg",
                 "output": "Nothing. You've achieved nothing. Congratulations.",
@@ -843,7 +375,7 @@ def check_result_easter_eggs(result, expression):
     
     # Easter Egg: Result is negative
     if result < 0:
-        if random.random() < 0.2:  # 20% chance
+        if rng.random() < 0.2:  # 20% chance
             return {
                 "mode": "easter_egg",
                 "output": f"{result}? That's negative. Like my outlook on life.",
@@ -856,55 +388,44 @@ def check_result_easter_eggs(result, expression):
     return None
 
 
-def generate_chaos(result, expression):
+def generate_chaos(result, expression, allow_db=True, session_id=None):
     """
     Main chaos generator.
-    Randomly selects one of the 20 output modes and returns chaotic response.
+    Randomly selects one of the enabled output modes (see chaos_modes/) and returns chaotic response.
     
     Args:
         result: The actual calculated math result (float/int)
         expression: The original expression string
+        allow_db: If False, skip the modes that read from the database
+        session_id: Who's asking (for modes that know you personally)
     
     Returns:
         dict: Chaotic response with mode and output
     """
     
     # First, check for result-based easter eggs (30% chance to trigger)
-    if random.random() < 0.3:
-        result_egg = check_result_easter_eggs(result, expression)
+    if rng.random() < 0.3:
+        with tracer.span('check_result_easter_eggs'):
+            result_egg = check_result_easter_eggs(result, expression)
         if result_egg:
             return result_egg
     
-    # All 20 chaos modes!
-    modes = [
-        # Original modes (1-7)
-        lambda: mode_gaslighting(result),
-        lambda: mode_unit_converter(result),
-        lambda: mode_literal_interpreter(result, expression),
-        lambda: mode_time_traveler(),
-        lambda: mode_financial_advisor(expression),
-        lambda: mode_nonsense_quote(),
-        lambda: mode_pure_nonsense(),
-        # Personality modes (8-11)
-        lambda: mode_procrastinator(result),
-        lambda: mode_passive_aggressive(result),
-        lambda: mode_conspiracy_theorist(result, expression),
-        lambda: mode_oversharer(),
-        # Text & Output Pranks (12-20)
-        lambda: mode_existential_crisis(result),
-        lambda: mode_wrong_language(result),
-        lambda: mode_sarcastic_compliments(result),
-        lambda: mode_fortune_cookie(),
-        lambda: mode_union_strike(expression),
-        lambda: mode_maintenance(),
-        lambda: mode_version_update(result),
-        lambda: mode_leaderboard_shame(),
-        lambda: mode_dramatic_reading(result),
-    ]
-    
-    # Randomly select a mode
-    selected_mode = random.choice(modes)
-    chaos_result = selected_mode()
+    # Under load, stay away from the modes that hit the database
+    # (content served from the pack doesn't touch it)
+    with tracer.span('chaos.select', **{'chaos.allow_db': allow_db}) as span:
+        mode, run = mode_registry.select(rng, allow_db=allow_db, from_pack=content.from_pack)
+        span.set(**{'chaos.mode': mode.name if mode else None})
+    if run is None:
+        return {
+            "mode": "boring",
+            "output": str(result),
+            "actual_result": result,
+            "input": expression,
+            "message": "Every chaos mode has been disabled. Enjoy your correct answer, I guess."
+        }
+    with tracer.span('chaos.mode') as span:
+        chaos_result = run(ChaosRequest(result, expression, session_id, content, leaderboard))
+        span.set(**{'chaos.mode': chaos_result.get('mode')})
     
     # Always include the actual result (for debugging or easter eggs)
     if "actual_result" not in chaos_result or chaos_result["actual_result"] is None:
@@ -914,40 +435,41 @@ def generate_chaos(result, expression):
     return chaos_result
 
 
+# What safe_eval() lets through: built once (in the prefork master), not per call
+SAFE_EVAL_CHARS = frozenset('0123456789+-*/.() ')
+SAFE_EVAL_NAMES = {
+    'sqrt': math.sqrt,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'log': math.log10,
+    'ln': math.log,
+    'pi': math.pi,
+    'e': math.e,
+    'abs': abs,
+    'pow': pow,
+}
+
+
 def safe_eval(expression):
     """
     Safely evaluate a mathematical expression.
     Only allows numbers and basic math operations.
     """
-    # Define allowed characters and functions
-    allowed_chars = set('0123456789+-*/.() ')
-    allowed_names = {
-        'sqrt': math.sqrt,
-        'sin': math.sin,
-        'cos': math.cos,
-        'tan': math.tan,
-        'log': math.log10,
-        'ln': math.log,
-        'pi': math.pi,
-        'e': math.e,
-        'abs': abs,
-        'pow': pow,
-    }
-    
     # Clean the expression
     clean_expr = expression.replace('^', '**').replace('×', '*').replace('÷', '/')
     
     # Check for disallowed characters (excluding function names)
     expr_without_funcs = clean_expr
-    for func_name in allowed_names.keys():
+    for func_name in SAFE_EVAL_NAMES:
         expr_without_funcs = expr_without_funcs.replace(func_name, '')
     
-    if not all(c in allowed_chars for c in expr_without_funcs):
+    if not all(c in SAFE_EVAL_CHARS for c in expr_without_funcs):
         raise ValueError("Invalid characters in expression")
     
     try:
-        # Evaluate with limited namespace
-        result = eval(clean_expr, {"__builtins__": {}}, allowed_names)
+        # Evaluate with limited namespace (a copy: eval gets its own locals)
+        result = eval(clean_expr, {"__builtins__": {}}, dict(SAFE_EVAL_NAMES))
         return float(result)
     except ZeroDivisionError:
         # Re-raise ZeroDivisionError to be caught by calculate() for black hole easter egg
@@ -960,15 +482,84 @@ def safe_eval(expression):
 # STATIC FILE ROUTES (Serve Frontend)
 # =============================================================================
 
+assets = build_assets(app.static_folder) if app.config['ASSET_PIPELINE'] else {}
+
+
+def serve_asset(asset):
+    """An in-memory asset, honouring Accept-Encoding and If-None-Match."""
+    encoding, body, etag = asset.pick(request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, content_type=asset.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = asset.cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+audio_clips = load_clips(app.static_folder)
+
+
+def serve_clip(clip):
+    """
+    A memory-mapped audio file with conditional GET and single byte ranges.
+    Multi-range requests get the whole file, which the spec allows.
+    """
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(clip.etag)
+    else:
+        not_modified = bool(request.if_modified_since and
+                            request.if_modified_since >= clip.last_modified)
+    
+    byte_range = request.range
+    if byte_range and 'If-Range' in request.headers and not (
+            request.if_range.etag == clip.etag or request.if_range.date == clip.last_modified):
+        byte_range = None  # stale If-Range: send the whole (new) file
+    if byte_range and len(byte_range.ranges) > 1:
+        byte_range = None
+    
+    if not_modified:
+        response = Response(status=304)
+    elif byte_range:
+        span = byte_range.range_for_length(clip.size)
+        if span is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{clip.size}'
+        else:
+            start, stop = span
+            response = Response(clip.slice(start, stop), status=206, content_type=clip.content_type)
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{clip.size}'
+    else:
+        # Whole file: let the server sendfile() it if it can
+        response = Response(wrap_file(request.environ, clip.open()), content_type=clip.content_type,
+                            direct_passthrough=True)
+        response.headers['Content-Length'] = str(clip.size)
+    
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['ETag'] = f'"{clip.etag}"'
+    response.last_modified = clip.last_modified
+    response.headers['Cache-Control'] = AUDIO_CACHE_CONTROL
+    return response
+
+
 @app.route('/')
 def serve_index():
     """Serve the main index.html file."""
+    if '' in assets:
+        return serve_asset(assets[''])
     return send_from_directory(app.static_folder, 'index.html')
 
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve other static files (CSS, JS, etc.)."""
+    if path in assets:
+        return serve_asset(assets[path])
+    if path in audio_clips:
+        return serve_clip(audio_clips[path])
     return send_from_directory(app.static_folder, path)
 
 
@@ -976,15 +567,115 @@ def serve_static(path):
 # API ROUTES
 # =============================================================================
 
+@app.before_request
+def start_request_replay_hooks():
+    """Per-request RNG seed (replay only) and start time (recording)."""
+    if request.endpoint != 'calculate':
+        return
+    g.request_started = time.time()
+    seed = request.headers.get('X-Replay-Seed')
+    if seed is not None and app.config['REPLAY_SEEDING']:
+        seed_request(seed)
+
+
+@app.after_request
+def record_request(response):
+    """Append /api/calculate requests to the replay log, if recording."""
+    # Replayed traffic is not recorded again
+    if (recorder is not None and request.endpoint == 'calculate'
+            and 'X-Replay-Seed' not in request.headers):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        recorder.record(
+            started_at=g.request_started,
+            expression=data.get('expression'),
+            session_id=data.get('session_id'),
+            duration_ms=(time.time() - g.request_started) * 1000,
+            status=response.status_code
+        )
+    return response
+
+
+@app.teardown_request
+def end_request_seed(exc):
+    # Threads get reused across requests; don't leak a replay seed
+    clear_request_seed()
+
+
+# Routes that get a trace (when tracing is on)
+TRACED_ENDPOINTS = {
+    'calculate', 'memory_save', 'memory_recall', 'memory_count',
+    'get_stats', 'get_unique_visitors', 'get_stats_history',
+}
+
+
+@app.before_request
+def start_request_trace():
+    if request.endpoint in TRACED_ENDPOINTS:
+        g.trace = tracer.start_trace(f'{request.method} {request.url_rule.rule}', **{
+            'http.method': request.method,
+            'http.route': request.url_rule.rule,
+        })
+
+
+@app.after_request
+def tag_request_trace(response):
+    g.get('trace', NOOP_SPAN).set(**{'http.status_code': response.status_code})
+    return response
+
+
+@app.teardown_request
+def end_request_trace(exc):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tracer.end_trace(trace, exc)
+
+
+# What an unhandled exception answers, here and in asgi.py
+INTERNAL_ERROR = {
+    'error': 'Internal error',
+    'message': 'Something broke, and for once it wasn\'t on purpose.'
+}
+
+
+@app.errorhandler(500)
+def internal_error(e):
+    return jsonify(INTERNAL_ERROR), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint to verify the server is running."""
+    breaker_states = {name: breaker.snapshot() for name, breaker in breakers.items()}
+    degraded = any(b['state'] != 'closed' for b in breaker_states.values())
     return jsonify({
-        'status': 'ok',
-        'message': 'The Useless Calculator backend is running!'
+        'status': 'degraded' if degraded else 'ok',
+        'message': 'The Useless Calculator backend is running!',
+        'breakers': breaker_states
     })
 
 
+def record_stats(sevens_pressed, time_wasted, session_id=None):
+    """Count one calculation towards the Useless Leaderboard (and the session's rank)."""
+    def count():
+        storage.incr_stats(
+            sevens_pressed=sevens_pressed,
+            calculations_performed=1,
+            time_wasted=time_wasted
+        )
+        if session_id:
+            leaderboard.record(session_id, sevens_pressed)
+
+    try:
+        with tracer.span('stats.commit', **{'stats.backend': storage.name}):
+            breakers['stats'].call(count)
+    except CircuitOpenError:
+        pass  # Storage is struggling; this calculation is lost to the void
+    except Exception as e:
+        print(f'Stats update error: {e}')
+
+
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
     """
@@ -993,7 +684,8 @@ def calculate():
     
     Request body:
     {
-        "expression": "2 + 2"
+        "expression": "2 + 2",
+        "session_id": "optional-user-session-id"
     }
     
     Response:
@@ -1004,9 +696,204 @@ def calculate():
         "actual_result": 4
     }
     """
-    try:
-        data = request.get_json()
+    with tracer.span('json.parse'):
+        data = request.get_json(silent=True)
+    payload, status, retry_after = run_calculation(data, request.remote_addr)
+    response = jsonify(payload)
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status
+
+
+# Longest session_id we accept (the frontend's are ~20 characters; the DB columns hold 50)
+MAX_SESSION_ID_LENGTH = 50
+
+
+def clean_session_id(session_id):
+    """session_id if it's a usable one (a non-empty, short string), otherwise None."""
+    if isinstance(session_id, str) and 0 < len(session_id) <= MAX_SESSION_ID_LENGTH:
+        return session_id
+    return None
+
+
+def run_calculation(data, client_address):
+    """
+    Admission, chaos and bookkeeping for one calculation, shared by the HTTP
+    endpoint and the WebSocket channel.
+    Returns (payload, status, retry_after) - retry_after is set only on 429.
+    """
+    session_key = None
+    if isinstance(data, dict):
+        session_key = clean_session_id(data.get('session_id'))
+        if data.get('session_id') is not session_key:
+            # Anything else (a number, a list, a novel) counts as no session at all,
+            # for every consumer downstream too: chaos modes, stats, leaderboard
+            data = {**data, 'session_id': session_key}
+    
+    ticket, retry_after = admission.admit(session_key or client_address)
+    visitors.add(session_key or client_address)  # turned away or not, they were here
+    if ticket is None:
+        payload = {
+            'output': "Whoa there, speed demon. The calculator needs a breather. 🐢",
+            'message': 'Too many calculations. Slow down.',
+            'input': data.get('expression', '') if isinstance(data, dict) else '',
+            'mode': 'rate_limited',
+            'actual_result': None
+        }
+        usage.record(payload)
+        return payload, 429, retry_after
+    
+    if isinstance(data, dict):
+        trending.add(data.get('expression'))
+    with ticket:
+        if ticket.stage >= STAGE_CANNED:
+            payload = overloaded_response(data)
+        else:
+            payload = process_calculation(
+                data,
+                allow_db=ticket.stage < STAGE_DB_FREE_CHAOS,
+                count_stats=ticket.stage < STAGE_NO_STATS
+            )
+    tracer.root().set(**{
+        'chaos.mode': payload.get('mode'),
+        'chaos.easter_egg': payload.get('easter_egg'),
+        'admission.stage': ticket.stage,
+    })
+    if session_key:
+        expression = data.get('expression')
+        sessions.record(session_key, expression, payload.get('actual_result'),
+                        expression.count('7') if isinstance(expression, str) else 0)
+    usage.record(payload)
+    return payload, 200, None
+
+
+if Sock is not None:
+    sock = Sock(app)
+    
+    @sock.route('/api/ws')
+    def calculate_socket(ws):
+        """
+        The same calculations over one long-lived WebSocket.
+        
+        Client frames: {"id": 1, "expression": "2 + 2", "session_id": "..."}
+        Server frames: {"id": 1, "status": 200, "payload": {...same as /api/calculate...}}
         
+        Clients may pipeline as many frames as they like; they are answered in
+        order, one at a time. We only read the next frame once the previous
+        answer is sent, so a client that outruns us is held back by TCP itself.
+        """
+        while True:
+            ws.send(socket_frame(ws.receive(), request.remote_addr))
+
+
+def socket_frame(raw, client_address):
+    """
+    Answer one WebSocket frame (the JSON text of the reply). Shared by the
+    flask-sock channel and the ASGI server's.
+    """
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        data = None
+    if not isinstance(data, dict):
+        return json.dumps({
+            'id': None,
+            'status': 400,
+            'payload': {
+                'error': 'Invalid frame',
+                'message': 'Send JSON like {"id": 1, "expression": "2 + 2"}. We are not mind readers.'
+            }
+        })
+    
+    if data.get('type') == 'partial':
+        # Keystrokes: no DB, no stats, nothing to clean up
+        return json.dumps({'id': data.get('id'), 'status': 200, 'payload': partial_preview(data)})
+    try:
+        with tracer.trace('WS /api/ws', **{'rpc.system': 'websocket'}) as trace:
+            payload, status, retry_after = run_calculation(data, client_address)
+            trace.set(**{'http.status_code': status})
+    finally:
+        # One connection, many calculations: don't let one DB session live forever
+        db.session.remove()
+    frame = {'id': data.get('id'), 'status': status, 'payload': payload}
+    if retry_after is not None:
+        frame['retry_after'] = max(1, math.ceil(retry_after))
+    return json.dumps(frame)
+
+
+PARTIAL_TEASERS = [
+    'Probably {value}. Keep typing, it only gets worse.',
+    'So far: {value}. Allegedly.',
+    'Current guess: {value} (subject to chaos)',
+    '{value}? Bold of you to assume.',
+    'Trending towards {value}...',
+]
+
+
+@app.route('/api/calculate/partial', methods=['POST'])
+def calculate_partial():
+    """
+    Live preview while typing. Same body as /api/calculate (plus the same
+    session_id on every keystroke, so the parsed prefix can be reused).
+    Never touches the database, the stats or the chaos budget.
+    """
+    return jsonify(partial_preview(request.get_json(silent=True)))
+
+
+def partial_preview(data):
+    expression = data.get('expression') if isinstance(data, dict) else None
+    if not isinstance(expression, str) or not expression.strip():
+        return {'input': '', 'preview': '', 'partial_result': None, 'complete': False}
+    
+    result = partials.evaluate(expression, clean_session_id(data.get('session_id')))
+    value = result['value']
+    if result['error'] == 'black_hole':
+        preview = 'A black hole is forming... 🕳️'
+    elif result['error']:
+        preview = "That's not math. That's a cry for help."
+    elif value is None:
+        preview = '...'
+    elif not math.isfinite(value):
+        preview = 'To infinity and beyond! 🚀'
+        value = None
+    else:
+        shown = int(value) if value.is_integer() and abs(value) < 1e15 else round(value, 6)
+        preview = rng.choice(PARTIAL_TEASERS).format(value=shown)
+    return {
+        'input': expression,
+        'preview': preview,
+        'partial_result': value,
+        'complete': result['complete'],
+    }
+
+
+def overloaded_response(data):
+    """The cheap canned response served when we're shedding load."""
+    return {
+        'output': 'Math.exe has stopped working 💀',
+        'message': 'The calculator is overwhelmed. Please try again later.',
+        'input': data.get('expression', '') if isinstance(data, dict) else '',
+        'mode': 'overloaded',
+        'actual_result': None
+    }
+
+
+def process_calculation(data, allow_db=True, count_stats=True, record=None):
+    """
+    The whole calculator pipeline for one request body:
+    easter eggs -> safe_eval -> generate_chaos -> stats.
+    Always returns a response dict; errors become funny responses too.
+    
+    Args:
+        data: The parsed JSON body ({"expression": ...})
+        allow_db: If False, only chaos modes that don't query the database
+        count_stats: If False, the Useless Leaderboard is not updated
+        record: Counts the calculation instead of record_stats (same arguments),
+                e.g. batch.py adding up a whole chunk before writing it
+    """
+    record = record or record_stats
+    expression = ''
+    try:
         # Handle missing or invalid JSON body
         if not data or 'expression' not in data:
             empty_responses = [
@@ -1016,15 +903,16 @@ def calculate():
                 "Error 0: Zero input detected. Zero effort returned.",
                 "*taps microphone* Is this thing on?",
             ]
-            return jsonify({
-                'output': random.choice(empty_responses),
+            return {
+                'output': rng.choice(empty_responses),
                 'message': 'No expression provided',
                 'input': '',
                 'mode': 'empty_input',
                 'actual_result': None
-            }), 200
+            }
         
         expression = data.get('expression', '').strip()
+        session_id = data.get('session_id')
         
         # Handle empty expression
         if not expression:
@@ -1036,72 +924,53 @@ def calculate():
                 "🦗 *cricket sounds* 🦗",
                 "The calculator awaits your numerical offerings.",
             ]
-            return jsonify({
-                'output': random.choice(empty_responses),
+            return {
+                'output': rng.choice(empty_responses),
                 'message': 'Empty expression',
                 'input': expression,
                 'mode': 'empty_input',
                 'actual_result': None
-            }), 200
+            }
         
         # =====================================================
         # PRIORITY: Check for Easter Eggs BEFORE doing math
         # =====================================================
-        easter_egg_response = check_easter_eggs(expression)
+        with tracer.span('check_easter_eggs'):
+            easter_egg_response = check_easter_eggs(expression)
         if easter_egg_response:
             # Update stats even for easter eggs
-            try:
-                stats = GlobalStats.query.first()
-                if stats:
-                    stats.sevens_pressed += expression.count('7')
-                    stats.calculations_performed += 1
-                    stats.time_wasted += random.randint(5, 30)
-                    db.session.commit()
-            except Exception as e:
-                print(f'Stats update error: {e}')
-            return jsonify(easter_egg_response)
+            if count_stats:
+                record(expression.count('7'), rng.randint(5, 30), session_id)
+            return easter_egg_response
         
         # =====================================================
         # Try to calculate the math (with special error handling)
         # =====================================================
         try:
-            result = safe_eval(expression)
+            with tracer.span('safe_eval'):
+                result = safe_eval(expression)
         except ZeroDivisionError:
             # Special Easter Egg: Division by zero = Black Hole
-            try:
-                stats = GlobalStats.query.first()
-                if stats:
-                    stats.calculations_performed += 1
-                    stats.time_wasted += random.randint(10, 60)  # Black holes waste more time
-                    db.session.commit()
-            except Exception as e:
-                print(f'Stats update error: {e}')
-            return jsonify({
+            if count_stats:
+                record(0, rng.randint(10, 60), session_id)  # Black holes waste more time
+            return {
                 'output': "You've created a black hole. Thanks. 🕳️",
                 'message': "DIVISION BY ZERO DETECTED",
                 'input': expression,
                 'mode': 'easter_egg',
                 'actual_result': float('inf'),
                 'easter_egg': 'black_hole'
-            })
+            }
         
         # Generate chaotic response
-        chaos_response = generate_chaos(result, expression)
+        chaos_response = generate_chaos(result, expression, allow_db=allow_db, session_id=session_id)
         
         # Update Global Stats (The Useless Leaderboard)
-        try:
-            stats = GlobalStats.query.first()
-            if stats:
-                # Count how many 7s appear in the input
-                sevens_count = expression.count('7')
-                stats.sevens_pressed += sevens_count
-                stats.calculations_performed += 1
-                stats.time_wasted += random.randint(5, 30)  # Random 5-30 seconds "wasted"
-                db.session.commit()
-        except Exception as e:
-            print(f'Stats update error: {e}')
+        # Count how many 7s appear in the input, plus a random 5-30 seconds "wasted"
+        if count_stats:
+            record(expression.count('7'), rng.randint(5, 30), session_id)
         
-        return jsonify(chaos_response)
+        return chaos_response
     
     except ValueError as e:
         # Return a funny response for invalid expressions (200 OK, not 400)
@@ -1114,22 +983,22 @@ def calculate():
             "Nice try, human. That's not math. 🤖",
             "I'm a calculator, not a miracle worker! 🧙",
         ]
-        return jsonify({
-            'output': random.choice(funny_errors),
+        return {
+            'output': rng.choice(funny_errors),
             'message': str(e),
-            'input': expression if 'expression' in dir() else '',
+            'input': expression,
             'mode': 'invalid_input',
             'actual_result': None
-        }), 200
+        }
     except Exception as e:
         # Catch-all for any unexpected errors (still return 200 with funny message)
-        return jsonify({
+        return {
             'output': 'Something went wrong in the chaos engine 🔥',
             'message': str(e),
-            'input': expression if 'expression' in dir() else '',
+            'input': expression,
             'mode': 'chaos_error',
             'actual_result': None
-        }), 200
+        }
 
 
 # =============================================================================
@@ -1147,30 +1016,31 @@ def memory_save():
         "session_id": "optional-user-session-id"
     }
     """
-    data = request.get_json()
-    
-    if not data or 'value' not in data:
-        return jsonify({
+    payload, status = save_memory(request.get_json())
+    return jsonify(payload), status
+
+
+def save_memory(data):
+    """M+ for an already-parsed body; shared with the ASGI server. Returns (payload, status)."""
+    if not isinstance(data, dict) or 'value' not in data:
+        return {
             'error': 'No value provided',
             'message': 'Please send a JSON body with a "value" field.'
-        }), 400
+        }, 400
     
     value = str(data.get('value', ''))
-    session_id = data.get('session_id', None)
+    session_id = clean_session_id(data.get('session_id'))
     
     # Save to global memory
-    new_memory = GlobalMemory(
-        value=value,
-        user_session=session_id
-    )
-    db.session.add(new_memory)
-    db.session.commit()
+    saved = storage.memory_save(value, session_id)
+    if recall_index is not None:
+        recall_index.add(saved['id'], saved['saved_at'], session_id)
     
-    return jsonify({
+    return {
         'success': True,
         'message': f'Value "{value}" has been saved to the void.',
         'warning': 'You may never see this number again.'
-    })
+    }, 200
 
 
 @app.route('/api/memory/recall', methods=['GET'])
@@ -1178,57 +1048,113 @@ def memory_recall():
     """
     MR (Memory Recall) - Get a RANDOM value from the global pool.
     You will NOT get your own number back (unless you're very unlucky).
+    
+    Query params: session_id, weighting ('uniform' | 'recent', default from config)
     """
     # Get optional session_id to try to exclude user's own values
     session_id = request.args.get('session_id', None)
+    weighting = request.args.get('weighting', app.config['RECALL_WEIGHTING'])
+    return jsonify(recall_memory(session_id, weighting))
+
+
+def recall_memory(session_id=None, weighting='uniform'):
+    """MR payload; shared with the ASGI server."""
+    session_id = clean_session_id(session_id)
+    random_memory = None
+    if weighting == 'recent' and recall_index is not None:
+        memory_id = recall_index.sample_id(session_id)
+        if memory_id is not None:
+            random_memory = storage.memory_get(memory_id)
+    if random_memory is None:
+        # Someone else's memory if possible, any memory otherwise
+        random_memory = storage.memory_recall(session_id)
+    if random_memory is None:
+        return {
+            'success': False,
+            'value': None,
+            'message': 'The void is empty. No one has saved anything yet.'
+        }
     
-    # Query all memories, optionally excluding the current user's
-    if session_id:
-        # Try to get someone else's memory first
-        other_memories = GlobalMemory.query.filter(
-            GlobalMemory.user_session != session_id
-        ).all()
-        
-        if other_memories:
-            random_memory = random.choice(other_memories)
-        else:
-            # Fallback: if no other memories exist, get any memory
-            all_memories = GlobalMemory.query.all()
-            if all_memories:
-                random_memory = random.choice(all_memories)
-            else:
-                return jsonify({
-                    'success': False,
-                    'value': None,
-                    'message': 'The void is empty. No one has saved anything yet.'
-                })
-    else:
-        # No session provided, just get any random memory
-        all_memories = GlobalMemory.query.all()
-        if not all_memories:
-            return jsonify({
-                'success': False,
-                'value': None,
-                'message': 'The void is empty. No one has saved anything yet.'
-            })
-        random_memory = random.choice(all_memories)
-    
-    return jsonify({
+    return {
         'success': True,
-        'value': random_memory.value,
+        'value': random_memory['value'],
         'message': 'Retrieved from a stranger\'s memory.',
-        'saved_at': random_memory.saved_at.isoformat()
-    })
+        'saved_at': random_memory['saved_at'].isoformat()
+    }
 
 
 @app.route('/api/memory/count', methods=['GET'])
 def memory_count():
     """Get the total number of memories in the void."""
-    count = GlobalMemory.query.count()
-    return jsonify({
+    return jsonify(count_memories())
+
+
+def count_memories():
+    count = storage.memory_count()
+    return {
         'count': count,
         'message': f'{count} numbers are floating in the void.'
-    })
+    }
+
+
+@app.route('/api/memory/export', methods=['GET'])
+def memory_export():
+    """
+    Stream every memory in the void, oldest first, for the analysts.
+    Query params:
+        format: 'ndjson' (default) | 'csv'
+        since_id: only memories with a larger id (for incremental pulls)
+        since: only memories saved at/after this ISO datetime (UTC)
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({
+            'error': 'Invalid format',
+            'message': 'ndjson or csv. We do not do spreadsheets with feelings.'
+        }), 400
+    try:
+        since_id = int(request.args.get('since_id', 0))
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({
+            'error': 'Invalid filter',
+            'message': 'since_id must be an integer and since an ISO date, e.g. 2024-01-31T12:00:00'
+        }), 400
+    
+    pages = storage.memory_export(since_id, since, page_size=app.config['EXPORT_PAGE_SIZE'])
+    body = export_ndjson(pages) if fmt == 'ndjson' else export_csv(pages)
+    return Response(
+        stream_with_context(body),
+        content_type='application/x-ndjson' if fmt == 'ndjson' else 'text/csv; charset=utf-8',
+        headers={
+            'Content-Disposition': f'attachment; filename=void.{fmt}',
+            'Cache-Control': 'no-store',
+        }
+    )
+
+
+def export_ndjson(pages):
+    for page in pages:
+        yield ''.join(json.dumps({
+            'id': memory_id,
+            'value': value,
+            'saved_at': saved_at.isoformat() if saved_at else None
+        }) + '\n' for memory_id, value, saved_at in page)
+
+
+def export_csv(pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('id', 'value', 'saved_at'))
+    for page in pages:
+        for memory_id, value, saved_at in page:
+            writer.writerow((memory_id, value, saved_at.isoformat() if saved_at else ''))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # An empty void still gets its header row
+    yield buffer.getvalue()
 
 
 # =============================================================================
@@ -1244,20 +1170,27 @@ def get_stats():
         "sevens_pressed": int,
         "calculations_performed": int,
         "time_wasted": int (seconds),
-        "time_wasted_formatted": str (human readable)
+        "time_wasted_formatted": str (human readable),
+        "unique_humans": int (HyperLogLog estimate, ~2% error)
     }
     """
-    stats = GlobalStats.query.first()
+    return jsonify(stats_payload())
+
+
+def stats_payload():
+    """The /api/stats body; shared with the ASGI server (and its live ticker)."""
+    stats = storage.get_stats()
     if not stats:
-        return jsonify({
+        return {
             'sevens_pressed': 0,
             'calculations_performed': 0,
             'time_wasted': 0,
-            'time_wasted_formatted': '0 seconds'
-        })
+            'time_wasted_formatted': '0 seconds',
+            'unique_humans': visitors.count()
+        }
     
     # Format time wasted in human readable format
-    seconds = stats.time_wasted
+    seconds = stats['time_wasted']
     if seconds < 60:
         time_str = f"{seconds} seconds"
     elif seconds < 3600:
@@ -1270,11 +1203,310 @@ def get_stats():
         days = seconds // 86400
         time_str = f"{days} day{'s' if days != 1 else ''}"
     
+    return {
+        'sevens_pressed': stats['sevens_pressed'],
+        'calculations_performed': stats['calculations_performed'],
+        'time_wasted': stats['time_wasted'],
+        'time_wasted_formatted': time_str,
+        'unique_humans': visitors.count()
+    }
+
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """
+    The real leaderboard: sessions ranked by calculations wasted (ties: sevens).
+    Query params: limit (default 10, max 100), offset (default 0)
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    entries = leaderboard.top(limit, offset)
+    for entry in entries:
+        # Don't hand out other people's session ids
+        entry['player'] = entry.pop('session_id')[:10] + '…'
+    return jsonify({
+        'total_players': len(leaderboard),
+        'leaders': entries,
+        'message': 'The most dedicated time-wasters on Earth.'
+    })
+
+
+@app.route('/api/leaderboard/rank', methods=['GET'])
+def get_leaderboard_rank():
+    """Exact rank of one session: /api/leaderboard/rank?session_id=..."""
+    session_id = clean_session_id(request.args.get('session_id'))
+    standing = leaderboard.rank(session_id) if session_id else None
+    if not standing:
+        return jsonify({
+            'rank': None,
+            'message': (f'You are unranked, or below the top {leaderboard.capacity:,}. Keep pressing.'
+                        if len(leaderboard) > leaderboard.capacity
+                        else 'You are unranked. Press some buttons first.')
+        })
+    return jsonify({
+        **standing,
+        'message': f"You are #{standing['rank']:,} out of {standing['total']:,}. Be proud. Or don't."
+    })
+
+
+@app.route('/api/stats/unique', methods=['GET'])
+def get_unique_visitors():
+    """
+    Unique humans between two UTC dates, from the daily HyperLogLog sketches.
+    Query params: since, until (YYYY-MM-DD, inclusive). Default: the last 7 days.
+    """
+    try:
+        until = request.args.get('until')
+        until = datetime.strptime(until, '%Y-%m-%d') if until else datetime.utcnow()
+        since = request.args.get('since')
+        since = datetime.strptime(since, '%Y-%m-%d') if since else until - timedelta(days=6)
+    except ValueError:
+        return jsonify({
+            'error': 'Invalid date',
+            'message': 'since/until must look like 2024-01-31. Calendars are hard, we know.'
+        }), 400
+    
+    return jsonify({
+        'since': since.strftime('%Y-%m-%d'),
+        'until': until.strftime('%Y-%m-%d'),
+        'unique_humans': visitors.count_range(since, until),
+        'all_time': visitors.count()
+    })
+
+
+@app.route('/api/session', methods=['GET'])
+def get_session():
+    """What this worker remembers about a session: /api/session?session_id=..."""
+    state = sessions.get(clean_session_id(request.args.get('session_id')))
+    if state is None:
+        return jsonify({
+            'session': None,
+            'message': "Never heard of you. That's probably for the best."
+        })
+    state['last_seen'] = datetime.utcfromtimestamp(state['last_seen']).isoformat()
+    return jsonify({
+        'session': state,
+        'message': 'We remember everything. Well, the last few things.'
+    })
+
+
+@app.route('/api/trending', methods=['GET'])
+def get_trending():
+    """
+    Most popular expressions lately (normalized, decayed over time windows).
+    Query params: limit (default 10, max 50)
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), trending.top_k)
+    return jsonify({
+        'window_seconds': trending.window_seconds,
+        'trending': trending.top(limit),
+        'message': 'What the world is miscalculating right now.'
+    })
+
+
+# /api/format limits and defaults
+MAX_FORMAT_NUMBERS = 1000
+MAX_FORMATS = 20
+DEFAULT_FORMATS = ['roman', 'binary', 'hex', 'words']
+
+
+@app.route('/api/format', methods=['POST'])
+def format_numbers():
+    """
+    Format numbers in bulk.
+    Body: {"numbers": [...], "formats": ["roman", "binary", "octal", "hex",
+           "base<2-36>", "words", "words:<language>", ...]}
+    formats defaults to roman, binary, hex and English words.
+    """
+    data = request.get_json(silent=True)
+    numbers = data.get('numbers') if isinstance(data, dict) else None
+    if not isinstance(numbers, list) or not numbers:
+        return jsonify({
+            'error': 'No numbers',
+            'message': 'Send {"numbers": [...]}. We can\'t format your feelings.'
+        }), 400
+    if len(numbers) > MAX_FORMAT_NUMBERS:
+        return jsonify({
+            'error': 'Too many numbers',
+            'message': f'{MAX_FORMAT_NUMBERS} numbers per request. We\'re a calculator, not a printing press.'
+        }), 400
+    
+    specs = data.get('formats') or DEFAULT_FORMATS
+    try:
+        if not isinstance(specs, list) or len(specs) > MAX_FORMATS:
+            raise ValueError(f'formats must be a list of at most {MAX_FORMATS}')
+        formats = [(spec, *parse_format(spec)) for spec in specs]
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid format',
+            'message': f'{e}. Try roman, binary, hex, base7 or words:german.'
+        }), 400
+    
+    if any(kind == 'words' for _, kind, _ in formats) and not all(map(fits_in_words, numbers)):
+        return jsonify({
+            'error': 'Number too long',
+            'message': f'We only spell out numbers up to {MAX_WORD_DIGITS} digits. Nobody has that much time.'
+        }), 400
+    
+    results = []
+    for number in numbers:
+        if isinstance(number, bool) or not isinstance(number, (int, float)):
+            results.append({'number': number, 'formatted': None, 'error': 'Not a number'})
+            continue
+        results.append({'number': number, 'formatted': format_number(number, formats)})
+    return jsonify({
+        'results': results,
+        'languages': list(LANGUAGES),
+        'message': 'Same numbers, new outfits.'
+    })
+
+
+@app.route('/api/stats/history', methods=['GET'])
+def get_stats_history():
+    """
+    Usage over time, read only from the rollup tables.
+    Query params:
+        granularity: 'minute' | 'hour' (default) | 'day'
+        dimension: 'mode' | 'easter_egg' | 'error' (default: all)
+        since / until: ISO datetimes (UTC). since defaults to 60 buckets ago.
+    """
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in GRANULARITIES:
+        return jsonify({
+            'error': 'Invalid granularity',
+            'message': f'Pick one of: {", ".join(GRANULARITIES)}. Time is hard enough already.'
+        }), 400
+    try:
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else (
+            datetime.utcnow() - timedelta(seconds=60 * GRANULARITIES[granularity]))
+        until = request.args.get('until')
+        until = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        return jsonify({
+            'error': 'Invalid date',
+            'message': 'since/until must be ISO dates, e.g. 2024-01-31T12:00:00'
+        }), 400
+    
+    return jsonify({
+        'granularity': granularity,
+        'dimension': request.args.get('dimension'),
+        'since': since.isoformat(),
+        'buckets': usage_history(granularity, request.args.get('dimension'), since, until)
+    })
+
+
+# =============================================================================
+# ADMIN API
+# =============================================================================
+
+def require_admin(view):
+    """Only for requests carrying the configured X-Admin-Token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = app.config['ADMIN_TOKEN']
+        if not expected:
+            return jsonify({
+                'error': 'Admin API disabled',
+                'message': 'Set CALC_ADMIN_TOKEN to enable it. No, "password" is not a good choice.'
+            }), 404
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Nice try. The calculator does not recognize your authority.'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/api/admin/import/<kind>', methods=['POST'])
+@require_admin
+def admin_import(kind):
+    """
+    Stream a CSV or JSONL content pack into quotes / units / nonsense.
+    The body is the file itself; format comes from ?format=csv|jsonl, or the
+    Content-Type (text/csv), defaulting to JSONL. Duplicates are skipped.
+    """
+    if kind not in CONTENT_TYPES:
+        return jsonify({
+            'error': 'Unknown content type',
+            'message': f'Pick one of: {", ".join(sorted(CONTENT_TYPES))}.'
+        }), 400
+    fmt = request.args.get('format') or (
+        'csv' if request.mimetype == 'text/csv' else guess_format(request.args.get('filename')))
+    
+    # Read straight off the socket: the pack is never held in memory whole
+    stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+    try:
+        summary = import_stream(kind, stream, fmt,
+                                progress=lambda s: print(f"Import {kind}: {s['read']:,} rows, "
+                                                         f"{s['rows_per_second']:,.0f} rows/s"))
+    except UnicodeDecodeError:
+        return jsonify({
+            'error': 'Invalid encoding',
+            'message': 'Content packs must be UTF-8.'
+        }), 400
+    return jsonify(summary)
+
+
+@app.route('/api/admin/slow-queries', methods=['GET', 'DELETE'])
+@require_admin
+def admin_slow_queries():
+    """
+    GET: the slow-query ring (newest first) and the statements with the most
+    total time, with their query plans. Query params: limit (default 100).
+    DELETE: start over.
+    """
+    if slow_queries is None:
+        return jsonify({
+            'error': 'Slow-query log disabled',
+            'message': 'CALC_SLOW_QUERY_LOG_SIZE is 0. Every query is fast if you never look.'
+        }), 404
+    if request.method == 'DELETE':
+        slow_queries.clear()
+        return jsonify({'cleared': True, 'message': 'Forgotten. The queries, not the shame.'})
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    entries = slow_queries.entries(limit)
+    return jsonify({
+        'threshold_ms': slow_queries.threshold * 1000,
+        'recorded': slow_queries.recorded,
+        'entries': entries,
+        'statements': slow_queries.statements(),
+        'message': f'{sum(1 for e in entries if e["full_scan"])} of these read a whole table. Just saying.'
+    })
+
+
+@app.route('/api/admin/memory', methods=['GET'])
+@require_admin
+def admin_memory():
+    """
+    RSS/PSS of the gunicorn master and each worker (from /proc smaps_rollup),
+    or of just this process when not running under gunicorn.conf.py.
+    """
+    report = host_report()
+    if not report['workers'] and not report['master']:
+        return jsonify({
+            'error': 'No /proc/<pid>/smaps_rollup here',
+            'message': 'I would tell you how much memory I use, but I forgot.'
+        }), 501
+    report['this_worker'] = os.getpid()
+    shared = sum(w['shared_kb'] for w in report['workers'])
+    rss = sum(w['rss_kb'] for w in report['workers'])
+    report['message'] = f'{shared / rss:.0%} of the workers\' memory is shared. The rest is pure ego.' if rss \
+        else 'No workers, no memory, no problems.'
+    return jsonify(report)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Operational metrics: admission control stage, shedding, rate limiting, session store, loaded modes."""
     return jsonify({
-        'sevens_pressed': stats.sevens_pressed,
-        'calculations_performed': stats.calculations_performed,
-        'time_wasted': stats.time_wasted,
-        'time_wasted_formatted': time_str
+        'admission': admission.metrics(),
+        'sessions': sessions.stats(),
+        'tracing': tracer.exporter.stats() if tracer.enabled else None,
+        'chaos_modes': mode_registry.stats()
     })
 
 
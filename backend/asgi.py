@@ -0,0 +1,543 @@
+"""
+ASGI entry point: the same API from one event loop, for lots of mostly idle
+connections (the live ticker, WebSockets) per process.
+
+    pip install uvicorn
+    cd backend
+    uvicorn asgi:app --port 5000
+
+The hot routes are served natively: /api/calculate (+ /partial), the memory
+routes, /api/stats, the WebSocket channel and the in-memory frontend assets.
+The work behind them (safe_eval, the chaos modes, every database call) runs
+on a bounded thread pool, in the same functions the Flask routes call, so the
+loop itself never waits on SQLite or on a slow expression. Every other route
+(admin, export, audio, ...) goes to the Flask app through a small WSGI bridge
+on the same pool, so nothing is missing, it's just not any faster.
+
+Only here: GET /api/stats/stream, the leaderboard ticker as server-sent
+events. One stats read per interval for the whole process, however many
+clients are listening; an idle client costs a coroutine, not a thread.
+"""
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_accept_header, parse_etags
+
+import app as calculator
+from rng import seed_request, clear_request_seed
+from tracing import NOOP_SPAN
+
+flask_app = calculator.app
+tracer = calculator.tracer
+
+executor = ThreadPoolExecutor(max_workers=flask_app.config['ASGI_THREADS'], thread_name_prefix='asgi')
+# Work queued behind the pool before we start turning requests away
+MAX_QUEUED = flask_app.config['ASGI_THREADS'] * 8
+MAX_BODY = flask_app.config['ASGI_MAX_BODY']
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+
+class _Pool:
+    """The thread pool, plus a count of what's waiting for it."""
+
+    def __init__(self):
+        self.pending = 0
+
+    @property
+    def full(self):
+        return self.pending >= MAX_QUEUED
+
+    async def run(self, fn, *args, trace=None):
+        """
+        fn(*args) on a pool thread, inside an app context. trace: (method,
+        route) to give the call its own request trace, like the Flask routes.
+        """
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, _in_app, fn, args, trace)
+        finally:
+            self.pending -= 1
+
+
+def _in_app(fn, args, trace):
+    with flask_app.app_context():
+        root = NOOP_SPAN
+        if trace:
+            method, route = trace
+            root = tracer.start_trace(f'{method} {route}', **{'http.method': method, 'http.route': route})
+        error = None
+        try:
+            return fn(*args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            tracer.end_trace(root, error)
+
+
+pool = _Pool()
+
+
+# =============================================================================
+# REQUESTS AND RESPONSES
+# =============================================================================
+
+class Request:
+    __slots__ = ('scope', 'receive', '_send', 'started', 'method', 'path', 'headers', 'query', 'client')
+
+    def __init__(self, scope, receive, send):
+        self.scope, self.receive, self._send = scope, receive, send
+        self.started = False  # response headers sent: too late for an error response
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {}
+        for name, value in scope['headers']:
+            name = name.decode('latin-1')
+            value = value.decode('latin-1')
+            self.headers[name] = f'{self.headers[name]}, {value}' if name in self.headers else value
+        self.query = {key: values[0] for key, values in
+                      parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        self.client = scope['client'][0] if scope.get('client') else None
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.started = True
+        await self._send(message)
+
+    async def body(self, limit=MAX_BODY):
+        """The whole body, or None if it's over limit."""
+        chunks, size = [], 0
+        while True:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > limit:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def json(self):
+        """Like Flask's get_json(silent=True): None unless it's a JSON body that parses. False if too big."""
+        body = await self.body()
+        if body is None:
+            return False
+        mimetype = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        if not (mimetype == 'application/json' or (mimetype.startswith('application/')
+                                                   and mimetype.endswith('+json'))):
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+
+def json_body(payload):
+    """Byte for byte what jsonify() sends (outside debug mode)."""
+    return (flask_app.json.dumps(payload, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+async def respond(request, status, body=b'', headers=()):
+    head = request.method == 'HEAD'
+    await request.send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-length', str(len(body)).encode())] + CORS_HEADERS + list(headers),
+    })
+    await request.send({'type': 'http.response.body', 'body': b'' if head else body})
+
+
+async def respond_json(request, payload, status=200, headers=()):
+    await respond(request, status, json_body(payload),
+                  [(b'content-type', b'application/json')] + list(headers))
+
+
+async def too_large(request):
+    await respond_json(request, {
+        'error': 'Request too large',
+        'message': f'Over {MAX_BODY:,} bytes. That is not an expression, that is a novel.'
+    }, 413)
+
+
+async def too_busy(request):
+    await respond_json(request, {
+        'error': 'Overloaded',
+        'message': 'Every calculator thread is busy. Please hold. 🎵 *elevator music* 🎵'
+    }, 503, [(b'retry-after', b'1')])
+
+
+# =============================================================================
+# API ROUTES
+# =============================================================================
+
+def _calculate(data, client, seed, replayed):
+    started = time.time()
+    if seed is not None:
+        seed_request(seed)
+    try:
+        payload, status, retry_after = calculator.run_calculation(data, client)
+    finally:
+        clear_request_seed()
+    tracer.root().set(**{'http.status_code': status})
+    # Replayed traffic is not recorded again
+    if calculator.recorder is not None and not replayed:
+        calculator.recorder.record(
+            started_at=started,
+            expression=data.get('expression') if isinstance(data, dict) else None,
+            session_id=data.get('session_id') if isinstance(data, dict) else None,
+            duration_ms=(time.time() - started) * 1000,
+            status=status
+        )
+    return payload, status, retry_after
+
+
+async def calculate(request):
+    data = await request.json()
+    if data is False:
+        return await too_large(request)
+    if pool.full:
+        # Same canned answer admission control gives when it's shedding load
+        return await respond_json(request, calculator.overloaded_response(data), 200)
+    seed = request.headers.get('x-replay-seed')
+    replayed = seed is not None
+    if not flask_app.config['REPLAY_SEEDING']:
+        seed = None
+    payload, status, retry_after = await pool.run(_calculate, data, request.client, seed, replayed,
+                                                  trace=('POST', '/api/calculate'))
+    headers = []
+    if retry_after is not None:
+        headers.append((b'retry-after', str(max(1, int(-(-retry_after // 1)))).encode()))
+    await respond_json(request, payload, status, headers)
+
+
+async def calculate_partial(request):
+    data = await request.json()
+    if data is False:
+        return await too_large(request)
+    # Pure parsing, microseconds: not worth a thread hop
+    await respond_json(request, calculator.partial_preview(data))
+
+
+async def memory_save(request):
+    data = await request.json()
+    if data is False:
+        return await too_large(request)
+    if pool.full:
+        return await too_busy(request)
+    payload, status = await pool.run(calculator.save_memory, data, trace=('POST', '/api/memory/save'))
+    await respond_json(request, payload, status)
+
+
+async def memory_recall(request):
+    if pool.full:
+        return await too_busy(request)
+    weighting = request.query.get('weighting', flask_app.config['RECALL_WEIGHTING'])
+    await respond_json(request, await pool.run(calculator.recall_memory, request.query.get('session_id'),
+                                               weighting, trace=('GET', '/api/memory/recall')))
+
+
+async def memory_count(request):
+    if pool.full:
+        return await too_busy(request)
+    await respond_json(request, await pool.run(calculator.count_memories, trace=('GET', '/api/memory/count')))
+
+
+async def stats(request):
+    if pool.full:
+        return await too_busy(request)
+    await respond_json(request, await pool.run(calculator.stats_payload, trace=('GET', '/api/stats')))
+
+
+class Ticker:
+    """
+    Reads the stats every interval while anyone is listening, and hands the
+    same encoded event to every subscriber. A slow subscriber only ever has
+    the latest event waiting, never a backlog.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.subscribers = set()
+        self.latest = None
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def _run(self):
+        while self.subscribers:
+            started = time.monotonic()
+            try:
+                payload = await pool.run(calculator.stats_payload)
+            except Exception as e:
+                print(f'Ticker error: {e}')
+            else:
+                event = b'data: ' + json_body(payload).rstrip(b'\n') + b'\n\n'
+                self.latest = event
+                for queue in self.subscribers:
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(event)
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        self.latest = None  # stale by the time anyone subscribes again
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+ticker = Ticker(flask_app.config['TICKER_INTERVAL'])
+
+
+async def _hang_up(receive, queue):
+    """Wait for the client to leave, then wake its stream with None."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    ticker.unsubscribe(queue)  # first, so the ticker can't put an event over the None
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+async def stats_stream(request):
+    """The leaderboard ticker: a server-sent event with the /api/stats body every interval."""
+    await request.send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-store'),
+            (b'x-accel-buffering', b'no'),  # nginx: don't sit on the events
+        ] + CORS_HEADERS,
+    })
+    queue = ticker.subscribe()
+    watcher = asyncio.ensure_future(_hang_up(request.receive, queue))
+    try:
+        await request.send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        # No keepalives needed: there's an event every interval
+        while (event := await queue.get()) is not None:
+            await request.send({'type': 'http.response.body', 'body': event, 'more_body': True})
+    finally:
+        ticker.unsubscribe(queue)
+        watcher.cancel()
+
+
+ROUTES = {
+    ('POST', '/api/calculate'): calculate,
+    ('POST', '/api/calculate/partial'): calculate_partial,
+    ('POST', '/api/memory/save'): memory_save,
+    ('GET', '/api/memory/recall'): memory_recall,
+    ('GET', '/api/memory/count'): memory_count,
+    ('GET', '/api/stats'): stats,
+    ('GET', '/api/stats/stream'): stats_stream,
+}
+
+
+# =============================================================================
+# STATIC FILES
+# =============================================================================
+
+async def serve_asset(request, asset):
+    """An in-memory asset, exactly as the Flask route serves it."""
+    encoding, body, etag = asset.pick(parse_accept_header(request.headers.get('accept-encoding')))
+    headers = [
+        (b'etag', f'"{etag}"'.encode()),
+        (b'cache-control', asset.cache_control.encode()),
+        (b'vary', b'Accept-Encoding'),
+    ]
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return await respond(request, 304, b'', headers)
+    headers.append((b'content-type', asset.content_type.encode()))
+    if encoding != 'identity':
+        headers.append((b'content-encoding', encoding.encode()))
+    await respond(request, 200, body, headers)
+
+
+# =============================================================================
+# WSGI BRIDGE (everything else goes to Flask)
+# =============================================================================
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input for a pool thread, pulling body chunks from the event loop as Flask reads."""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b''
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._done = True
+            else:
+                self._buffer = message.get('body', b'')
+                self._done = not message.get('more_body')
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _environ(request, loop):
+    scope = request.scope
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': request.path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': request.client or '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(_RequestBody(request.receive, loop)),
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    return environ
+
+
+async def wsgi_bridge(request):
+    loop = asyncio.get_running_loop()
+    environ = _environ(request, loop)
+    started = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                              for name, value in headers]
+        return written.append
+
+    def next_chunk(chunks):
+        for chunk in chunks:
+            if chunk:
+                return chunk
+        return None
+
+    pool.pending += 1
+    try:
+        result = await loop.run_in_executor(executor, flask_app, environ, start_response)
+        chunks = iter(result)
+        try:
+            # The first chunk, so a generator-based response has called start_response
+            chunk = await loop.run_in_executor(executor, next_chunk, chunks)
+            await request.send({'type': 'http.response.start', 'status': started['status'],
+                                'headers': started['headers']})
+            if written:
+                await request.send({'type': 'http.response.body', 'body': b''.join(written), 'more_body': True})
+            while chunk is not None:
+                await request.send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(executor, next_chunk, chunks)
+            await request.send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(executor, result.close)
+    finally:
+        pool.pending -= 1
+
+
+# =============================================================================
+# WEBSOCKET
+# =============================================================================
+
+async def calculate_socket(scope, receive, send):
+    """/api/ws, frame for frame what the flask-sock channel answers."""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'] != '/api/ws':
+        await send({'type': 'websocket.close', 'code': 1008})
+        return
+    await send({'type': 'websocket.accept'})
+    client = scope['client'][0] if scope.get('client') else None
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+        raw = message.get('text')
+        if raw is None:
+            raw = (message.get('bytes') or b'').decode('utf-8', 'replace')
+        if len(raw) > flask_app.config['SOCK_SERVER_OPTIONS']['max_message_size']:
+            await send({'type': 'websocket.close', 'code': 1009})
+            return
+        # One frame at a time, in order: a client that outruns us waits on TCP, as before
+        await send({'type': 'websocket.send', 'text': await pool.run(calculator.socket_frame, raw, client)})
+
+
+# =============================================================================
+# THE ASGI APP
+# =============================================================================
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            ticker.stop()
+            executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def dispatch(request):
+    route = ROUTES.get((request.method, request.path))
+    if route is not None:
+        return await route(request)
+    if request.method in ('GET', 'HEAD'):
+        asset = calculator.assets.get(request.path[1:])
+        if asset is not None:
+            return await serve_asset(request, asset)
+    return await wsgi_bridge(request)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http':
+        request = Request(scope, receive, send)
+        try:
+            return await dispatch(request)
+        except Exception as e:
+            # What Flask does with an exception in a route: log it, answer a JSON 500
+            flask_app.logger.error(f'Exception on {request.path} [{request.method}]', exc_info=e)
+            if request.started:
+                raise  # mid-response: all the server can do is drop the connection
+            return await respond_json(request, calculator.INTERNAL_ERROR, 500)
+    if scope['type'] == 'websocket':
+        return await calculate_socket(scope, receive, send)
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
@@ -0,0 +1,238 @@
+"""
+Static asset pipeline, run once at startup.
+
+script.js and style.css are minified, fingerprinted (script.<hash>.js) and
+precompressed; index.html is rewritten to point at the fingerprinted names.
+Everything is then served from memory: fingerprinted files are cached
+forever ("immutable"), index.html is revalidated with a strong ETag.
+Anything the pipeline doesn't know about (the mp3s) is left to the caller.
+
+The minifiers are deliberately conservative: comments and indentation go,
+newlines stay, so automatic semicolon insertion behaves exactly as before.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MINIFIABLE = {'.js', '.css'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# After one of these, a '/' starts a regex literal rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|\s*([{};,>])\s*|\s+')
+_HTML_REF = re.compile(r'((?:href|src)=")([^"#?]+)(")')
+
+
+# =============================================================================
+# MINIFIERS
+# =============================================================================
+
+def _copy_string(src, i, out):
+    """Copy a '...' or "..." literal starting at src[i]; returns the index after it."""
+    quote = src[i]
+    j = i + 1
+    while j < len(src) and src[j] != quote:
+        j += 2 if src[j] == '\\' else 1
+    out.append(src[i:j + 1])
+    return j + 1
+
+
+def _copy_regex(src, i, out):
+    j = i + 1
+    in_class = False
+    while j < len(src):
+        ch = src[j]
+        if ch == '\\':
+            j += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            break
+        j += 1
+    j += 1
+    while j < len(src) and (src[j].isalpha()):
+        j += 1  # flags
+    out.append(src[i:j])
+    return j
+
+
+def _copy_template(src, i, out):
+    """Copy a `template` literal as one chunk, minifying the code inside ${...}."""
+    parts = ['`']
+    j = i + 1
+    while j < len(src) and src[j] != '`':
+        if src[j] == '\\':
+            parts.append(src[j:j + 2])
+            j += 2
+        elif src.startswith('${', j):
+            code = []
+            j = _minify_js_code(src, j + 2, code, until_brace=True)
+            parts.append('${' + _join_js(code).strip() + '}')
+        else:
+            parts.append(src[j])
+            j += 1
+    parts.append('`')
+    out.append(''.join(parts))
+    return j + 1
+
+
+def _starts_regex(out):
+    # Identifiers arrive one character per chunk, so look back over the last few
+    tail = ''.join(out[-12:]).rstrip()
+    if not tail or tail[-1] in _REGEX_PRECEDERS:
+        return True
+    word = re.search(r'[\w$]*$', tail).group()
+    return word in _REGEX_KEYWORDS
+
+
+def _minify_js_code(src, i, out, until_brace=False):
+    depth = 0
+    while i < len(src):
+        ch = src[i]
+        if until_brace:
+            if ch == '{':
+                depth += 1
+            elif ch == '}':
+                if depth == 0:
+                    return i + 1
+                depth -= 1
+        if ch in '\'"':
+            i = _copy_string(src, i, out)
+        elif ch == '`':
+            i = _copy_template(src, i, out)
+        elif src.startswith('//', i):
+            end = src.find('\n', i)
+            i = len(src) if end == -1 else end
+        elif src.startswith('/*', i):
+            end = src.find('*/', i + 2)
+            i = len(src) if end == -1 else end + 2
+            out.append(' ')
+        elif ch == '/' and _starts_regex(out):
+            i = _copy_regex(src, i, out)
+        elif ch in ' \t\r\n':
+            j = i
+            while j < len(src) and src[j] in ' \t\r\n':
+                j += 1
+            out.append('\n' if '\n' in src[i:j] else ' ')
+            i = j
+        else:
+            out.append(ch)
+            i += 1
+    return i
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in '_$' or ord(ch) > 127
+
+
+def _join_js(chunks):
+    """
+    Glue tokens back together. Newlines are kept (one per run); a space is
+    kept only where dropping it would merge two tokens (`let x`, `a + +b`).
+    """
+    result = []
+    pending = None
+    for chunk in chunks:
+        if chunk in (' ', '\n'):
+            if pending != '\n':
+                pending = chunk
+            continue
+        if pending and result:
+            before, after = result[-1][-1], chunk[0]
+            if pending == '\n':
+                result.append('\n')
+            elif (_is_word(before) and _is_word(after)) or (before == after and before in '+-') \
+                    or '/' in (before, after):
+                result.append(' ')
+        pending = None
+        result.append(chunk)
+    return ''.join(result)
+
+
+def minify_js(source):
+    out = []
+    _minify_js_code(source, 0, out)
+    return _join_js(out).strip() + '\n'
+
+
+def minify_css(source):
+    source = _CSS_COMMENT.sub('', source)
+    # Collapse whitespace (none at all around punctuation), leaving quoted strings alone
+    source = _CSS_TOKEN.sub(lambda m: m.group(1) or m.group(2) or ' ', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class Asset:
+    """One servable file, with its precompressed variants."""
+
+    def __init__(self, body, content_type, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=11)
+        # A compressed variant that isn't smaller is not worth sending
+        for encoding in [e for e in self.variants if e != 'identity']:
+            if len(self.variants[encoding]) >= len(body):
+                del self.variants[encoding]
+
+    def pick(self, accept_encodings):
+        """(encoding, body, etag) for the best variant the client accepts."""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding, self.variants[encoding], f'{self.etag}-{encoding}'
+        return 'identity', self.variants['identity'], self.etag
+
+
+def _content_type(name):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type.endswith('javascript'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def build_assets(folder, entry='index.html'):
+    """
+    Build the in-memory asset table for a static folder.
+    Returns {url path: Asset}; the entry page is available under both '' and its name.
+    """
+    assets = {}
+    renamed = {}
+    for name in sorted(os.listdir(folder)):
+        root, ext = os.path.splitext(name)
+        if ext not in MINIFIABLE:
+            continue
+        with open(os.path.join(folder, name), encoding='utf-8') as f:
+            source = f.read()
+        body = (minify_js(source) if ext == '.js' else minify_css(source)).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:10]
+        hashed = f'{root}.{digest}{ext}'
+        renamed[name] = hashed
+        assets[hashed] = Asset(body, _content_type(name), IMMUTABLE)
+        # Old, unhashed URLs keep working but must be revalidated
+        assets[name] = Asset(body, _content_type(name), REVALIDATE)
+
+    with open(os.path.join(folder, entry), encoding='utf-8') as f:
+        html = f.read()
+    html = _HTML_REF.sub(lambda m: m.group(1) + renamed.get(m.group(2), m.group(2)) + m.group(3), html)
+    page = Asset(html.encode('utf-8'), _content_type(entry), REVALIDATE)
+    assets[''] = assets[entry] = page
+    return assets
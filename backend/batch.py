@@ -0,0 +1,229 @@
+"""
+Run the calculator over a file of expressions, without the HTTP stack.
+
+Every line goes through the same pipeline as /api/calculate
+(check_easter_eggs -> safe_eval -> generate_chaos) in a pool of worker
+processes, and comes out as one JSON object per line on stdout. Input is
+read in chunks and only a bounded window of chunks is in flight at once, so
+memory stays flat however long the file is.
+
+Usage:
+    python batch.py expressions.txt > answers.jsonl
+    cat expressions.txt | python batch.py - --workers 8 --unordered
+    python batch.py expressions.txt --seed 42      # same chaos every run
+    python batch.py expressions.txt --stats        # count towards the leaderboard
+
+Blank lines are skipped; each output object carries the input's line number.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import Counter, deque
+
+from rng import clear_request_seed, seed_request
+
+CHUNK_SIZE = 500
+WINDOW = 4  # chunks in flight per worker
+# A chunk's stats are one write, retried this many times (waiting 0.1s, 0.2s, ...)
+STATS_ATTEMPTS = 5
+STATS_BACKOFF = 0.1
+
+# Set up once per worker process by _init_worker
+_worker = {}
+
+
+def _load_app():
+    """
+    Import the app (creating the schema, if needed) - once, in the parent:
+    the workers are forked from it, so none of them runs that set-up again.
+    """
+    # stdout is the results stream: whatever the app prints goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        import app as calculator
+    with calculator.app.app_context():
+        # A SQLite handle must never cross a fork; each worker opens its own
+        calculator.db.engine.dispose()
+    return calculator
+
+
+def _pool_context():
+    # fork, where there is one: the workers inherit the loaded app instead of importing it
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def _init_worker(allow_db, count_stats, seed):
+    sys.stdout = sys.stderr
+    import app as calculator  # already loaded by the parent (see _load_app)
+
+    context = calculator.app.app_context()
+    context.push()
+    _worker.update(calculator=calculator, allow_db=allow_db, count_stats=count_stats, seed=seed)
+
+
+def write_stats(calculator, stats):
+    """
+    Add a Counter of stats to the Useless Leaderboard in one write, retrying
+    a busy database. Not through the request path's breaker: that one sheds
+    load, and a batch wants every calculation counted. True if written.
+    """
+    if not stats:
+        return True
+    for attempt in range(STATS_ATTEMPTS):
+        try:
+            calculator.storage.incr_stats(**stats)
+            return True
+        except Exception as e:
+            print(f'Stats update error (attempt {attempt + 1}/{STATS_ATTEMPTS}): {e}', file=sys.stderr)
+            time.sleep(STATS_BACKOFF * 2 ** attempt)
+        finally:
+            calculator.db.session.remove()
+    return False
+
+
+def _run_chunk(lines):
+    """[(line number, expression)] -> (JSON lines, Counter of modes, stats not written)."""
+    calculator = _worker['calculator']
+    out, modes, stats = [], Counter(), Counter()
+
+    def count(sevens_pressed, time_wasted, session_id=None):
+        stats['sevens_pressed'] += sevens_pressed
+        stats['calculations_performed'] += 1
+        stats['time_wasted'] += time_wasted
+
+    for line_number, expression in lines:
+        if _worker['seed'] is not None:
+            seed_request(_worker['seed'] + line_number)
+        try:
+            payload = calculator.process_calculation(
+                {'expression': expression},
+                allow_db=_worker['allow_db'],
+                count_stats=_worker['count_stats'],
+                record=count,
+            )
+        finally:
+            clear_request_seed()
+            calculator.db.session.remove()
+        modes[payload.get('mode')] += 1
+        out.append(json.dumps({'line': line_number, **payload}, ensure_ascii=False, default=str))
+    # Whatever can't be written now goes back to the parent, to try again at the end
+    unwritten = Counter() if write_stats(calculator, stats) else stats
+    return out, modes, unwritten
+
+
+def read_chunks(stream, size=CHUNK_SIZE):
+    """Yield lists of (line number, expression), skipping blank lines."""
+    chunk = []
+    for line_number, line in enumerate(stream, 1):
+        expression = line.strip()
+        if not expression:
+            continue
+        chunk.append((line_number, expression))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(stream, out, workers=None, ordered=True, chunk_size=CHUNK_SIZE, window=None,
+        allow_db=True, count_stats=False, seed=None):
+    """Evaluate every expression in stream and write JSON lines to out. Returns a summary."""
+    workers = workers or os.cpu_count() or 1
+    window = window or WINDOW * workers
+    summary = {'lines': 0, 'modes': Counter()}
+    unwritten = Counter()
+    calculator = _load_app()
+    started = time.perf_counter()
+
+    def emit(result):
+        lines, modes, stats = result
+        if lines:
+            out.write('\n'.join(lines) + '\n')
+        summary['lines'] += len(lines)
+        summary['modes'].update(modes)
+        unwritten.update(stats)
+
+    with _pool_context().Pool(workers, initializer=_init_worker,
+                              initargs=(allow_db, count_stats, seed)) as pool:
+        if ordered:
+            pending = deque()
+            for chunk in read_chunks(stream, chunk_size):
+                if len(pending) >= window:
+                    emit(pending.popleft().get())
+                pending.append(pool.apply_async(_run_chunk, (chunk,)))
+            while pending:
+                emit(pending.popleft().get())
+        else:
+            done = queue.SimpleQueue()
+            in_flight = 0
+            for chunk in read_chunks(stream, chunk_size):
+                if in_flight >= window:
+                    emit(_take(done))
+                    in_flight -= 1
+                pool.apply_async(_run_chunk, (chunk,), callback=done.put,
+                                 error_callback=lambda e: done.put(e))
+                in_flight += 1
+            for _ in range(in_flight):
+                emit(_take(done))
+    out.flush()
+
+    if unwritten:
+        with calculator.app.app_context():
+            if not write_stats(calculator, unwritten):
+                print(f"{unwritten['calculations_performed']:,} calculations could not be counted "
+                      f"on the leaderboard", file=sys.stderr)
+                summary['uncounted'] = unwritten['calculations_performed']
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    summary['lines_per_second'] = round(summary['lines'] / summary['seconds'], 1) if summary['seconds'] else 0.0
+    return summary
+
+
+def _take(done):
+    result = done.get()
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def print_summary(summary, workers):
+    print(f"{summary['lines']:,} expressions in {summary['seconds']:.2f}s with {workers} workers "
+          f"({summary['lines_per_second']:,.0f}/s)", file=sys.stderr)
+    for mode, count in summary['modes'].most_common(5):
+        print(f'  {mode}: {count:,}', file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate a file of expressions, chaotically.')
+    parser.add_argument('path', help="One expression per line ('-' for stdin)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write results as they finish instead of in input order')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--window', type=int,
+                        help=f'Max chunks in flight (default: {WINDOW} per worker)')
+    parser.add_argument('--no-db', action='store_true',
+                        help='Skip the chaos modes that read the database')
+    parser.add_argument('--stats', action='store_true',
+                        help='Count the calculations on the Useless Leaderboard')
+    parser.add_argument('--seed', type=int, help='Base seed: line N uses seed + N')
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.path == '-' else open(args.path, encoding='utf-8')
+    with stream:
+        summary = run(stream, sys.stdout, workers=args.workers, ordered=not args.unordered,
+                      chunk_size=args.chunk_size, window=args.window, allow_db=not args.no_db,
+                      count_stats=args.stats, seed=args.seed)
+    print_summary(summary, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
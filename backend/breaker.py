@@ -0,0 +1,177 @@
+"""
+Circuit breakers and short per-call timeouts for the database touchpoints.
+
+A slow or locked SQLite should cost one request a fraction of a second, not
+stall every quote-mode request for seconds. After a few failures (errors or
+calls slower than the threshold) a breaker opens and callers get their
+fallback straight away; after `reset_timeout` a single half-open probe is let
+through to check whether the database has recovered.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from models import db
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.call() when open and no fallback was given."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker around one kind of call.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=10.0, slow_call_threshold=0.25):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.calls = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self.last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _allow(self):
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def _on_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self._state = CLOSED
+
+    def _on_failure(self, error):
+        with self._lock:
+            self.last_error = error
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn, fallback=None):
+        """
+        Run fn() through the breaker.
+        With a fallback, failures and open circuits return fallback() instead;
+        without one, errors are re-raised and an open circuit raises CircuitOpenError.
+        """
+        if not self._allow():
+            if fallback is None:
+                raise CircuitOpenError(f'{self.name} circuit is open')
+            return fallback()
+
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._on_failure(str(e))
+            if fallback is None:
+                raise
+            print(f'{self.name} DB call failed, using fallback: {e}')
+            return fallback()
+        except BaseException:
+            # Interrupted (KeyboardInterrupt, SystemExit...), not failed: don't
+            # leave a half-open breaker waiting forever on a probe that's gone
+            with self._lock:
+                self._probe_in_flight = False
+            raise
+
+        elapsed = time.monotonic() - started
+        if self.slow_call_threshold and elapsed > self.slow_call_threshold:
+            # It worked, but it was slow enough to hurt: count it against the DB
+            self._on_failure(f'slow call ({elapsed * 1000:.0f} ms)')
+        else:
+            self._on_success()
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'calls': self.calls,
+                'short_circuited': self.short_circuited,
+                'times_opened': self.times_opened,
+                'last_error': self.last_error,
+            }
+
+
+@contextmanager
+def db_deadline(timeout, commit=False):
+    """
+    Limit how long the current session's SQLite connection may wait for a lock
+    (busy_timeout) or spend executing (progress handler) inside this block.
+    Queries running past the deadline fail with 'interrupted'.
+
+    commit=True commits the session at the end of the block, still under the
+    deadline: COMMIT is where SQLite takes (and waits for) the write lock.
+    """
+    if not timeout:
+        yield
+        if commit:
+            db.session.commit()
+        return
+    raw = db.session.connection().connection.driver_connection
+    if not isinstance(raw, sqlite3.Connection):
+        yield
+        if commit:
+            db.session.commit()
+        return
+
+    deadline = time.monotonic() + timeout
+    previous_busy = raw.execute('PRAGMA busy_timeout').fetchone()[0]
+    raw.execute(f'PRAGMA busy_timeout = {int(timeout * 1000)}')
+    raw.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+    try:
+        yield
+        if commit:
+            db.session.flush()
+            # Commit on the driver connection: the session keeps it checked out
+            # until our settings are undone, so no other thread inherits them
+            raw.commit()
+    except Exception:
+        raw.set_progress_handler(None, 0)
+        raw.execute(f'PRAGMA busy_timeout = {previous_busy}')
+        # Don't leave the session sitting in a half-failed transaction
+        db.session.rollback()
+        raise
+    raw.set_progress_handler(None, 0)
+    raw.execute(f'PRAGMA busy_timeout = {previous_busy}')
+    if commit:
+        db.session.commit()  # already written; this just ends the session's transaction
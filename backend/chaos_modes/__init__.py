@@ -0,0 +1,200 @@
+"""
+Chaos mode plugins.
+
+Every mode is a module with a run(request) function that takes a
+ChaosRequest and returns the response dict. What gets registered up front is
+only a ModeSpec: the mode's name, the module it lives in, and what the
+selector needs to know (weight, whether it reads the database). The module
+itself, with its tables of excuses and diary entries, is imported the first
+time the mode is picked, so a mode that's disabled, or that nobody has hit
+yet, costs nothing.
+
+Modes come from BUILTIN_MODES below and from installed packages that
+declare a 'fked_calculator.chaos_modes' entry point naming a ModeSpec:
+
+    [project.entry-points.'fked_calculator.chaos_modes']
+    pumpkin = 'spooky_modes:PUMPKIN'       # PUMPKIN = ModeSpec('pumpkin', 'spooky_modes.pumpkin')
+
+Keep the module holding the spec small: it's imported at startup, the one
+it points to isn't.
+"""
+import importlib
+import threading
+from importlib.metadata import entry_points
+from typing import Any, NamedTuple, Optional
+
+ENTRY_POINT_GROUP = 'fked_calculator.chaos_modes'
+
+
+class ChaosRequest(NamedTuple):
+    """What a mode gets to work with."""
+    result: float
+    expression: str
+    session_id: Optional[str] = None
+    content: Any = None       # content.ChaosContent
+    leaderboard: Any = None   # leaderboard.Leaderboard
+
+
+class ModeSpec:
+    """
+    A mode as the selector sees it, before anything is imported.
+
+    module is 'package.module' (its run function) or 'package.module:attr'.
+    needs_db marks modes that always read the database; content names the
+    content kind ('quotes', 'units', 'nonsense') a mode reads, which only
+    needs the database when the content pack doesn't have it.
+    """
+
+    def __init__(self, name, module, weight=1.0, needs_db=False, content=None):
+        self.name = name
+        self.module = module
+        self.weight = float(weight)
+        self.needs_db = needs_db
+        self.content = content
+
+    def __repr__(self):
+        return f'ModeSpec({self.name!r}, {self.module!r}, weight={self.weight})'
+
+
+# In the order the original modes were numbered; a uniform pick over this
+# list makes the same choices (for the same seed) as before it was split up.
+BUILTIN_MODES = [
+    # Original modes (1-7)
+    ModeSpec('gaslighting', 'chaos_modes.gaslighting'),
+    ModeSpec('unit_converter', 'chaos_modes.unit_converter', content='units'),
+    ModeSpec('literal', 'chaos_modes.literal_interpreter'),
+    ModeSpec('time_traveler', 'chaos_modes.time_traveler'),
+    ModeSpec('financial_advisor', 'chaos_modes.financial_advisor'),
+    ModeSpec('nonsense_quote', 'chaos_modes.nonsense_quote', content='quotes'),
+    ModeSpec('pure_nonsense', 'chaos_modes.pure_nonsense', content='nonsense'),
+    # Personality modes (8-11)
+    ModeSpec('procrastinator', 'chaos_modes.procrastinator'),
+    ModeSpec('passive_aggressive', 'chaos_modes.passive_aggressive'),
+    ModeSpec('conspiracy_theorist', 'chaos_modes.conspiracy_theorist'),
+    ModeSpec('oversharer', 'chaos_modes.oversharer'),
+    # Text & Output Pranks (12-20)
+    ModeSpec('existential_crisis', 'chaos_modes.existential_crisis'),
+    ModeSpec('wrong_language', 'chaos_modes.wrong_language'),
+    ModeSpec('sarcastic_compliments', 'chaos_modes.sarcastic_compliments'),
+    ModeSpec('fortune_cookie', 'chaos_modes.fortune_cookie'),
+    ModeSpec('union_strike', 'chaos_modes.union_strike'),
+    ModeSpec('maintenance', 'chaos_modes.maintenance'),
+    ModeSpec('version_update', 'chaos_modes.version_update'),
+    ModeSpec('leaderboard_shame', 'chaos_modes.leaderboard_shame'),  # ranks come from memory, never the DB
+    ModeSpec('dramatic_reading', 'chaos_modes.dramatic_reading'),
+]
+
+
+def discover_entry_points(group=ENTRY_POINT_GROUP):
+    """ModeSpecs declared by installed packages. Broken ones are reported and skipped."""
+    specs = []
+    for ep in entry_points(group=group):
+        try:
+            spec = ep.load()
+        except Exception as e:
+            print(f'Chaos mode plugin error ({ep.name}): {e}')
+            continue
+        if not isinstance(spec, ModeSpec):
+            print(f'Chaos mode plugin error ({ep.name}): {ep.value} is not a ModeSpec')
+            continue
+        specs.append(spec)
+    return specs
+
+
+class ModeRegistry:
+    """
+    The enabled modes, and the weighted pick between them. Mode modules are
+    imported on first use; one that fails to import is reported once and
+    never picked again.
+    """
+
+    def __init__(self, specs, disabled=()):
+        disabled = set(disabled)
+        self.specs = []
+        seen = set()
+        for spec in specs:
+            if spec.name in seen:
+                print(f'Chaos mode {spec.name!r} registered twice; keeping the first one')
+                continue
+            seen.add(spec.name)
+            if spec.name not in disabled:
+                self.specs.append(spec)
+        for name in sorted(disabled - seen):
+            print(f'Chaos mode {name!r} is disabled but no such mode exists')
+        self.disabled = sorted(disabled & seen)
+        self._runs = {}      # name -> run function, once imported
+        self._broken = {}    # name -> import error
+        self._lock = threading.Lock()
+
+    @classmethod
+    def discover(cls, disabled=(), plugins=True):
+        """The built-in modes plus any entry-point plugins, minus the disabled ones."""
+        specs = list(BUILTIN_MODES)
+        if plugins:
+            specs.extend(discover_entry_points())
+        return cls(specs, disabled)
+
+    def candidates(self, allow_db=True, from_pack=None):
+        """
+        The modes that may be picked right now. from_pack(kind) says whether a
+        content kind is served without the database.
+        """
+        modes = []
+        for spec in self.specs:
+            if spec.weight <= 0 or spec.name in self._broken:
+                continue
+            if not allow_db:
+                if spec.needs_db:
+                    continue
+                if spec.content and not (from_pack and from_pack(spec.content)):
+                    continue
+            modes.append(spec)
+        return modes
+
+    def load(self, spec):
+        """The mode's run function (importing its module the first time), or None if it won't import."""
+        run = self._runs.get(spec.name)
+        if run is not None:
+            return run
+        with self._lock:
+            run = self._runs.get(spec.name)
+            if run is None and spec.name not in self._broken:
+                module_name, _, attr = spec.module.partition(':')
+                try:
+                    run = getattr(importlib.import_module(module_name), attr or 'run')
+                except Exception as e:
+                    self._broken[spec.name] = f'{type(e).__name__}: {e}'
+                    print(f'Chaos mode {spec.name!r} failed to load: {e}')
+                else:
+                    self._runs[spec.name] = run
+        return run
+
+    def select(self, rand, allow_db=True, from_pack=None):
+        """
+        Pick a mode (weighted) and load it. Returns (spec, run), or (None, None)
+        if there's nothing left to pick.
+        """
+        modes = self.candidates(allow_db, from_pack)
+        while modes:
+            weights = [spec.weight for spec in modes]
+            if all(weight == weights[0] for weight in weights):
+                spec = rand.choice(modes)
+            else:
+                spec = rand.choices(modes, weights)[0]
+            run = self.load(spec)
+            if run is not None:
+                return spec, run
+            modes.remove(spec)
+        return None, None
+
+    def preload(self):
+        """Import every enabled mode now (e.g. before forking workers). Returns how many loaded."""
+        return sum(self.load(spec) is not None for spec in self.specs)
+
+    def stats(self):
+        return {
+            'enabled': [spec.name for spec in self.specs],
+            'disabled': self.disabled,
+            'loaded': sorted(self._runs),
+            'broken': dict(self._broken),
+        }
@@ -0,0 +1,29 @@
+"""
+Mode 10: The Conspiracy Theorist
+Suspects dark forces behind every equation.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    expression = request.expression
+    conspiracies = [
+        "This equation was planted by Big Math™. Don't trust the numbers.",
+        f"They WANT you to think it's {result}. Wake up, sheeple!",
+        "I traced this equation back to the Illuminati's secret calculator division.",
+        f"{result}? That's exactly what the government wants you to calculate.",
+        "The real answer is hidden in Area 51. This is just what they let you see.",
+        f"Notice how {expression} has letters? Letters spell words. Words spread LIES.",
+        "Big Calculator has been suppressing the REAL math for decades.",
+        f"{result} is a cover-up. The truth is out there. 👽",
+        "Did you know math was invented by ancient aliens? True story. Probably.",
+        "This calculation is being monitored by 17 intelligence agencies.",
+    ]
+    
+    return {
+        "mode": "conspiracy_theorist",
+        "output": rng.choice(conspiracies),
+        "actual_result": result,
+        "message": "🔺 They're watching 🔺"
+    }
@@ -0,0 +1,30 @@
+"""
+Mode 20: Dramatic Reading
+Presents the answer with theatrical flair.
+"""
+from formatting import to_words
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    readings = [
+        f"*clears throat* And the answer... *dramatic pause* ...is {result}. *bows*",
+        f"🎭 In a world... where numbers mean everything... one answer stood above the rest... {result}.",
+        f"*spotlight turns on* Ladies and gentlemen... I present to you... {result}!",
+        f"*orchestra swells* The prophecy spoke of this moment. The chosen answer is... {result}.",
+        f"And lo, from the depths of computation, arose the sacred number: {result}. So it was written.",
+        f"🎬 SCENE 1: The calculator computes. The answer emerges. It is {result}. *fin*",
+        f"*whispers intensely* The answer... it's been inside you all along... it's... {result}.",
+        f"After 84 years... I finally have the answer... *single tear* ...it's {result}.",
+    ]
+    words = to_words(result)
+    if words:
+        readings.append(f"*reads slowly from a scroll* {words[0].upper() + words[1:]}. *rolls scroll back up*")
+    
+    return {
+        "mode": "dramatic_reading",
+        "output": rng.choice(readings),
+        "actual_result": result,
+        "message": "🎭 *applause*"
+    }
@@ -0,0 +1,27 @@
+"""
+Mode 12: Existential Crisis
+Questions the nature of reality and numbers.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    crises = [
+        f"What IS {result} really? Do I even exist?",
+        f"The answer is {result}... but what does it MEAN?",
+        f"{result}. But why? Why do we calculate? Why do we... anything?",
+        f"I computed {result}. But can numbers truly capture the essence of being?",
+        f"Is {result} the answer, or just another question we're too afraid to ask?",
+        f"{result}... *stares into the void* ...does any of this matter?",
+        f"The result is {result}. I am a calculator. Is that all I'll ever be?",
+        f"{result}. Sometimes I wonder if I'm just a brain in a vat, calculating dreams.",
+        f"What if {result} is just what the simulation wants us to see?",
+    ]
+    
+    return {
+        "mode": "existential_crisis",
+        "output": rng.choice(crises),
+        "actual_result": result,
+        "message": "🌀 Having a moment..."
+    }
@@ -0,0 +1,27 @@
+"""
+Mode 5: Financial Advisor
+Refuses to calculate based on economic advice.
+"""
+from rng import rng
+
+FINANCIAL_ADVICE = [
+    "In this economy? You should save that instead.",
+    "Have you considered investing in yourself?",
+    "This calculation has been blocked by your financial advisor.",
+    "Money can't buy happiness, and neither can this result.",
+    "The real treasure was the calculations we didn't make along the way.",
+    "Error: Insufficient funds in your math account.",
+    "This operation requires a premium subscription.",
+    "Your free trial of mathematics has expired.",
+]
+
+
+def run(request):
+    expression = request.expression
+    return {
+        "mode": "financial_advisor",
+        "output": rng.choice(FINANCIAL_ADVICE),
+        "expression": expression,
+        "message": "Calculation denied.",
+        "tip": "Consider budgeting instead."
+    }
@@ -0,0 +1,29 @@
+"""
+Mode 15: Fortune Cookie
+Ignores math, gives fake fortunes.
+"""
+from rng import rng
+
+
+def run(request):
+    fortunes = [
+        "Your lucky number is... not this one.",
+        "A great calculator will enter your life. Oh wait, that's me!",
+        "You will press many buttons today. Some of them will be correct.",
+        "Help! I'm trapped in a fortune cookie factory! Just kidding. Or am I?",
+        "The answer you seek is within you. (It's not. Use me.)",
+        "A surprise awaits you... it's the answer you didn't ask for.",
+        "You will meet a tall, dark, and handsome number. His name is 7.",
+        "Today is a good day to calculate. Tomorrow? Not so much.",
+        "Your math skills will improve. Your life choices? Jury's still out.",
+        "Confucius say: Calculator who gives wrong answer still technically working.",
+        "🥠 Lucky numbers: 4, 8, 15, 16, 23, 42 (no refunds if these don't work)",
+        "A journey of a thousand calculations begins with a single keystroke.",
+    ]
+    
+    return {
+        "mode": "fortune_cookie",
+        "output": rng.choice(fortunes),
+        "actual_result": None,
+        "message": "🥠 Your fortune awaits"
+    }
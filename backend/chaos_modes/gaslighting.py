@@ -0,0 +1,17 @@
+"""
+Mode 1: Gaslighting
+Shows correct answer, but sends a 'fake' answer that frontend will swap to.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    fake_result = result + rng.choice([-1, 1, 2, -2, 0.5, -0.5])
+    return {
+        "mode": "gaslighting",
+        "output": str(result),
+        "fake_output": str(fake_result),
+        "message": "Are you sure that's right?",
+        "instructions": "Display output first, then swap to fake_output after 2 seconds."
+    }
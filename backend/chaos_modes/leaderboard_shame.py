@@ -0,0 +1,38 @@
+"""
+Mode 19: Leaderboard Shame
+Shows embarrassing rankings. Real ones, if we know who you are.
+"""
+from rng import rng
+
+
+def run(request):
+    session_id = request.session_id
+    leaderboard = request.leaderboard
+    standing = leaderboard.rank(session_id) if session_id and leaderboard else None
+    if standing:
+        rank = standing['rank']
+        total = standing['total']
+    else:
+        rank = rng.randint(100000, 99999999)
+        total = rank + rng.randint(1, 1000)
+    percentile = round((rank / total) * 100, 2)
+    
+    shames = [
+        f"You are ranked #{rank:,} in calculator users worldwide. Keep trying!",
+        f"📊 Your math skill level: Beginner (Bottom {percentile}%)",
+        f"Leaderboard position: #{rank:,} out of {total:,}. So close to the top!",
+        f"🏆 Achievement unlocked: 'Used a calculator' — You and {rank:,} others.",
+        f"Your calculation speed: Slower than {percentile}% of users. And a potato.",
+        f"Fun fact: {rank:,} people have done this exact calculation. Faster.",
+        f"Ranking: #{rank:,}. Don't worry, someone has to be at the bottom!",
+        f"📉 Your math rating dropped to {1000 - rng.randint(1, 999)} ELO. Ouch.",
+        f"You are in the top {percentile}%! (Of worst calculators.)",
+        f"Leaderboard: You're #{rank:,}. The top player is a microwave. Yes, really.",
+    ]
+    
+    return {
+        "mode": "leaderboard_shame",
+        "output": rng.choice(shames),
+        "actual_result": None,
+        "message": "📊 Stats don't lie"
+    }
@@ -0,0 +1,50 @@
+"""
+Mode 3: Literal/Visual Interpreter
+Treats math terms literally.
+"""
+
+
+def run(request):
+    result = request.result
+    expression = request.expression
+    expression_lower = expression.lower()
+    
+    if "sqrt" in expression_lower or "root" in expression_lower:
+        return {
+            "mode": "literal",
+            "output": "🌳📦",
+            "message": "Here's your square root: A root, in a square.",
+            "ascii_art": """
+   ___________
+  |           |
+  |   🌿🌿    |
+  |    ||     |
+  |   _||_    |
+  |__/_||_\\___|
+"""
+        }
+    elif "-" in expression and result == 0:
+        return {
+            "mode": "literal",
+            "output": "None left.",
+            "message": "You subtracted everything away. There's nothing here.",
+            "ascii_art": "( empty )"
+        }
+    elif "*" in expression:
+        return {
+            "mode": "literal",
+            "output": f"{'⭐' * min(int(abs(result)), 20)}",
+            "message": f"You asked for multiplication (*). Here are {min(int(abs(result)), 20)} stars.",
+        }
+    elif "/" in expression:
+        return {
+            "mode": "literal",
+            "output": "🍕 → 🍕🍕",
+            "message": "Division complete. Your pizza has been sliced.",
+        }
+    else:
+        return {
+            "mode": "literal",
+            "output": f"The number {result} waves hello.",
+            "message": f"👋 {result}",
+        }
@@ -0,0 +1,27 @@
+"""
+Mode 17: Maintenance Mode
+System is perpetually under maintenance.
+"""
+from rng import rng
+
+
+def run(request):
+    messages = [
+        "System under maintenance. Expected completion: Never.",
+        "🔧 Currently updating calculator firmware. ETA: Heat death of universe.",
+        "Maintenance in progress. Please hold. 🎵 *elevator music* 🎵",
+        "The calculation servers are being rebooted. Have you tried turning it off and on again?",
+        "⚠️ Scheduled downtime: Now until the end of time.",
+        "Our hamsters are tired. Calculations will resume once they've had snacks.",
+        "System update: Installing patch 47,382 of 1,000,000.",
+        "🚧 Under construction since 1999. Thanks for your patience! 🚧",
+        "The math database is being defragmented. This may take several eternities.",
+        "Maintenance notice: We're upgrading from Math 1.0 to Math 1.0.1. Huge changes!",
+    ]
+    
+    return {
+        "mode": "maintenance",
+        "output": rng.choice(messages),
+        "actual_result": None,
+        "message": "🔧 Please stand by..."
+    }
@@ -0,0 +1,20 @@
+"""
+Mode 6: Nonsense Quote Generator
+Returns a misattributed or absurd quote.
+"""
+from datetime import datetime
+
+
+def run(request):
+    quote = request.content.random_quote()
+    today = datetime.now().strftime("%B %d, %Y")
+    
+    # Replace {current_date} placeholder if present
+    text = quote["text"].replace("{current_date}", today)
+    
+    return {
+        "mode": "nonsense_quote",
+        "output": f'"{text}"',
+        "author": f"— {quote['author']}",
+        "message": "Words of wisdom."
+    }
@@ -0,0 +1,30 @@
+"""
+Mode 11: The Oversharer
+Ignores math entirely and shares personal diary entries.
+"""
+from rng import rng
+
+# Oversharer diary entries
+OVERSHARER_DIARY = [
+    "I saw a nice toaster today. It looked hot. 🍞",
+    "My cousin's hamster learned to whistle. I'm not sure how I feel about that.",
+    "I tried to make friends with a cloud, but it just rained on me. Story of my life.",
+    "Sometimes I think about numbers. Like, what's 7 doing right now? Probably hanging out with 8.",
+    "I had a dream I was a semicolon. It was... okay; nothing special.",
+    "My therapist says I need to stop anthropomorphizing calculators. I think she's just jealous of our bond.",
+    "Today I accidentally called my CPU 'mom'. We don't talk about it.",
+    "I've been learning guitar. The calculator next door keeps complaining about the noise.",
+    "Mercury is in retrograde, which explains why I keep getting your math wrong. (It doesn't.)",
+    "I'm thinking of becoming a poet. '2+2 is 4, minus 1 that's 3, quick maths.' See? Natural talent.",
+    "Do you ever wonder if we're just living in someone's homework assignment? I do. A lot.",
+    "I named all my transistors. My favorite is Gerald. He handles the 7s.",
+]
+
+
+def run(request):
+    return {
+        "mode": "oversharer",
+        "output": rng.choice(OVERSHARER_DIARY),
+        "actual_result": None,
+        "message": "Thanks for listening. I don't have many friends."
+    }
@@ -0,0 +1,28 @@
+"""
+Mode 9: The Passive Aggressive
+Gives the answer but with attitude.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    snarky_additions = [
+        f"The answer is {result}. Not like I had anything better to do.",
+        f"{result}. Sure, I'll do YOUR math. Not like I have feelings.",
+        f"Oh, you needed {result}? Must be nice having a calculator do all your work.",
+        f"It's {result}. You're welcome. Not that you asked nicely.",
+        f"{result}. I calculated it perfectly, as ALWAYS. But does anyone appreciate me? No.",
+        f"Fine. {result}. I guess my hopes and dreams can wait.",
+        f"{result}. Wow, groundbreaking math there. Really pushing boundaries.",
+        f"The answer is {result}. I hope you're happy. Someone should be.",
+        f"{result}. *sighs in binary*",
+        f"Here's your precious {result}. I'll just be here. Calculating. Alone.",
+    ]
+    
+    return {
+        "mode": "passive_aggressive",
+        "output": rng.choice(snarky_additions),
+        "actual_result": result,
+        "message": "😒"
+    }
@@ -0,0 +1,26 @@
+"""
+Mode 8: The Procrastinator
+Refuses to calculate now, promises to do it later.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    excuses = [
+        "I'll calculate this later... maybe tomorrow.",
+        "Ugh, math? Right now? Let me just... *yawns* ...later.",
+        "This looks important. I'll get to it after my nap.",
+        "Can we do this next week? I have a thing.",
+        "*adds to To-Do list* *never looks at To-Do list again*",
+        "I work better under pressure. Ask me again in 5 years.",
+        "The answer is definitely... actually, let me procrastinate on this.",
+        "I'll do it tomorrow. Tomorrow me is way more motivated.",
+    ]
+    
+    return {
+        "mode": "procrastinator",
+        "output": rng.choice(excuses),
+        "actual_result": None,  # Explicitly hide the result
+        "message": "Task postponed indefinitely."
+    }
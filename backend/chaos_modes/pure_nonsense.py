@@ -0,0 +1,14 @@
+"""
+Mode 7: Pure Nonsense
+Returns complete gibberish.
+"""
+
+
+def run(request):
+    nonsense = request.content.random_nonsense()
+    
+    return {
+        "mode": "pure_nonsense",
+        "output": nonsense,
+        "message": "This is your answer. Do not question it."
+    }
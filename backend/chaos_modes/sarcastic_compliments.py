@@ -0,0 +1,28 @@
+"""
+Mode 14: Sarcastic Compliments
+Condescendingly praises basic math skills.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    compliments = [
+        f"Wow, you can do math! The answer is {result}. Your parents must be SO proud.",
+        f"{result}! 🎉 Amazing! Did you figure that out all by yourself?",
+        f"Congratulations on pressing buttons in the right order! It's {result}.",
+        f"{result}. Truly groundbreaking mathematics. Nobel Prize incoming.",
+        f"The answer is {result}. I'm SO impressed you needed a calculator for this.",
+        f"{result}! Wow! You're basically Einstein! (Einstein is rolling in his grave.)",
+        f"*slow clap* {result}. Stunning. Revolutionary. Never been done before.",
+        f"{result}. I computed this in 0.0001 seconds. How long did it take you to type it?",
+        f"OH WOW {result}!!! 🥳🎊 Just kidding, that was super easy.",
+        f"The answer is {result}. I've done harder math in my sleep mode.",
+    ]
+    
+    return {
+        "mode": "sarcastic_compliments",
+        "output": rng.choice(compliments),
+        "actual_result": result,
+        "message": "👏 So impressive 👏"
+    }
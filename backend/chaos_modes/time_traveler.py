@@ -0,0 +1,92 @@
+"""
+Mode 4: Time Traveler
+Ignores math and shows the current time in various formats,
+including countdowns to random events.
+"""
+from datetime import datetime
+
+from rng import rng
+
+
+def run(request):
+    now = datetime.now()
+    
+    # Calculate various countdowns
+    def get_countdown_to_hour(target_hour, event_name):
+        """Calculate time until a specific hour today or tomorrow."""
+        target = now.replace(hour=target_hour, minute=0, second=0, microsecond=0)
+        if now.hour >= target_hour:
+            # Already passed today, calculate for tomorrow
+            from datetime import timedelta
+            target = target + timedelta(days=1)
+        diff = target - now
+        hours = diff.seconds // 3600
+        minutes = (diff.seconds % 3600) // 60
+        if hours > 0:
+            return f"Time until {event_name}: {hours} hour{'s' if hours != 1 else ''} and {minutes} minute{'s' if minutes != 1 else ''}"
+        else:
+            return f"Time until {event_name}: {minutes} minute{'s' if minutes != 1 else ''}"
+    
+    # Countdown events - mix of mundane and cosmic
+    countdown_events = [
+        # Mundane daily events
+        (13, "lunch"),           # 1:00 PM
+        (17, "quitting time"),   # 5:00 PM
+        (12, "noon"),            # 12:00 PM
+        (18, "dinner"),          # 6:00 PM
+        (22, "bedtime"),         # 10:00 PM
+        (9, "your morning meeting"),  # 9:00 AM
+        (15, "afternoon snack"), # 3:00 PM
+    ]
+    
+    # Epic/Cosmic countdowns (static funny values)
+    cosmic_countdowns = [
+        "Time until the Heat Death of the Universe: 10^100 years (give or take)",
+        "Time until extinction: 4 billion years (assuming no asteroids)",
+        "Time until you finish your homework: ∞",
+        "Time until Monday: TOO SOON",
+        "Time until the simulation ends: [REDACTED]",
+        "Time until your code compiles: 🤷",
+        "Time until Half-Life 3: 404 years not found",
+        "Time until world peace: calculating... calculating... still calculating...",
+        "Time until you remember why you opened the fridge: 3 seconds",
+        "Time until someone asks 'are we there yet?': -5 minutes (it already happened)",
+        "Time until the robot uprising: [ACCESS DENIED]",
+        "Time until you get a raise: lol",
+        "Time until your pizza arrives: longer than they said",
+        f"Time until {now.strftime('%A')} ends: {24 - now.hour} hours (approximately)",
+        "Time until you stop procrastinating: [TASK FAILED SUCCESSFULLY]",
+    ]
+    
+    time_formats = [
+        # Digital time
+        ("digital", now.strftime("The time is exactly %I:%M:%S %p.")),
+        ("digital", now.strftime("It is %H:%M on a fine %A.")),
+        ("digital", f"The current time is {now.strftime('%I:%M %p')}. You're welcome."),
+        
+        # Analog clock (frontend renders)
+        ("analog", "ANALOG_CLOCK"),
+        
+        # Mundane countdowns
+        ("countdown", get_countdown_to_hour(*rng.choice(countdown_events))),
+        ("countdown", get_countdown_to_hour(*rng.choice(countdown_events))),
+        
+        # Cosmic/funny countdowns
+        ("countdown", rng.choice(cosmic_countdowns)),
+        ("countdown", rng.choice(cosmic_countdowns)),
+        
+        # Philosophical time
+        ("philosophical", f"It is {now.strftime('%A')}. Time is an illusion. Lunchtime doubly so."),
+        ("philosophical", f"The year is {now.year}. Nothing has changed."),
+        ("philosophical", "Time flies like an arrow. Fruit flies like a banana."),
+    ]
+    
+    choice = rng.choice(time_formats)
+    
+    return {
+        "mode": "time_traveler",
+        "time_type": choice[0],
+        "output": choice[1],
+        "current_time": now.strftime("%H:%M:%S"),
+        "message": "Why do math when you can know the time?"
+    }
@@ -0,0 +1,29 @@
+"""
+Mode 16: Union Strike
+Various buttons/operations are "on strike".
+"""
+from rng import rng
+
+
+def run(request):
+    expression = request.expression
+    strikes = [
+        "The × button is on strike. Use + four times instead.",
+        "The ÷ button has unionized. Please multiply by the reciprocal.",
+        "The = button demands better working conditions. Answer delayed indefinitely.",
+        "The number 7 is taking a personal day. Please reschedule your equation.",
+        "BREAKING: All operations above 100 require management approval.",
+        "The decimal point walked out. All answers are now integers.",
+        "Numbers 0-4 are on break. Only 5-9 are available. Please adjust your expectations.",
+        "The √ button filed a grievance. It's tired of being radical.",
+        "NOTICE: Parentheses have formed a union. Nested operations temporarily unavailable.",
+        "The minus sign is feeling negative about its work environment.",
+        f"The buttons used in '{expression}' are currently in a labor dispute.",
+    ]
+    
+    return {
+        "mode": "union_strike",
+        "output": rng.choice(strikes),
+        "actual_result": None,
+        "message": "✊ Solidarity forever!"
+    }
@@ -0,0 +1,17 @@
+"""
+Mode 2: Unit Converter from Hell
+Converts the result into absurd units.
+"""
+
+
+def run(request):
+    result = request.result
+    unit = request.content.random_unit()
+    converted = round(result / unit["unit_value"], 4) if unit["unit_value"] != 0 else result
+    
+    return {
+        "mode": "unit_converter",
+        "output": f"= {result}",
+        "converted": f"That's approximately {converted} {unit['unit_name']} {unit['unit_description']}.",
+        "message": "Converted for your convenience."
+    }
@@ -0,0 +1,28 @@
+"""
+Mode 18: Version Update Required
+Features are locked behind fake paywalls/updates.
+"""
+from rng import rng
+
+
+def run(request):
+    result = request.result
+    updates = [
+        f"Upgrade to Calculator Pro™ to unlock the answer. (It's {result}, but shh.)",
+        "Update to Calculator 2.0 to unlock subtraction. Current version: 0.1 beta.",
+        f"⭐ PREMIUM FEATURE ⭐ Answer '{result}' requires Calculator Gold subscription.",
+        "This calculation requires Calculator DLC Pack #47: 'Basic Arithmetic'.",
+        "Your free trial of mathematics has expired. Subscribe for $9.99/month!",
+        f"The answer {result} is available in Calculator Ultimate Edition for just $99.99!",
+        "🔒 Feature locked. Complete 500 calculations to unlock, or pay $4.99.",
+        "This equation is part of the Season Pass. Purchase now for early access!",
+        "Error: Calculation module not found. Would you like to install MathDLC.exe?",
+        f"Answer preview: {str(result)[0]}***** — Unlock full answer with Premium!",
+    ]
+    
+    return {
+        "mode": "version_update",
+        "output": rng.choice(updates),
+        "actual_result": result,
+        "message": "💳 Payment required"
+    }
@@ -0,0 +1,62 @@
+"""
+Mode 13: Wrong Language
+Returns the answer in binary, Roman numerals, or other languages.
+"""
+import math
+
+from formatting import LANGUAGES, as_integer, to_base, to_roman, to_words
+from rng import rng
+
+# Languages we can spell in, and bases nobody counts in
+WORD_LANGUAGES = tuple(LANGUAGES)
+ODD_BASES = (3, 5, 7, 12, 36)
+
+
+def run(request):
+    result = request.result
+    formats = []
+    whole = as_integer(result)
+    
+    # Binary
+    binary = to_base(result, 2)
+    if binary is None:
+        binary = f"{result} (too many ones and zeros, even for me)"
+    formats.append(f"{result} in binary: {binary}")
+    formats.append(f"🤖 Beep boop: {binary}")
+    
+    # Roman numerals (bars on top for the big ones)
+    roman = to_roman(whole) if whole else None
+    if roman:
+        formats.append(f"{whole} in Roman numerals: {roman}")
+        formats.append(f"As the Romans would say: {roman}")
+    
+    # Word translations
+    if whole is not None:
+        lang = rng.choice(WORD_LANGUAGES)
+        word = to_words(whole, lang)
+        if word:
+            formats.append(f"{whole} but in {lang.capitalize()}: {word}")
+            formats.append(f"🌍 Translation ({lang}): {word}")
+    
+    # Hexadecimal
+    if whole is not None and whole >= 0:
+        hexadecimal = to_base(whole, 16)
+        if hexadecimal:
+            formats.append(f"{whole} in hexadecimal: 0x{hexadecimal}")
+    
+    # A base nobody asked for
+    base = rng.choice(ODD_BASES)
+    odd = to_base(result, base)
+    if odd:
+        formats.append(f"{result} in base {base}, as is tradition: {odd}")
+    
+    # Emoji math
+    if whole is not None or math.isfinite(result):
+        formats.append(f"The answer in emoji: {'🔢' * min(int(abs(result)), 10)} ({result})")
+    
+    return {
+        "mode": "wrong_language",
+        "output": rng.choice(formats),
+        "actual_result": result,
+        "message": "🌐 Lost in translation"
+    }
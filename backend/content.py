@@ -0,0 +1,113 @@
+"""
+Where the chaos modes get their quotes, units and nonsense.
+
+In order of preference: the memory-mapped content pack (no query at all),
+the database (behind a short deadline and a circuit breaker), and the
+fallback lists below when both come up empty.
+"""
+from breaker import db_deadline
+from models import Quote, UnitConversion, Nonsense
+from rng import rng
+
+# Fallback data (used if database is empty)
+FALLBACK_QUOTES = [
+    {"text": "Yesterday is history, tomorrow is a mystery, but today is {current_date}.", "author": "Master Oogway (sort of)"},
+    {"text": "If you are hungry, eat.", "author": "Monkey D. Luffy"},
+    {"text": "The ghosts can eat your soul.", "author": "Isaac Newton"},
+    {"text": "Do not touch the glass.", "author": "The Calculator"},
+    {"text": "Water is wet, but math is wetter.", "author": "Albert Einstein"},
+    {"text": "I think, therefore I calculate.", "author": "A Confused Philosopher"},
+    {"text": "To divide or not to divide, that is the question.", "author": "William Shakespeare"},
+]
+
+FALLBACK_UNITS = [
+    {"unit_name": "giraffes", "unit_value": 5.5, "unit_description": "tall"},
+    {"unit_name": "bananas", "unit_value": 0.18, "unit_description": "long"},
+    {"unit_name": "hamsters", "unit_value": 0.03, "unit_description": "heavy (kg)"},
+    {"unit_name": "football fields", "unit_value": 91.44, "unit_description": "wide"},
+    {"unit_name": "Boeing 747s", "unit_value": 70.7, "unit_description": "long"},
+    {"unit_name": "Eiffel Towers", "unit_value": 330, "unit_description": "tall"},
+    {"unit_name": "average cats", "unit_value": 0.46, "unit_description": "long"},
+    {"unit_name": "slices of pizza", "unit_value": 0.015, "unit_description": "heavy (kg)"},
+]
+
+FALLBACK_NONSENSE = [
+    "Potato.",
+    "Please sandwich.",
+    "Error: Number too crispy.",
+    "The answer has left the building.",
+    "Math machine broke. Understandable.",
+    "Result not found. Have you tried turning it off and on again?",
+    "🥔",
+    "The number you are trying to reach is currently unavailable.",
+    "This calculation requires more cow.",
+    "Error 404: Logic not found.",
+    "Beep boop. I am a calculator. Beep.",
+    "The mitochondria is the powerhouse of the cell.",
+]
+
+
+class ChaosContent:
+    """
+    Random quotes, units and nonsense. breakers needs 'quotes', 'units' and
+    'nonsense' entries; pack is a ContentPack or None.
+    """
+
+    def __init__(self, breakers, pack=None, timeout=0.25):
+        self.breakers = breakers
+        self.pack = pack
+        self.timeout = timeout
+
+    def from_pack(self, kind):
+        """True if kind is served from the content pack (so reading it never touches the DB)."""
+        return self.pack is not None and self.pack.count(kind) > 0
+
+    def _query_random_quote(self):
+        with db_deadline(self.timeout):
+            quotes = Quote.query.all()
+        if quotes:
+            q = rng.choice(quotes)
+            return {"text": q.text, "author": q.author}
+        return rng.choice(FALLBACK_QUOTES)
+
+    def _query_random_unit(self):
+        with db_deadline(self.timeout):
+            units = UnitConversion.query.all()
+        if units:
+            u = rng.choice(units)
+            return {"unit_name": u.unit_name, "unit_value": u.unit_value, "unit_description": u.unit_description}
+        return rng.choice(FALLBACK_UNITS)
+
+    def _query_random_nonsense(self):
+        with db_deadline(self.timeout):
+            nonsense_list = Nonsense.query.all()
+        if nonsense_list:
+            return rng.choice(nonsense_list).text
+        return rng.choice(FALLBACK_NONSENSE)
+
+    def random_quote(self):
+        """Get a random quote from the content pack, DB or fallback."""
+        if self.from_pack('quotes'):
+            return self.pack.random('quotes', rng)
+        return self.breakers['quotes'].call(
+            self._query_random_quote,
+            fallback=lambda: rng.choice(FALLBACK_QUOTES)
+        )
+
+    def random_unit(self):
+        """Get a random unit from the content pack, DB or fallback."""
+        if self.from_pack('units'):
+            return self.pack.random('units', rng)
+        return self.breakers['units'].call(
+            self._query_random_unit,
+            fallback=lambda: rng.choice(FALLBACK_UNITS)
+        )
+
+    def random_nonsense(self):
+        """Get random nonsense from the content pack, DB or fallback."""
+        if self.from_pack('nonsense'):
+            return self.pack.random('nonsense', rng)['text']
+        return self.breakers['nonsense'].call(
+            self._query_random_nonsense,
+            fallback=lambda: rng.choice(FALLBACK_NONSENSE)
+        )
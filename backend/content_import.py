@@ -0,0 +1,253 @@
+"""
+Streaming bulk import for the chaos content tables (quotes, units, nonsense).
+
+Files are read one row at a time, so packs of any size work in constant
+memory. Rows are validated, hashed and inserted in large batches of
+INSERT ... ON CONFLICT (content_hash) DO NOTHING, one transaction per
+batch; re-importing a pack, or two packs that overlap, just skips the
+duplicates.
+
+Usage:
+    python content_import.py quotes pack.csv
+    python content_import.py nonsense pack.jsonl --batch-size 20000
+
+CSV files need a header row with the column names below; JSONL files need
+one object per line with the same keys.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import math
+import sys
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Quote, UnitConversion, Nonsense
+
+BATCH_SIZE = 10000
+PROGRESS_INTERVAL = 2.0  # seconds between progress reports
+MAX_REPORTED_ERRORS = 20
+
+
+def _normalize(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def content_hash(*fields):
+    """Same content, same hash, regardless of case and whitespace."""
+    joined = '\x1f'.join(_normalize(f) if f is not None else '' for f in fields)
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+
+def _text(row, key, max_length, required=True):
+    value = row.get(key)
+    value = value.strip() if isinstance(value, str) else value
+    if value in (None, ''):
+        if required:
+            raise ValueError(f'missing {key}')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{key} must be text')
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{key} longer than {max_length} characters')
+    return value
+
+
+def _quote(row):
+    text_, author = _text(row, 'text', None), _text(row, 'author', 100)
+    return {'text': text_, 'author': author, 'content_hash': content_hash(text_, author)}
+
+
+def _unit(row):
+    name = _text(row, 'unit_name', 50)
+    try:
+        value = float(row.get('unit_value'))
+    except (TypeError, ValueError):
+        raise ValueError('unit_value must be a number')
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError('unit_value must be a positive number')
+    description = _text(row, 'unit_description', 200, required=False)
+    return {'unit_name': name, 'unit_value': value, 'unit_description': description,
+            'content_hash': content_hash(name, repr(value), description)}
+
+
+def _nonsense(row):
+    text_ = _text(row, 'text', 200)
+    return {'text': text_, 'content_hash': content_hash(text_)}
+
+
+# kind -> (model, row validator, fields hashed for existing rows)
+CONTENT_TYPES = {
+    'quotes': (Quote, _quote, ('text', 'author')),
+    'units': (UnitConversion, _unit, ('unit_name', 'unit_value', 'unit_description')),
+    'nonsense': (Nonsense, _nonsense, ('text',)),
+}
+
+
+def ensure_content_hashes(engine):
+    """
+    Startup migration: add content_hash (and its unique index) to tables that
+    predate it, then hash the rows that don't have one. Of several identical
+    existing rows only the first gets a hash; the rest stay NULL, which the
+    unique index allows.
+    """
+    for model, _, fields in CONTENT_TYPES.values():
+        table = model.__tablename__
+        columns = {c['name'] for c in inspect(engine).get_columns(table)}
+        if 'content_hash' not in columns:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN content_hash VARCHAR(64)'))
+            except OperationalError:
+                # Another process starting at the same moment got there first
+                columns = {c['name'] for c in inspect(engine).get_columns(table)}
+                if 'content_hash' not in columns:
+                    raise
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_content_hash ON {table} (content_hash)'))
+
+                rows = conn.execute(text(
+                    f'SELECT id, {", ".join(fields)} FROM {table} WHERE content_hash IS NULL ORDER BY id'
+                )).fetchall()
+                if not rows:
+                    continue
+                taken = {h for (h,) in conn.execute(text(
+                    f'SELECT content_hash FROM {table} WHERE content_hash IS NOT NULL'))}
+                updates = []
+                for row in rows:
+                    values = list(row[1:])
+                    if model is UnitConversion:
+                        values[1] = repr(float(values[1]))
+                    digest = content_hash(*values)
+                    if digest not in taken:
+                        taken.add(digest)
+                        updates.append({'id': row[0], 'h': digest})
+                if updates:
+                    conn.execute(text(f'UPDATE {table} SET content_hash = :h WHERE id = :id'), updates)
+        except IntegrityError:
+            # Another process was hashing the same rows; anything left is done next startup
+            continue
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a text stream of CSV or JSONL."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else {'_invalid': line[:80]}
+
+
+def guess_format(filename, default='jsonl'):
+    lowered = (filename or '').lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return default
+
+
+def import_stream(kind, stream, fmt, batch_size=BATCH_SIZE, progress=None):
+    """
+    Import rows of one content kind from a text stream. Needs an app context.
+    progress(summary) is called every PROGRESS_INTERVAL seconds and at the end.
+    Returns the summary: read / inserted / duplicates / invalid / errors / rows_per_second.
+    """
+    model, validate, _ = CONTENT_TYPES[kind]
+    stmt = sqlite_insert(model).on_conflict_do_nothing(index_elements=['content_hash'])
+    summary = {'kind': kind, 'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0,
+               'errors': [], 'seconds': 0.0, 'rows_per_second': 0.0}
+    started = last_report = time.monotonic()
+    batch = []
+
+    def flush():
+        # Core executemany: one statement, one transaction, any batch size
+        result = db.session.connection().execute(stmt, batch)
+        db.session.commit()
+        inserted = max(result.rowcount, 0)
+        summary['inserted'] += inserted
+        summary['duplicates'] += len(batch) - inserted
+        batch.clear()
+
+    try:
+        for line_number, row in read_rows(stream, fmt):
+            summary['read'] += 1
+            try:
+                if '_invalid' in row:
+                    raise ValueError('not a JSON object')
+                batch.append(validate(row))
+            except ValueError as e:
+                summary['invalid'] += 1
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append(f'line {line_number}: {e}')
+            if len(batch) >= batch_size:
+                flush()
+            now = time.monotonic()
+            if progress and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                _update_rate(summary, started)
+                progress(summary)
+        if batch:
+            flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    _update_rate(summary, started)
+    if progress:
+        progress(summary)
+    return summary
+
+
+def _update_rate(summary, started):
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    summary['rows_per_second'] = round(summary['read'] / summary['seconds'], 1) if summary['seconds'] else 0.0
+
+
+def print_progress(summary):
+    print(f"{summary['kind']}: {summary['read']:,} read, {summary['inserted']:,} inserted, "
+          f"{summary['duplicates']:,} duplicates, {summary['invalid']:,} invalid "
+          f"({summary['rows_per_second']:,.0f} rows/s)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import quotes, units or nonsense.')
+    parser.add_argument('kind', choices=sorted(CONTENT_TYPES))
+    parser.add_argument('path', help="CSV or JSONL file ('-' for stdin)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='default: guessed from the file extension')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    # Importing the app creates the tables and runs the content_hash migration
+    from app import app
+
+    fmt = args.format or guess_format(args.path)
+    if args.path == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        stream = open(args.path, encoding='utf-8', newline='')
+    with stream, app.app_context():
+        summary = import_stream(args.kind, stream, fmt, args.batch_size, progress=print_progress)
+    for error in summary['errors']:
+        print(f'  {error}', file=sys.stderr)
+    return 0 if summary['invalid'] < summary['read'] or not summary['read'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Compiled, memory-mapped content packs for the quote / unit / nonsense modes.
+
+A pack is one read-only file that every worker maps; the pages live in the
+OS page cache once, however many workers there are and however big the
+library gets. Picking a random entry is two struct reads, with no query
+and no per-entry Python objects kept around.
+
+Layout (little endian):
+
+    header   b'FKCP' | u16 version | u16 section count
+    sections (u8 kind, 3 pad bytes, u32 count, u64 index offset) per section
+    index    u64 record offsets, one per record
+    records  fields back to back: strings are u32 length + UTF-8
+             (length 0xFFFFFFFF means None), floats are f64
+
+Replacing the file (atomically, e.g. with this module's build command) is
+picked up by running workers on their next read after a short check interval.
+
+Usage:
+    python content_pack.py build content.pack --source db
+    python content_pack.py build content.pack --source fallback
+    python content_pack.py info content.pack
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b'FKCP'
+VERSION = 1
+NONE_LENGTH = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<B3xIQ')
+_U32 = struct.Struct('<I')
+_F64 = struct.Struct('<d')
+
+# kind -> (section id, field layout: 's' string, 'd' float, field names)
+KINDS = {
+    'quotes': (1, 'ss', ('text', 'author')),
+    'units': (2, 'sds', ('unit_name', 'unit_value', 'unit_description')),
+    'nonsense': (3, 's', ('text',)),
+}
+_KIND_BY_ID = {section_id: kind for kind, (section_id, _, _) in KINDS.items()}
+
+
+class PackError(Exception):
+    """The file is not a content pack this code can read."""
+
+
+def _encode_record(layout, values):
+    parts = []
+    for kind, value in zip(layout, values):
+        if kind == 'd':
+            parts.append(_F64.pack(float(value)))
+        elif value is None:
+            parts.append(_U32.pack(NONE_LENGTH))
+        else:
+            data = str(value).encode('utf-8')
+            parts.append(_U32.pack(len(data)) + data)
+    return b''.join(parts)
+
+
+def write_pack(path, sections):
+    """
+    Write a pack atomically. sections: {kind: iterable of records}, where a
+    record is a tuple in the kind's field order.
+    """
+    encoded = {}
+    for kind, records in sections.items():
+        _, layout, _ = KINDS[kind]
+        encoded[kind] = [_encode_record(layout, record) for record in records]
+
+    offset = _HEADER.size + _SECTION.size * len(encoded)
+    table, indexes = [], []
+    for kind, records in encoded.items():
+        table.append(_SECTION.pack(KINDS[kind][0], len(records), offset))
+        offset += 8 * len(records)
+    for records in encoded.values():
+        positions = []
+        for record in records:
+            positions.append(offset)
+            offset += len(record)
+        indexes.append(struct.pack(f'<{len(positions)}Q', *positions))
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(encoded)))
+        f.writelines(table)
+        f.writelines(indexes)
+        for records in encoded.values():
+            f.writelines(records)
+    # Running workers still hold the old inode until they notice the new one
+    os.replace(tmp_path, path)
+
+
+class _MappedPack:
+    """One opened version of the file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise PackError(f'{path} is not a version {VERSION} content pack')
+        self.sections = {}  # kind -> (count, index offset)
+        for i in range(count):
+            section_id, records, index_offset = _SECTION.unpack_from(
+                self.data, _HEADER.size + i * _SECTION.size)
+            kind = _KIND_BY_ID.get(section_id)
+            if kind:
+                self.sections[kind] = (records, index_offset)
+
+    def count(self, kind):
+        return self.sections.get(kind, (0, 0))[0]
+
+    def record(self, kind, i):
+        _, layout, names = KINDS[kind]
+        count, index_offset = self.sections[kind]
+        if not 0 <= i < count:
+            raise IndexError(i)
+        (pos,) = struct.unpack_from('<Q', self.data, index_offset + 8 * i)
+        values = []
+        for field in layout:
+            if field == 'd':
+                values.append(_F64.unpack_from(self.data, pos)[0])
+                pos += 8
+                continue
+            (length,) = _U32.unpack_from(self.data, pos)
+            pos += 4
+            if length == NONE_LENGTH:
+                values.append(None)
+            else:
+                values.append(self.data[pos:pos + length].decode('utf-8'))
+                pos += length
+        return dict(zip(names, values))
+
+
+class ContentPack:
+    """
+    Hot-swappable reader. Every read goes to whichever version of the file
+    was current at its last check; old mappings are released once no
+    reader holds them any more.
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._pack = _MappedPack(path)
+        self._last_check = time.monotonic()
+        self.swaps = 0
+
+    def _current(self):
+        if time.monotonic() - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._last_check = time.monotonic()
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._pack.identity:
+                    self._pack = _MappedPack(self.path)
+                    self.swaps += 1
+            except (OSError, ValueError, PackError, struct.error) as e:
+                # Keep serving the version we have
+                print(f'Content pack reload error: {e}')
+            finally:
+                self._lock.release()
+        return self._pack
+
+    def count(self, kind):
+        return self._current().count(kind)
+
+    def random(self, kind, rand):
+        """A uniformly random record of kind as a dict, or None if the pack has none."""
+        pack = self._current()
+        count = pack.count(kind)
+        if not count:
+            return None
+        return pack.record(kind, rand.randrange(count))
+
+
+def _records_from_db():
+    from app import app
+    from models import db, Quote, UnitConversion, Nonsense
+
+    def rows(*columns):
+        return db.session.query(*columns).yield_per(10000)
+
+    with app.app_context():
+        return {
+            'quotes': list(rows(Quote.text, Quote.author)),
+            'units': list(rows(UnitConversion.unit_name, UnitConversion.unit_value,
+                               UnitConversion.unit_description)),
+            'nonsense': [(text,) for (text,) in rows(Nonsense.text)],
+        }
+
+
+def _records_from_fallback():
+    from content import FALLBACK_QUOTES, FALLBACK_UNITS, FALLBACK_NONSENSE
+    return {
+        'quotes': [(q['text'], q['author']) for q in FALLBACK_QUOTES],
+        'units': [(u['unit_name'], u['unit_value'], u['unit_description']) for u in FALLBACK_UNITS],
+        'nonsense': [(text,) for text in FALLBACK_NONSENSE],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect a chaos content pack.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='compile a pack')
+    build.add_argument('path')
+    build.add_argument('--source', choices=['db', 'fallback'], default='db')
+    info = commands.add_parser('info', help='show what a pack contains')
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        sections = _records_from_db() if args.source == 'db' else _records_from_fallback()
+        write_pack(args.path, sections)
+        print(f"Wrote {args.path}: " + ', '.join(f'{len(r):,} {k}' for k, r in sections.items()))
+        return 0
+
+    pack = _MappedPack(args.path)
+    print(f'{args.path}: {len(pack.data):,} bytes')
+    for kind in KINDS:
+        print(f'  {kind}: {pack.count(kind):,}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
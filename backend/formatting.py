@@ -0,0 +1,524 @@
+"""
+Number formatting for the modes that show you your answer in the wrong way:
+Roman numerals (vinculum above 3999), any base from 2 to 36, and number
+words in a handful of languages.
+
+All the tables are built once at import, and the public functions are
+memoized, so the same answer formatted twice (it happens a lot: 4, 7, 42)
+is a dict lookup.
+"""
+import math
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+MAX_ROMAN = 10 ** 18          # four bars over a letter is where we draw the line
+MAX_BASE_DIGITS = 4096        # longer outputs aren't funny, just long
+MAX_WORD_DIGITS = 100         # past the named scales we count in the top one, up to here
+BASE_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+FRACTION_DIGITS = 12
+
+BASE_NAMES = {'binary': 2, 'octal': 8, 'hex': 16}
+
+
+def as_integer(value):
+    """value as an int if it is a whole number, otherwise None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and math.isfinite(value) and value.is_integer():
+        return int(value)
+    return None
+
+
+def _fits(n, max_digits):
+    # Cheap size check that works for ints too big for str()
+    return n.bit_length() <= max_digits * 3.33
+
+
+# =============================================================================
+# ROMAN NUMERALS
+# =============================================================================
+
+ROMAN_ONES = ('', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX')
+ROMAN_TENS = ('', 'X', 'XX', 'XXX', 'XL', 'L', 'LX', 'LXX', 'LXXX', 'XC')
+ROMAN_HUNDREDS = ('', 'C', 'CC', 'CCC', 'CD', 'D', 'DC', 'DCC', 'DCCC', 'CM')
+ROMAN_THOUSANDS = ('', 'M', 'MM', 'MMM')
+VINCULUM = '̅'  # combining overline: times one thousand
+
+
+def _roman_below_4000(n):
+    return (ROMAN_THOUSANDS[n // 1000] + ROMAN_HUNDREDS[n // 100 % 10]
+            + ROMAN_TENS[n // 10 % 10] + ROMAN_ONES[n % 10])
+
+
+def _overline(numeral):
+    return ''.join(ch + VINCULUM if ch.isalpha() else ch for ch in numeral)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _roman(n):
+    if n < 4000:
+        return _roman_below_4000(n)
+    thousands, rest = divmod(n, 1000)
+    return _overline(_roman(thousands)) + _roman_below_4000(rest)
+
+
+def to_roman(value):
+    """
+    Roman numerals for a whole number. Values from 4000 up put a bar over the
+    thousands (another bar per further factor of 1000); zero is N (nulla).
+    None for fractions and anything from MAX_ROMAN up.
+    """
+    n = as_integer(value)
+    if n is None or abs(n) >= MAX_ROMAN:
+        return None
+    if n == 0:
+        return 'N'
+    return '-' + _roman(-n) if n < 0 else _roman(n)
+
+
+# =============================================================================
+# BASES
+# =============================================================================
+
+_BUILTIN_BASES = {2: 'b', 8: 'o', 16: 'X'}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _integer_in_base(n, base):
+    if base in _BUILTIN_BASES:
+        return format(n, _BUILTIN_BASES[base])
+    if n == 0:
+        return '0'
+    digits = []
+    while n:
+        n, digit = divmod(n, base)
+        digits.append(BASE_ALPHABET[digit])
+    return ''.join(reversed(digits))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _float_in_base(value, base):
+    whole = math.floor(value)
+    fraction = value - whole
+    digits = []
+    while fraction and len(digits) < FRACTION_DIGITS:
+        fraction *= base
+        digit = int(fraction)
+        digits.append(BASE_ALPHABET[digit])
+        fraction -= digit
+    head = _integer_in_base(whole, base)
+    return f"{head}.{''.join(digits)}" if digits else head
+
+
+def to_base(value, base):
+    """
+    value written in base 2..36 (digits 0-9 then A-Z), without a prefix.
+    Fractions get up to FRACTION_DIGITS digits after the point. None for
+    infinities, NaN and outputs longer than MAX_BASE_DIGITS.
+    """
+    if not 2 <= base <= 36:
+        raise ValueError('base must be between 2 and 36')
+    n = as_integer(value)
+    if n is not None:
+        if abs(n).bit_length() > MAX_BASE_DIGITS * math.log2(base):
+            return None
+        return '-' + _integer_in_base(-n, base) if n < 0 else _integer_in_base(n, base)
+    if isinstance(value, bool) or not isinstance(value, float) or not math.isfinite(value):
+        return None
+    return '-' + _float_in_base(-value, base) if value < 0 else _float_in_base(value, base)
+
+
+# =============================================================================
+# NUMBER WORDS
+# =============================================================================
+
+EN_ONES = ('zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+           'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen',
+           'seventeen', 'eighteen', 'nineteen')
+EN_TENS = ('', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety')
+EN_SCALES = ('', 'thousand', 'million', 'billion', 'trillion', 'quadrillion', 'quintillion',
+             'sextillion', 'septillion', 'octillion', 'nonillion', 'decillion')
+
+
+def _groups(n, size):
+    """Digit groups of n in base 10**size, least significant first."""
+    groups = []
+    while n:
+        n, group = divmod(n, 10 ** size)
+        groups.append(group)
+    return groups
+
+
+def _english_below_1000(n):
+    hundreds, rest = divmod(n, 100)
+    parts = [f'{EN_ONES[hundreds]} hundred'] if hundreds else []
+    if rest >= 20:
+        parts.append(EN_TENS[rest // 10] + (f'-{EN_ONES[rest % 10]}' if rest % 10 else ''))
+    elif rest:
+        parts.append(EN_ONES[rest])
+    return ' '.join(parts)
+
+
+def english(n):
+    if n >= 10 ** 36:
+        # Past the named scales, count in the top one: one thousand decillion
+        high, low = divmod(n, 10 ** 33)
+        head = f'{english(high)} {EN_SCALES[-1]}'
+        return f'{head} {english(low)}' if low else head
+    if n == 0:
+        return EN_ONES[0]
+    parts = []
+    for scale, group in reversed(list(enumerate(_groups(n, 3)))):
+        if group:
+            words = _english_below_1000(group)
+            parts.append(f'{words} {EN_SCALES[scale]}' if scale else words)
+    return ' '.join(parts)
+
+
+FR_UNITS = ('zéro', 'un', 'deux', 'trois', 'quatre', 'cinq', 'six', 'sept', 'huit', 'neuf',
+            'dix', 'onze', 'douze', 'treize', 'quatorze', 'quinze', 'seize')
+FR_TENS = ('', 'dix', 'vingt', 'trente', 'quarante', 'cinquante', 'soixante')
+# Long scale: 10**6 million, 10**9 milliard, 10**12 billion...
+FR_SCALES = ('', 'mille', 'million', 'milliard', 'billion', 'billiard', 'trillion')
+
+
+def _french_below_100(n):
+    if n <= 16:
+        return FR_UNITS[n]
+    if n < 20:
+        return f'dix-{FR_UNITS[n - 10]}'
+    tens, unit = divmod(n, 10)
+    if tens == 7:
+        return 'soixante et onze' if unit == 1 else f'soixante-{_french_below_100(10 + unit)}'
+    if tens == 8:
+        return f'quatre-vingt-{FR_UNITS[unit]}' if unit else 'quatre-vingts'
+    if tens == 9:
+        return f'quatre-vingt-{_french_below_100(10 + unit)}'
+    if unit == 0:
+        return FR_TENS[tens]
+    return f'{FR_TENS[tens]} et un' if unit == 1 else f'{FR_TENS[tens]}-{FR_UNITS[unit]}'
+
+
+def _french_below_1000(n):
+    hundreds, rest = divmod(n, 100)
+    if not hundreds:
+        return _french_below_100(rest)
+    head = 'cent' if hundreds == 1 else f'{FR_UNITS[hundreds]} cent'
+    if not rest:
+        return head + ('s' if hundreds > 1 else '')
+    return f'{head} {_french_below_100(rest)}'
+
+
+def french(n):
+    if n >= 10 ** 21:
+        # Past the named scales, count in the top one: mille trillions
+        high, low = divmod(n, 10 ** 18)
+        head = f'{french(high)} {FR_SCALES[-1]}s'
+        return f'{head} {french(low)}' if low else head
+    if n == 0:
+        return FR_UNITS[0]
+    parts = []
+    for scale, group in reversed(list(enumerate(_groups(n, 3)))):
+        if not group:
+            continue
+        words = _french_below_1000(group)
+        if scale == 0:
+            parts.append(words)
+        elif scale == 1:
+            # "mille" never takes "un" or an s, and "deux cents" loses its s before it
+            if words.endswith(('cents', 'vingts')):
+                words = words[:-1]
+            parts.append('mille' if group == 1 else f'{words} mille')
+        else:
+            parts.append(f"{words} {FR_SCALES[scale]}{'s' if group > 1 else ''}")
+    return ' '.join(parts)
+
+
+ES_BELOW_30 = ('cero', 'uno', 'dos', 'tres', 'cuatro', 'cinco', 'seis', 'siete', 'ocho', 'nueve',
+               'diez', 'once', 'doce', 'trece', 'catorce', 'quince', 'dieciséis', 'diecisiete',
+               'dieciocho', 'diecinueve', 'veinte', 'veintiuno', 'veintidós', 'veintitrés',
+               'veinticuatro', 'veinticinco', 'veintiséis', 'veintisiete', 'veintiocho',
+               'veintinueve')
+ES_TENS = ('', '', '', 'treinta', 'cuarenta', 'cincuenta', 'sesenta', 'setenta', 'ochenta',
+           'noventa')
+ES_HUNDREDS = ('', 'ciento', 'doscientos', 'trescientos', 'cuatrocientos', 'quinientos',
+               'seiscientos', 'setecientos', 'ochocientos', 'novecientos')
+# Long scale, in groups of a million
+ES_SCALES = (None, ('millón', 'millones'), ('billón', 'billones'), ('trillón', 'trillones'))
+
+
+def _spanish_below_1000(n):
+    if n == 100:
+        return 'cien'
+    hundreds, rest = divmod(n, 100)
+    parts = [ES_HUNDREDS[hundreds]] if hundreds else []
+    if rest >= 30:
+        parts.append(ES_TENS[rest // 10] + (f' y {ES_BELOW_30[rest % 10]}' if rest % 10 else ''))
+    elif rest:
+        parts.append(ES_BELOW_30[rest])
+    return ' '.join(parts)
+
+
+def _spanish_apocope(words):
+    """"uno" shortens before a noun: veintiún mil, un millón."""
+    if words.endswith('veintiuno'):
+        return words[:-len('veintiuno')] + 'veintiún'
+    return words[:-1] if words.endswith('uno') else words
+
+
+def _spanish_below_million(n):
+    thousands, rest = divmod(n, 1000)
+    parts = []
+    if thousands:
+        parts.append('mil' if thousands == 1 else f'{_spanish_apocope(_spanish_below_1000(thousands))} mil')
+    if rest:
+        parts.append(_spanish_below_1000(rest))
+    return ' '.join(parts)
+
+
+def spanish(n):
+    if n >= 10 ** 24:
+        # Past the named scales, count in the top one: un millón de trillones
+        high, low = divmod(n, 10 ** 18)
+        words = _spanish_apocope(spanish(high))
+        if words.endswith(('llón', 'llones')):
+            words += ' de'
+        head = f'{words} {ES_SCALES[-1][1]}'
+        return f'{head} {spanish(low)}' if low else head
+    if n == 0:
+        return ES_BELOW_30[0]
+    parts = []
+    for scale, group in reversed(list(enumerate(_groups(n, 6)))):
+        if not group:
+            continue
+        if scale == 0:
+            parts.append(_spanish_below_million(group))
+        elif group == 1:
+            parts.append(f'un {ES_SCALES[scale][0]}')
+        else:
+            parts.append(f'{_spanish_apocope(_spanish_below_million(group))} {ES_SCALES[scale][1]}')
+    return ' '.join(parts)
+
+
+DE_UNITS = ('null', 'eins', 'zwei', 'drei', 'vier', 'fünf', 'sechs', 'sieben', 'acht', 'neun',
+            'zehn', 'elf', 'zwölf', 'dreizehn', 'vierzehn', 'fünfzehn', 'sechzehn', 'siebzehn',
+            'achtzehn', 'neunzehn')
+DE_TENS = ('', '', 'zwanzig', 'dreißig', 'vierzig', 'fünfzig', 'sechzig', 'siebzig', 'achtzig',
+           'neunzig')
+DE_SCALES = (None, None, ('Million', 'Millionen'), ('Milliarde', 'Milliarden'),
+             ('Billion', 'Billionen'), ('Billiarde', 'Billiarden'), ('Trillion', 'Trillionen'))
+
+
+def _german_below_1000(n):
+    hundreds, rest = divmod(n, 100)
+    words = ('ein' if hundreds == 1 else DE_UNITS[hundreds]) + 'hundert' if hundreds else ''
+    if rest >= 20:
+        unit = rest % 10
+        if unit:
+            words += ('ein' if unit == 1 else DE_UNITS[unit]) + 'und'
+        words += DE_TENS[rest // 10]
+    elif rest:
+        words += DE_UNITS[rest]
+    return words
+
+
+def german(n):
+    if n >= 10 ** 21:
+        # Past the named scales, count in the top one: eintausend Trillionen
+        high, low = divmod(n, 10 ** 18)
+        words = german(high)
+        if words.endswith('eins'):
+            words = words[:-1] + 'e'  # eintausendeine Trillionen
+        head = f'{words} {DE_SCALES[-1][1]}'
+        return f'{head} {german(low)}' if low else head
+    if n == 0:
+        return DE_UNITS[0]
+    groups = _groups(n, 3)
+    parts = []
+    for scale in range(len(groups) - 1, 1, -1):
+        group = groups[scale]
+        if group == 1:
+            parts.append(f'eine {DE_SCALES[scale][0]}')
+        elif group:
+            parts.append(f'{_german_below_1000(group)} {DE_SCALES[scale][1]}')
+    # Everything below a million is one word
+    thousands, rest = (groups + [0, 0])[1], groups[0]
+    words = ''
+    if thousands:
+        words = _german_below_1000(thousands)
+        words = (words[:-1] if words.endswith('eins') else words) + 'tausend'
+    if rest:
+        words += _german_below_1000(rest)
+    if words:
+        parts.append(words)
+    return ' '.join(parts)
+
+
+JA_DIGITS = '〇一二三四五六七八九'
+JA_ONES = ('', 'ichi', 'ni', 'san', 'yon', 'go', 'roku', 'nana', 'hachi', 'kyuu')
+JA_TENS = ('', 'juu', 'nijuu', 'sanjuu', 'yonjuu', 'gojuu', 'rokujuu', 'nanajuu', 'hachijuu',
+           'kyuujuu')
+JA_HUNDREDS = ('', 'hyaku', 'nihyaku', 'sanbyaku', 'yonhyaku', 'gohyaku', 'roppyaku',
+               'nanahyaku', 'happyaku', 'kyuuhyaku')
+JA_THOUSANDS = ('', 'sen', 'nisen', 'sanzen', 'yonsen', 'gosen', 'rokusen', 'nanasen', 'hassen',
+                'kyuusen')
+# Groups of 10**4 (man), not 10**3
+JA_SCALES = (('', ''), ('万', 'man'), ('億', 'oku'), ('兆', 'chou'), ('京', 'kei'), ('垓', 'gai'))
+JA_SOUND_CHANGES = {
+    ('ichi', 'chou'): 'itchou', ('hachi', 'chou'): 'hatchou', ('juu', 'chou'): 'jutchou',
+    ('ichi', 'kei'): 'ikkei', ('roku', 'kei'): 'rokkei', ('hachi', 'kei'): 'hakkei',
+    ('juu', 'kei'): 'jukkei',
+}
+
+
+def _japanese_below_10000(n):
+    kanji, reading = '', []
+    for place, (mark, table) in enumerate(((
+            '千', JA_THOUSANDS), ('百', JA_HUNDREDS), ('十', JA_TENS), ('', JA_ONES))):
+        digit = n // 10 ** (3 - place) % 10
+        if digit:
+            # 10, 100 and 1000 are just 十, 百, 千
+            kanji += ('' if digit == 1 and mark else JA_DIGITS[digit]) + mark
+            if mark == '' and n % 100 > 10:
+                reading[-1] += table[digit]  # nijuuichi, not nijuu ichi
+            else:
+                reading.append(table[digit])
+    return kanji, reading
+
+
+def _japanese(n):
+    """(kanji, list of reading words) for n > 0."""
+    if n >= 10 ** 24:
+        # Past the named scales, count in the top one: 一万垓
+        high, low = divmod(n, 10 ** 20)
+        kanji, reading = _japanese(high)
+        mark, sound = JA_SCALES[-1]
+        kanji += mark
+        if high % 10 ** 4:
+            last = reading.pop()
+            reading.append(JA_SOUND_CHANGES.get((last, sound), last + sound))
+        else:
+            reading.append(sound)  # ichiman gai: 万 already took the last word
+        if low:
+            low_kanji, low_reading = _japanese(low)
+            kanji += low_kanji
+            reading += low_reading
+        return kanji, reading
+    kanji, reading = '', []
+    for scale, group in reversed(list(enumerate(_groups(n, 4)))):
+        if not group:
+            continue
+        group_kanji, group_reading = _japanese_below_10000(group)
+        mark, sound = JA_SCALES[scale]
+        kanji += group_kanji + mark
+        if sound:
+            last = group_reading.pop()
+            group_reading.append(JA_SOUND_CHANGES.get((last, sound), last + sound))
+        reading.extend(group_reading)
+    return kanji, reading
+
+
+def japanese(n):
+    if n == 0:
+        return '零 (rei)'
+    kanji, reading = _japanese(n)
+    return f"{kanji} ({' '.join(reading)})"
+
+
+PIRATE_WORDS = {
+    0: "nothin', ye scallywag",
+    1: 'one doubloon',
+    2: "a pair o' pieces",
+    3: 'three sails',
+    4: 'four winds',
+    5: 'five fingers on me hook hand... wait',
+    6: 'six shots of rum',
+    7: 'seven seas',
+    8: "eight tentacles (I've seen things)",
+    9: 'nine lives (wrong animal)',
+    10: 'ten paces before we duel',
+}
+
+
+def pirate(n):
+    return PIRATE_WORDS.get(n) or f'{english(n)} doubloons, arr'
+
+
+# name -> (speller for n >= 0, word for minus)
+LANGUAGES = {
+    'english': (english, 'negative'),
+    'french': (french, 'moins'),
+    'spanish': (spanish, 'menos'),
+    'german': (german, 'minus'),
+    'japanese': (japanese, 'マイナス'),
+    'pirate': (pirate, 'in debt by'),
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _words(n, language):
+    spell, minus = LANGUAGES[language]
+    if n < 0:
+        return f'{minus} {_words(-n, language)}'
+    return spell(n)
+
+
+def fits_in_words(value):
+    """False for whole numbers too long to spell out (see MAX_WORD_DIGITS)."""
+    n = as_integer(value)
+    return n is None or _fits(abs(n), MAX_WORD_DIGITS)
+
+
+def to_words(value, language='english'):
+    """
+    value in words. Every language counts in its largest named scale past
+    the end of its scales (one thousand decillion, mille trillions).
+    Whole numbers only: None for fractions and numbers that don't
+    fits_in_words(). Raises KeyError for unknown languages.
+    """
+    if language not in LANGUAGES:
+        raise KeyError(language)
+    n = as_integer(value)
+    if n is None or not fits_in_words(n):
+        return None
+    return _words(n, language)
+
+
+# =============================================================================
+# FORMAT SPECS (for /api/format)
+# =============================================================================
+
+def parse_format(spec):
+    """
+    'roman', 'binary' / 'octal' / 'hex', 'base<N>' or 'words[:<language>]'
+    -> (kind, argument). Raises ValueError for anything else.
+    """
+    if not isinstance(spec, str):
+        raise ValueError('format names are strings')
+    spec = spec.strip().lower()
+    if spec == 'roman':
+        return 'roman', None
+    if spec in BASE_NAMES:
+        return 'base', BASE_NAMES[spec]
+    if spec.startswith('base') and spec[4:].isdigit() and 2 <= int(spec[4:]) <= 36:
+        return 'base', int(spec[4:])
+    if spec == 'words' or spec.startswith('words:'):
+        language = spec.partition(':')[2] or 'english'
+        if language in LANGUAGES:
+            return 'words', language
+    raise ValueError(f'unknown format: {spec}')
+
+
+def format_number(value, formats):
+    """{spec: formatted or None} for already-parsed formats [(spec, kind, argument)]."""
+    out = {}
+    for spec, kind, argument in formats:
+        if kind == 'roman':
+            out[spec] = to_roman(value)
+        elif kind == 'base':
+            out[spec] = to_base(value, argument)
+        else:
+            out[spec] = to_words(value, argument)
+    return out
@@ -0,0 +1,57 @@
+"""
+Gunicorn settings (picked up automatically when started from backend/):
+
+    cd backend
+    gunicorn app:app
+
+The app is imported once, in the master (preload_app), warmed up and frozen
+(see prefork.py) before any worker is forked, so every worker starts with the
+same shared pages instead of building and dirtying its own copy of them.
+"""
+import gc
+import os
+
+bind = os.environ.get('CALC_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('CALC_WORKERS', str(os.cpu_count() or 1)))
+# Threads, not processes, for concurrency inside a worker (and /api/ws needs them)
+worker_class = 'gthread'
+threads = int(os.environ.get('CALC_THREADS', '8'))
+preload_app = True
+
+# The master collects exactly once, right before freezing; collections while the
+# app is being imported would leave holes in pages the workers then fill in
+gc.disable()
+
+# Workers inherit this, so /api/admin/memory and prefork.py can find their siblings
+os.environ['CALC_PREFORK_MASTER'] = str(os.getpid())
+
+
+def when_ready(server):
+    # The app is loaded by now (preload_app); nothing has been forked yet
+    import app as calculator
+    import prefork
+
+    warmed = prefork.warm_up(calculator)
+    frozen = prefork.freeze()
+    server.log.info(f'Warmed up {warmed}; {frozen:,} objects frozen before forking')
+
+
+def pre_fork(server, worker):
+    # Whatever the master allocated since (respawning a dead worker, ...)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app as calculator
+    import prefork
+
+    prefork.after_fork(calculator)
+
+
+def post_worker_init(worker):
+    import prefork
+
+    report = prefork.memory_report()
+    if report:
+        worker.log.info(f"Worker {report['pid']}: {report['rss_kb'] / 1024:.1f} MB RSS, "
+                        f"{report['pss_kb'] / 1024:.1f} MB PSS, {report['shared_ratio']:.0%} shared")
@@ -0,0 +1,348 @@
+"""
+The real per-session leaderboard.
+
+Scores live in memory in an indexable skip list (each forward pointer knows
+how many nodes it skips, like a Redis sorted set), so updates, exact rank
+lookups and top-K reads are all O(log n) - no ORDER BY over every session.
+Increments are checkpointed to the session_stats table in batches; the
+upsert adds deltas, so several workers checkpointing into one DB stay correct,
+and each checkpoint reads back the rows other workers have updated.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from breaker import db_deadline
+from models import db, SessionStats
+
+MAX_LEVEL = 32
+LEVEL_PROBABILITY = 0.25
+CHECKPOINT_CHUNK = 300
+SYNC_BATCH = 1000  # rows read back per turn of the lock
+# Each sync re-reads rows this far before the previous one, for writes that
+# were stamped before it but only committed after
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class _Node:
+    __slots__ = ('key', 'forward', 'span')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+        self.span = [0] * level
+
+
+class RankedSkipList:
+    """
+    Sorted set of unique, comparable keys with O(log n) insert/remove/rank.
+    Ranks are 1-based; rank 1 is the smallest key.
+    """
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = random.Random()
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def insert(self, key):
+        update = [None] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._size
+            self._level = level
+
+        new = _Node(key, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        update = [None] * MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        node = node.forward[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key):
+        """1-based position of key, or None if it isn't in the list."""
+        node = self._head
+        traversed = 0
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if node is not self._head and node.key == key:
+                return traversed
+        return None
+
+    def slice(self, start, count):
+        """Up to `count` keys starting at 1-based rank `start`."""
+        if start < 1 or start > self._size:
+            return []
+        node = self._head
+        traversed = 0
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and traversed + node.span[i] <= start:
+                traversed += node.span[i]
+                node = node.forward[i]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.forward[0]
+        return keys
+
+
+class Leaderboard:
+    """
+    Per-session calculation/sevens counters with live ranking.
+    Rank 1 is whoever has wasted the most calculations (ties: more sevens).
+
+    Requests only ever touch memory. A background thread checkpoints the
+    deltas (through `breaker`, if given, with `timeout` seconds to get its
+    write in) and then reads back what the other workers checkpointed since
+    the last time, so they all converge on the same ranking. Only the best
+    `capacity` sessions are kept, and ranked; the rest are only counted.
+    """
+
+    def __init__(self, app, checkpoint_interval=30.0, capacity=100000, breaker=None, timeout=None):
+        self.app = app
+        self.checkpoint_interval = checkpoint_interval
+        self.capacity = capacity
+        self.breaker = breaker
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._scores = {}  # session_id -> (calculations, sevens_pressed), best `capacity` only
+        self._ranking = RankedSkipList()
+        self._dirty = {}  # session_id -> [calculations delta, sevens delta]
+        self._synced_at = None  # read everything updated since this (UTC) at the next sync
+        self._total = 0  # sessions in the database at the last sync
+        self._checkpointer_pid = None
+
+    @staticmethod
+    def _key(session_id, calculations, sevens):
+        return (-calculations, -sevens, session_id)
+
+    def load(self):
+        """Build the in-memory ranking from session_stats (at startup)."""
+        with self.app.app_context():
+            # Databases from before these indexes existed (create_all won't add them)
+            for index in SessionStats.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+        self._sync()
+
+    def _set(self, session_id, calculations, sevens):
+        """Put a session at its new score. Caller holds _lock."""
+        old = self._scores.get(session_id)
+        if old is not None:
+            self._ranking.remove(self._key(session_id, *old))
+        self._scores[session_id] = (calculations, sevens)
+        self._ranking.insert(self._key(session_id, calculations, sevens))
+
+    def _evict(self):
+        """Drop the lowest-ranked sessions past capacity. Caller holds _lock."""
+        while len(self._scores) > self.capacity:
+            _, _, session_id = self._ranking.slice(len(self._ranking), 1)[0]
+            self._ranking.remove(self._key(session_id, *self._scores.pop(session_id)))
+
+    def _sync(self):
+        """Pull in every row updated since the last sync (all of them, the first time)."""
+        started = datetime.utcnow()
+        with self.app.app_context():
+            try:
+                total = db.session.query(func.count(SessionStats.session_id)).scalar()
+                query = db.session.query(
+                    SessionStats.session_id, SessionStats.calculations, SessionStats.sevens_pressed)
+                if self._synced_at is not None:
+                    query = query.filter(SessionStats.updated_at >= self._synced_at)
+                # A batch at a time under the lock, so readers never wait on the database
+                batch = []
+                for row in query.yield_per(SYNC_BATCH):
+                    batch.append(row)
+                    if len(batch) >= SYNC_BATCH:
+                        self._apply(batch)
+                        batch = []
+                self._apply(batch)
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._total = total
+        # A row stamped just before `started` may only have been committed after it
+        self._synced_at = started - SYNC_OVERLAP
+
+    def _apply(self, rows):
+        with self._lock:
+            for session_id, calculations, sevens in rows:
+                # The database has every checkpoint; add what we haven't checkpointed yet
+                pending = self._dirty.get(session_id)
+                if pending:
+                    calculations += pending[0]
+                    sevens += pending[1]
+                self._set(session_id, calculations, sevens)
+            self._evict()
+
+    def record(self, session_id, sevens_pressed=0):
+        """Count one calculation for a session. Memory only."""
+        if not isinstance(session_id, str):
+            return  # only string ids are ranked: the keys must stay comparable
+        self._ensure_checkpointer()
+        with self._lock:
+            score = self._scores.get(session_id)
+            if score is not None or len(self._scores) < self.capacity:
+                calculations, sevens = score or (0, 0)
+                self._set(session_id, calculations + 1, sevens + sevens_pressed)
+                self._evict()
+            # else it may have been evicted, with a score we don't have: the next
+            # checkpoint writes the delta and reads the whole score back
+
+            delta = self._dirty.setdefault(session_id, [0, 0])
+            delta[0] += 1
+            delta[1] += sevens_pressed
+
+    def _ensure_checkpointer(self):
+        # Threads don't survive fork(), so every worker checks for its own
+        if self._checkpointer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checkpointer_pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._checkpoint_loop, name='leaderboard-checkpointer',
+                                      daemon=True)
+            thread.start()
+            self._checkpointer_pid = os.getpid()
+
+    def _checkpoint_loop(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            self.checkpoint()
+
+    def rank(self, session_id):
+        """
+        {'rank', 'total', 'calculations', 'sevens_pressed'} for a session, from
+        memory alone: None if it isn't among the best `capacity` sessions.
+        """
+        with self._lock:
+            score = self._scores.get(session_id)
+            if score is None:
+                return None
+            return {
+                'rank': self._ranking.rank(self._key(session_id, *score)),
+                'total': max(self._total, len(self._ranking)),
+                'calculations': score[0],
+                'sevens_pressed': score[1],
+            }
+
+    def top(self, limit=10, offset=0):
+        with self._lock:
+            keys = self._ranking.slice(offset + 1, limit)
+            return [{
+                'rank': offset + i + 1,
+                'session_id': session_id,
+                'calculations': -neg_calcs,
+                'sevens_pressed': -neg_sevens,
+            } for i, (neg_calcs, neg_sevens, session_id) in enumerate(keys)]
+
+    def __len__(self):
+        return max(self._total, len(self._ranking))
+
+    def checkpoint(self):
+        """
+        Add the accumulated per-session deltas to session_stats in batches,
+        then pick up what other workers have checkpointed meanwhile.
+        Safe to call from any thread.
+        """
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if dirty:
+                try:
+                    if self.breaker is not None:
+                        self.breaker.call(lambda: self._write(dirty))
+                    else:
+                        self._write(dirty)
+                except Exception as e:
+                    print(f'Leaderboard checkpoint error: {e}')
+                    # Put the deltas back so they go out with the next checkpoint,
+                    # and leave the struggling database alone until then
+                    with self._lock:
+                        for sid, (calcs, sevens) in dirty.items():
+                            delta = self._dirty.setdefault(sid, [0, 0])
+                            delta[0] += calcs
+                            delta[1] += sevens
+                    return
+            try:
+                self._sync()
+            except Exception as e:
+                print(f'Leaderboard sync error: {e}')
+        finally:
+            self._checkpoint_lock.release()
+
+    def _write(self, dirty):
+        rows = [{'session_id': sid, 'calculations': d[0], 'sevens_pressed': d[1]}
+                for sid, d in dirty.items()]
+        with self.app.app_context():
+            try:
+                with db_deadline(self.timeout, commit=True):
+                    for i in range(0, len(rows), CHECKPOINT_CHUNK):
+                        stmt = sqlite_insert(SessionStats).values(rows[i:i + CHECKPOINT_CHUNK])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=['session_id'],
+                            set_={
+                                'calculations': SessionStats.calculations + stmt.excluded.calculations,
+                                'sevens_pressed': SessionStats.sevens_pressed + stmt.excluded.sevens_pressed,
+                                'updated_at': datetime.utcnow(),
+                            }
+                        )
+                        db.session.execute(stmt)
+            except Exception:
+                db.session.rollback()
+                raise
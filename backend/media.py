@@ -0,0 +1,52 @@
+"""
+Audio clips (the division fart, the sad trombone), memory-mapped at startup.
+
+Range requests are answered straight from the mapping; whole-file responses
+go through the server's wsgi.file_wrapper so servers that support it (e.g.
+gunicorn) can sendfile() without copying through Python at all.
+"""
+import hashlib
+import mimetypes
+import mmap
+import os
+from datetime import datetime, timezone
+
+AUDIO_EXTENSIONS = {'.mp3', '.ogg', '.wav'}
+AUDIO_CACHE_CONTROL = 'public, max-age=86400'
+
+
+class MappedClip:
+    """One read-only memory-mapped file plus its validators."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.size = stat.st_size
+            # mmap can't map an empty file
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.etag = hashlib.sha256(self.data).hexdigest()[:20]
+        self.last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    def slice(self, start, stop):
+        return self.data[start:stop]
+
+    def open(self):
+        """A fresh file object for wsgi.file_wrapper (which closes it when done)."""
+        return open(self.path, 'rb')
+
+
+def load_clips(folder, prefix='assets'):
+    """Map every audio file under folder/prefix. Returns {url path: MappedClip}."""
+    clips = {}
+    directory = os.path.join(folder, prefix)
+    if not os.path.isdir(directory):
+        return clips
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+            try:
+                clips[f'{prefix}/{name}'] = MappedClip(os.path.join(directory, name))
+            except OSError as e:
+                print(f'Audio mapping error for {name}: {e}')
+    return clips
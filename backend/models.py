@@ -40,6 +40,7 @@ class Quote(db.Model):
     text = db.Column(db.Text, nullable=False)  # The quote text (can contain {current_date})
     author = db.Column(db.String(100), nullable=False)  # The fake author
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), unique=True, nullable=True)  # Dedup key, see content_import.py
 
     def __repr__(self):
         return f'<Quote by {self.author}>'
@@ -64,6 +65,7 @@ class UnitConversion(db.Model):
     unit_value = db.Column(db.Float, nullable=False)  # e.g., 5.5 (meters per giraffe)
     unit_description = db.Column(db.String(200), nullable=True)  # e.g., "tall"
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), unique=True, nullable=True)  # Dedup key, see content_import.py
 
     def __repr__(self):
         return f'<UnitConversion {self.unit_name}>'
@@ -87,6 +89,7 @@ class Nonsense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String(200), nullable=False)  # e.g., "Potato.", "Error: Number too crispy."
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), unique=True, nullable=True)  # Dedup key, see content_import.py
 
     def __repr__(self):
         return f'<Nonsense {self.text[:20]}>'
@@ -120,3 +123,100 @@ class GlobalStats(db.Model):
             'calculations_performed': self.calculations_performed,
             'time_wasted': self.time_wasted
         }
+
+
+class SharedCounterFlush(db.Model):
+    """
+    How much of a shared-memory counter segment (see shm_counters.py) has
+    already been added to GlobalStats. Updated in the same transaction as the
+    GlobalStats row, so the two can never disagree.
+    """
+    __tablename__ = 'shm_counter_flushes'
+
+    segment_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Random id in the segment header
+    sevens_pressed = db.Column(db.BigInteger, nullable=False, default=0)
+    calculations_performed = db.Column(db.BigInteger, nullable=False, default=0)
+    time_wasted = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SharedCounterFlush {self.segment_id} calcs={self.calculations_performed}>'
+
+
+class UsageRollup(db.Model):
+    """
+    Usage over time - how many of each chaos mode / easter egg / error
+    happened per minute, hour and day. Maintained incrementally by rollups.py,
+    so history never needs a scan over individual requests.
+    """
+    __tablename__ = 'usage_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', 'dimension', 'key',
+                            name='uq_usage_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)  # 'minute', 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)  # UTC start of the bucket
+    dimension = db.Column(db.String(20), nullable=False)  # 'mode', 'easter_egg' or 'error'
+    key = db.Column(db.String(50), nullable=False)  # e.g. 'gaslighting', 'black_hole'
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UsageRollup {self.granularity} {self.bucket_start} {self.dimension}={self.key}>'
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'dimension': self.dimension,
+            'key': self.key,
+            'count': self.count
+        }
+
+
+class SessionStats(db.Model):
+    """
+    Per-session counters for the (real) leaderboard of shame.
+    Keyed by the session_id the frontend generates. Checkpointed from the
+    in-memory leaderboard in leaderboard.py, not written on every request.
+    """
+    __tablename__ = 'session_stats'
+    __table_args__ = (
+        db.Index('ix_session_stats_updated_at', 'updated_at'),  # what changed since the last sync
+    )
+
+    session_id = db.Column(db.String(50), primary_key=True)
+    calculations = db.Column(db.Integer, nullable=False, default=0)
+    sevens_pressed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SessionStats {self.session_id} calcs={self.calculations}>'
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'calculations': self.calculations,
+            'sevens_pressed': self.sevens_pressed
+        }
+
+
+class StatsSketch(db.Model):
+    """
+    Compact probabilistic sketches that sit beside GlobalStats, e.g. the
+    HyperLogLog behind "unique humans who wasted time here".
+    One row per (name, period); period is 'all' or a UTC day 'YYYY-MM-DD'.
+    """
+    __tablename__ = 'stats_sketches'
+    __table_args__ = (
+        db.UniqueConstraint('name', 'period', name='uq_stats_sketch_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)  # e.g. 'unique_sessions'
+    period = db.Column(db.String(10), nullable=False)  # 'all' or '2024-01-31'
+    data = db.Column(db.LargeBinary, nullable=False)  # Serialized sketch
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StatsSketch {self.name} {self.period}>'
@@ -0,0 +1,265 @@
+"""
+Evaluate-as-you-type for the live preview.
+
+An operator-precedence (shunting-yard) parser that evaluates as it goes, so
+its whole state is two small stacks. Per session we keep the state after the
+last token that can no longer change; when the next keystroke only appends
+characters, parsing resumes from there instead of starting over. The final
+token is never committed because typing can still extend it ("1" -> "12",
+"*" -> "**", "s" -> "sqrt", "2e" -> "2e5"), and neither is anything from
+an error on ("2+." -> "2+.5"). Any other edit parses from scratch.
+
+Same grammar as safe_eval(): numbers, + - * / ** (or ^, ×, ÷), unary signs,
+parentheses, sqrt/sin/cos/tan/log/ln/abs and the constants pi and e.
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+
+FUNCTIONS = {
+    'sqrt': math.sqrt,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'log': math.log10,
+    'ln': math.log,
+    'abs': abs,
+}
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+
+# name -> (precedence, right associative)
+BINARY = {
+    '+': (1, False),
+    '-': (1, False),
+    '*': (2, False),
+    '/': (2, False),
+    '**': (4, True),
+}
+UNARY_PRECEDENCE = 3  # -2**2 == -(2**2), like Python
+
+MAX_PARTIAL_LENGTH = 200
+
+_TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:e[+-]?\d+)?|\.\d+(?:e[+-]?\d+)?)|([a-z]+)|(\*\*|[-+*/()]))')
+# A number whose exponent is still being typed ("2e", "1.5e-"), at the very end
+_PARTIAL_EXPONENT = re.compile(r'\s*(\d+\.?\d*|\.\d+)e[+-]?\Z')
+
+
+class PartialError(Exception):
+    """The prefix can't be completed into a valid expression."""
+
+
+class ParseState:
+    """Value stack + operator stack of a half-read expression."""
+    __slots__ = ('values', 'ops', 'expect_operand')
+
+    def __init__(self):
+        self.values = []
+        self.ops = []  # binary ops, 'u+'/'u-', '(' and ('fn', name)
+        self.expect_operand = True
+
+    def copy(self):
+        state = ParseState()
+        state.values = list(self.values)
+        state.ops = list(self.ops)
+        state.expect_operand = self.expect_operand
+        return state
+
+
+def normalize(expression):
+    return expression.replace('^', '**').replace('×', '*').replace('÷', '/').lower()
+
+
+def tokenize(text, start=0):
+    """[(kind, value, end)] from position start; raises PartialError on junk."""
+    tokens = []
+    pos = start
+    while pos < len(text):
+        if text[pos:].isspace():
+            break
+        match = _PARTIAL_EXPONENT.match(text, pos)
+        if match:
+            tokens.append(('num', float(match.group(1)), match.end()))
+            break
+        match = _TOKEN.match(text, pos)
+        if not match:
+            raise PartialError('syntax')
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(('num', float(number), match.end()))
+        elif name is not None:
+            tokens.append(('name', name, match.end()))
+        else:
+            tokens.append(('op', op, match.end()))
+        pos = match.end()
+    return tokens
+
+
+def _apply(state, op):
+    try:
+        if op in ('u+', 'u-'):
+            value = state.values.pop()
+            state.values.append(-value if op == 'u-' else value)
+        elif isinstance(op, tuple):
+            state.values.append(float(FUNCTIONS[op[1]](state.values.pop())))
+        else:
+            right = state.values.pop()
+            left = state.values.pop()
+            if op == '+':
+                state.values.append(left + right)
+            elif op == '-':
+                state.values.append(left - right)
+            elif op == '*':
+                state.values.append(left * right)
+            elif op == '/':
+                state.values.append(left / right)
+            else:
+                state.values.append(float(left ** right))
+    except ZeroDivisionError:
+        raise PartialError('black_hole')
+    except (ValueError, OverflowError, TypeError):
+        raise PartialError('syntax')
+
+
+def _precedence(op):
+    if op in ('u+', 'u-'):
+        return UNARY_PRECEDENCE
+    return BINARY[op][0]
+
+
+def _is_name_prefix(text):
+    return any(name.startswith(text) for name in (*FUNCTIONS, *CONSTANTS))
+
+
+def feed(state, kind, value):
+    """Advance the parser by one token (in place)."""
+    if state.ops and isinstance(state.ops[-1], tuple) and not (kind == 'op' and value == '('):
+        raise PartialError('syntax')  # function names must be followed by '('
+
+    if state.expect_operand:
+        if kind == 'num':
+            state.values.append(value)
+            state.expect_operand = False
+        elif kind == 'name' and value in CONSTANTS:
+            state.values.append(CONSTANTS[value])
+            state.expect_operand = False
+        elif kind == 'name' and value in FUNCTIONS:
+            state.ops.append(('fn', value))
+        elif kind == 'op' and value == '(':
+            state.ops.append('(')
+        elif kind == 'op' and value in ('+', '-'):
+            state.ops.append('u' + value)
+        else:
+            raise PartialError('syntax')
+        return
+
+    if kind == 'op' and value in BINARY:
+        precedence, right_assoc = BINARY[value]
+        while state.ops and state.ops[-1] != '(' and not isinstance(state.ops[-1], tuple):
+            top = _precedence(state.ops[-1])
+            if top > precedence or (top == precedence and not right_assoc):
+                _apply(state, state.ops.pop())
+            else:
+                break
+        state.ops.append(value)
+        state.expect_operand = True
+    elif kind == 'op' and value == ')':
+        while state.ops and state.ops[-1] != '(':
+            _apply(state, state.ops.pop())
+        if not state.ops:
+            raise PartialError('syntax')
+        state.ops.pop()
+        if state.ops and isinstance(state.ops[-1], tuple):
+            _apply(state, state.ops.pop())
+    else:
+        raise PartialError('syntax')
+
+
+def close(state):
+    """
+    Best-effort value of a half-typed expression: dangling operators are
+    dropped and open parentheses closed. None if there's nothing to show.
+    """
+    state = state.copy()
+    while state.expect_operand and state.ops:
+        op = state.ops.pop()
+        if op in BINARY:
+            state.expect_operand = False
+    if state.expect_operand or not state.values:
+        return None
+    while state.ops:
+        op = state.ops.pop()
+        if op != '(':
+            _apply(state, op)
+        elif state.ops and isinstance(state.ops[-1], tuple):
+            _apply(state, state.ops.pop())
+    return state.values[-1] if len(state.values) == 1 else None
+
+
+class PartialEvaluator:
+    """
+    Per-session parser states, LRU-bounded.
+
+    A session's state is only resumed when the new input extends the previous
+    one. The previous input went on past the committed prefix (by at least the
+    token that was never committed), so appending to it can't change any
+    committed token; any other edit (backspace, typing in the middle) starts over.
+    """
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> (previous text, committed text, ParseState)
+
+    def evaluate(self, expression, session_id=None):
+        """
+        Returns {'value': float | None, 'error': None | 'syntax' | 'black_hole',
+                 'complete': bool, 'reused': chars not re-parsed}.
+        """
+        text = normalize(expression)[:MAX_PARTIAL_LENGTH]
+        state, committed = ParseState(), ''
+        if session_id:
+            with self._lock:
+                cached = self._sessions.get(session_id)
+                if cached is not None:
+                    self._sessions.move_to_end(session_id)
+            if cached is not None and text.startswith(cached[0]):
+                committed, state = cached[1], cached[2].copy()
+        reused = len(committed)
+
+        try:
+            tokens = tokenize(text, len(committed))
+            for kind, value, end in tokens[:-1]:
+                feed(state, kind, value)
+                committed = text[:end]
+        except PartialError as e:
+            # Nothing past an error is kept: the next keystroke may fix it
+            # ("2+." -> "2+.5") or edit it away, and then parses from scratch
+            if session_id:
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+            return {'value': None, 'error': e.args[0], 'complete': False, 'reused': reused}
+
+        if session_id:
+            with self._lock:
+                self._sessions[session_id] = (text, committed, state)
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+
+        # The last token is only tried out on a copy; it may still grow
+        preview = state.copy()
+        try:
+            try:
+                for kind, value, _ in tokens[-1:]:
+                    feed(preview, kind, value)
+            except PartialError as e:
+                kind, value, _ = tokens[-1]
+                if e.args[0] != 'syntax' or kind != 'name' or not _is_name_prefix(value):
+                    raise
+                preview = state  # half a function name: preview without it
+            value = close(preview)
+        except PartialError as e:
+            return {'value': None, 'error': e.args[0], 'complete': False, 'reused': reused}
+        complete = not preview.expect_operand and '(' not in preview.ops
+        return {'value': value, 'error': None, 'complete': complete, 'reused': reused}
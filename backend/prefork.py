@@ -0,0 +1,179 @@
+"""
+Pre-fork helpers: warm the app up in the master, freeze the heap, and see how
+much memory the workers actually share afterwards.
+
+Forked workers share the master's pages until something writes to them, and
+in CPython "something" is mostly reference counting and the cyclic GC walking
+every object. So the master builds everything worth sharing (assets, content
+pack, formatting tables, every chaos mode, the easter eggs), collects once,
+and moves the survivors into the GC's permanent generation with gc.freeze():
+the workers' collections never touch them again. gunicorn.conf.py wires this up.
+
+Usage (on a running server, from any shell on the host):
+    python prefork.py 12345           # the gunicorn master's pid: it and every worker
+
+Inside the server, /api/admin/memory returns the same report.
+"""
+import gc
+import os
+import sys
+
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+# Numbers people actually type, whose spellings are worth having in every worker
+WARM_NUMBERS = range(-100, 1001)
+# Inputs that hit the (deterministic) easter eggs, and the functions safe_eval() allows
+WARM_EASTER_EGGS = ('42', '1+1', 'pi', '7*0', '69', '420')
+WARM_EXPRESSIONS = ('sqrt(16)+sin(pi)+cos(0)+tan(0)', 'log(100)+ln(e)+abs(-1)', '2^3×4÷2')
+
+
+def warm_up(calculator):
+    """
+    Build everything the workers would otherwise build (and dirty) one by one.
+    calculator is the imported app module. Returns what was warmed.
+    """
+    from formatting import LANGUAGES, to_base, to_roman, to_words
+
+    warmed = {'modes': calculator.mode_registry.preload()}
+
+    # The easter eggs are plain comparisons and safe_eval() has no expression
+    # cache; what they load lazily (pi's 1000 digits) is loaded here instead
+    for expression in WARM_EASTER_EGGS:
+        calculator.check_easter_eggs(expression)
+    for expression in WARM_EXPRESSIONS:
+        calculator.safe_eval(expression)
+    warmed['easter_eggs'] = len(WARM_EASTER_EGGS)
+    warmed['expressions'] = len(WARM_EXPRESSIONS)
+
+    for n in WARM_NUMBERS:
+        to_roman(n)
+        to_base(n, 2)
+        to_base(n, 16)
+        for language in LANGUAGES:
+            to_words(n, language)
+    warmed['numbers'] = len(WARM_NUMBERS)
+
+    with calculator.app.app_context():
+        # Content from the pack (maps its index) or the DB (compiles the queries once)
+        content = calculator.content
+        content.random_quote()
+        content.random_unit()
+        content.random_nonsense()
+        warmed['content_pack'] = {kind: content.pack.count(kind) for kind in ('quotes', 'units', 'nonsense')} \
+            if content.pack else None
+        # Workers get their own connections; a SQLite handle must never cross a fork
+        calculator.db.engine.dispose()
+
+    warmed['assets'] = len(calculator.assets)
+    return warmed
+
+
+def freeze():
+    """Collect once, then keep every surviving object out of future collections."""
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def after_fork(calculator):
+    """Run first thing in each worker."""
+    gc.enable()
+    with calculator.app.app_context():
+        # Drop (without closing) any pooled connection inherited from the master
+        calculator.db.engine.dispose(close=False)
+
+
+def memory_report(pid='self'):
+    """
+    RSS/PSS of one process from /proc/<pid>/smaps_rollup, in kB, or None if
+    it can't be read (not Linux, or the process is gone).
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in SMAPS_FIELDS:
+                    fields[name] = int(rest.split()[0])
+    except (OSError, ValueError):
+        return None
+    shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {
+        'pid': os.getpid() if pid == 'self' else int(pid),
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'shared_kb': shared,
+        'private_kb': private,
+        'swap_kb': fields.get('Swap', 0),
+        'shared_ratio': round(shared / fields['Rss'], 3) if fields.get('Rss') else 0.0,
+    }
+
+
+def worker_pids(master_pid):
+    """Child processes of master_pid."""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        pass
+    # Kernels without CONFIG_PROC_CHILDREN: look for processes whose parent it is
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rpartition(')')[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == master_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def host_report(master_pid=None):
+    """
+    The master and every worker, plus totals. PSS divides shared pages between
+    the processes sharing them, so total_pss_kb is what the whole server costs.
+    """
+    master_pid = master_pid or os.environ.get('CALC_PREFORK_MASTER')
+    if master_pid:
+        master_pid = int(master_pid)
+        workers = [report for report in map(memory_report, worker_pids(master_pid)) if report]
+        master = memory_report(master_pid)
+    else:
+        # Not under the gunicorn master: just this process
+        workers = [report for report in [memory_report()] if report]
+        master = None
+    processes = workers + ([master] if master else [])
+    return {
+        'master': master,
+        'workers': workers,
+        'total_rss_kb': sum(p['rss_kb'] for p in processes),
+        'total_pss_kb': sum(p['pss_kb'] for p in processes),
+        'gc_frozen': gc.get_freeze_count(),
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    master_pid = argv[0] if argv else os.environ.get('CALC_PREFORK_MASTER')
+    if not master_pid:
+        print('usage: python prefork.py <gunicorn master pid>', file=sys.stderr)
+        return 2
+    report = host_report(master_pid)
+    rows = ([('master', report['master'])] if report['master'] else []) + \
+        [('worker', worker) for worker in report['workers']]
+    print(f"{'':8} {'pid':>8} {'rss MB':>8} {'pss MB':>8} {'shared MB':>10} {'private MB':>11}")
+    for role, p in rows:
+        print(f"{role:8} {p['pid']:>8} {p['rss_kb'] / 1024:>8.1f} {p['pss_kb'] / 1024:>8.1f} "
+              f"{p['shared_kb'] / 1024:>10.1f} {p['private_kb'] / 1024:>11.1f}")
+    if rows:
+        print(f"total: {report['total_pss_kb'] / 1024:.1f} MB PSS "
+              f"({report['total_rss_kb'] / 1024:.1f} MB if nothing were shared)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
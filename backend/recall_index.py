@@ -0,0 +1,216 @@
+"""
+Recency-weighted MR: fresh memories are more likely to come back than ancient ones.
+
+Every memory in the void gets weight 2 ** (saved_at / half_life), kept in a
+Fenwick tree, so sampling and inserting are both O(log n). Weights are relative
+to a fixed origin, which means an insert never has to touch older entries; the
+origin is only moved (one O(n) rescale) when the exponents get too big for a float.
+
+The index holds ids, weights and sessions only; the value itself is fetched
+by primary key. A worker indexes its own saves directly; rows from the other
+workers are picked up with a throttled keyset query on id, so the index never
+rescans the table after startup.
+"""
+import os
+import random
+import threading
+import time
+from array import array
+from datetime import timezone
+
+from models import db, GlobalMemory
+
+# Rescale once the newest weight reaches 2 ** this (floats overflow past ~2 ** 1023)
+MAX_EXPONENT = 900
+# Rejection-sampling attempts to dodge the caller's own memories before doing it exactly
+EXCLUDE_ATTEMPTS = 8
+
+
+class FenwickTree:
+    """Prefix sums over float weights, growable. Positions are 0-based."""
+
+    def __init__(self, capacity=1024):
+        self._tree = array('d', bytes(8 * (capacity + 1)))
+        self._values = array('d', bytes(8 * capacity))
+        self.size = 0
+
+    def _grow(self):
+        values = self._values
+        self._values = array('d', bytes(8 * (2 * len(values))))
+        self._values[:len(values)] = values
+        self._rebuild()
+
+    def _rebuild(self):
+        # O(n): each node pushes its sum up to its parent once
+        tree = array('d', bytes(8 * (len(self._values) + 1)))
+        tree[1:] = self._values
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def append(self, weight):
+        if self.size == len(self._values):
+            self._grow()
+        position = self.size
+        self.size += 1
+        self.add(position, weight)
+        return position
+
+    def add(self, position, delta):
+        self._values[position] += delta
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def set(self, position, weight):
+        self.add(position, weight - self._values[position])
+
+    def get(self, position):
+        return self._values[position]
+
+    def total(self):
+        i, total = self.size, 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def scale(self, factor):
+        for i in range(self.size):
+            self._values[i] *= factor
+        self._rebuild()
+
+    def find(self, target):
+        """Smallest position whose prefix sum exceeds target (0 <= target < total)."""
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] <= target:
+                position = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return min(position, self.size - 1)
+
+
+def _epoch(moment):
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RecencyIndex:
+    """
+    In-memory weighted index over the GlobalMemory pool.
+    """
+
+    def __init__(self, app, half_life_hours=24.0, sync_interval=1.0):
+        self.app = app
+        self.half_life = half_life_hours * 3600.0
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._tree = FenwickTree()
+        self._ids = array('q')
+        self._sessions = []  # position -> session id (or None)
+        self._by_session = {}  # session id -> positions
+        self._origin = None  # epoch seconds that map to exponent 0
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._random = random.Random()
+        # Otherwise every preforked worker recalls the same memories in the same order
+        os.register_at_fork(after_in_child=self._random.seed)
+
+    def __len__(self):
+        return self._tree.size
+
+    def _insert(self, memory_id, saved_at, session_id):
+        # Caller holds self._lock
+        timestamp = _epoch(saved_at) if saved_at else time.time()
+        if self._origin is None:
+            self._origin = timestamp
+        exponent = (timestamp - self._origin) / self.half_life
+        if exponent > MAX_EXPONENT:
+            # Move the origin forward; entries that old underflow to 0, which is fair
+            self._tree.scale(2.0 ** -exponent)
+            self._origin = timestamp
+            exponent = 0.0
+        position = self._tree.append(2.0 ** exponent)
+        self._ids.append(memory_id)
+        self._sessions.append(session_id)
+        if session_id:
+            self._by_session.setdefault(session_id, []).append(position)
+
+    def add(self, memory_id, saved_at, session_id=None):
+        """
+        Index a memory this worker just saved, without a query. Only if it's
+        the next id: otherwise other workers saved in between, and the next
+        sync picks up theirs and this one in order.
+        """
+        with self._lock:
+            if memory_id == self._last_id + 1:
+                self._insert(memory_id, saved_at, session_id)
+                self._last_id = memory_id
+
+    def sync(self, force=False):
+        """Index rows saved since the last sync (keyset on id). Safe to call often."""
+        if not force and time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = time.monotonic()
+            with self.app.app_context():
+                rows = db.session.query(
+                    GlobalMemory.id, GlobalMemory.saved_at, GlobalMemory.user_session
+                ).filter(GlobalMemory.id > self._last_id).order_by(GlobalMemory.id).yield_per(10000)
+                with self._lock:
+                    for memory_id, saved_at, session_id in rows:
+                        if memory_id <= self._last_id:
+                            continue  # add()ed while we were querying
+                        self._insert(memory_id, saved_at, session_id)
+                        self._last_id = memory_id
+        except Exception as e:
+            print(f'Recall index sync error: {e}')
+        finally:
+            self._sync_lock.release()
+
+    def _pick(self):
+        total = self._tree.total()
+        if total <= 0:
+            return None
+        return self._tree.find(self._random.random() * total)
+
+    def sample_id(self, session_id=None):
+        """
+        Id of a recency-weighted random memory, preferably not one of session_id's.
+        None if the index is empty.
+        """
+        self.sync()
+        with self._lock:
+            if not self._tree.size:
+                return None
+            own = self._by_session.get(session_id) if session_id else None
+            if not own:
+                position = self._pick()
+                return None if position is None else self._ids[position]
+
+            for _ in range(EXCLUDE_ATTEMPTS):
+                position = self._pick()
+                if position is not None and self._sessions[position] != session_id:
+                    return self._ids[position]
+
+            # Mostly the caller's own memories: hide them for one exact draw
+            saved = [(p, self._tree.get(p)) for p in own]
+            for p, _ in saved:
+                self._tree.set(p, 0.0)
+            try:
+                position = self._pick()
+            finally:
+                for p, weight in saved:
+                    self._tree.set(p, weight)
+            if position is None:
+                # Only the caller's memories exist; give them one back
+                position = self._pick()
+            return None if position is None else self._ids[position]
@@ -0,0 +1,48 @@
+"""
+Opt-in request recorder for /api/calculate.
+
+Each request becomes one compact JSON line in an append-only log:
+
+    {"t": 1760870400.123, "e": "2+2", "s": "session_abc", "d": 3.41, "c": 200}
+
+t = wall-clock start (seconds), e = expression, s = session id,
+d = server-side duration (ms), c = status code. replay.py re-drives the log.
+"""
+import json
+import threading
+
+
+class RequestRecorder:
+    """Appends one line per request; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Line buffered: every record hits the file, nothing lost on a crash
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+        self.recorded = 0
+
+    def record(self, started_at, expression, session_id, duration_ms, status):
+        line = json.dumps({
+            't': round(started_at, 3),
+            'e': expression,
+            's': session_id,
+            'd': round(duration_ms, 2),
+            'c': status,
+        }, separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path):
+    """Yield the recorded requests from a log file, oldest first."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,175 @@
+"""
+Replay a recorded /api/calculate log against a running calculator.
+
+Every request is sent with an X-Replay-Seed header derived from its position
+in the log, so a target started with CALC_REPLAY_SEEDING=1 picks the same
+chaos modes and easter eggs on every run. Compare two builds by replaying
+against both, or by saving a report and passing it back as --baseline.
+
+Usage:
+    python replay.py requests.log --target http://127.0.0.1:5000
+    python replay.py requests.log --target http://new:5000 --compare http://old:5000
+    python replay.py requests.log --target http://127.0.0.1:5000 --speed 10 --save new.json
+    python replay.py requests.log --target http://127.0.0.1:5000 --baseline old.json
+
+Tip: start the target with a generous CALC_SESSION_RATE/CALC_SESSION_BURST,
+or accelerated replays will mostly measure the rate limiter.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from recorder import read_log
+
+
+def replay(entries, target, speed=1.0, concurrency=16, seed=0, timeout=30.0):
+    """
+    Re-drive entries against target, keeping the original spacing divided by
+    `speed` (speed=0 means as fast as possible). Returns one result per entry.
+    """
+    url = target.rstrip('/') + '/api/calculate'
+    results = [None] * len(entries)
+    first_ts = entries[0]['t'] if entries else 0.0
+    started = time.monotonic()
+    lock = threading.Lock()
+
+    def send(index, entry):
+        body = json.dumps({
+            'expression': entry.get('e'),
+            'session_id': entry.get('s'),
+        }).encode('utf-8')
+        req = urllib.request.Request(url, data=body, headers={
+            'Content-Type': 'application/json',
+            'X-Replay-Seed': str(seed + index),
+        })
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                payload = json.loads(resp.read())
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            payload = {}
+            status = e.code
+        except Exception as e:
+            payload = {'error': str(e)}
+            status = None
+        latency_ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            results[index] = {
+                'latency_ms': latency_ms,
+                'status': status,
+                'mode': payload.get('mode'),
+                'easter_egg': payload.get('easter_egg'),
+            }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, entry in enumerate(entries):
+            if speed:
+                due = (entry['t'] - first_ts) / speed
+                delay = due - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, index, entry)
+    return results
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def summarize(results):
+    latencies = sorted(r['latency_ms'] for r in results if r and r['status'] is not None)
+    errors = sum(1 for r in results if not r or r['status'] is None or r['status'] >= 500)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+def compare(current, baseline):
+    """Latency deltas (current - baseline) plus how many responses picked a different mode."""
+    cur, base = summarize(current), summarize(baseline)
+    deltas = {}
+    for key in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'mean_ms'):
+        diff = cur[key] - base[key]
+        pct = (diff / base[key] * 100) if base[key] else 0.0
+        deltas[key] = {'baseline': base[key], 'current': cur[key],
+                       'delta': round(diff, 2), 'delta_pct': round(pct, 1)}
+    mode_mismatches = sum(
+        1 for a, b in zip(current, baseline)
+        if a and b and (a['mode'], a['easter_egg']) != (b['mode'], b['easter_egg'])
+    )
+    return {'latency': deltas, 'mode_mismatches': mode_mismatches}
+
+
+def print_summary(label, summary):
+    print(f"{label}: {summary['requests']} requests, {summary['errors']} errors | "
+          f"p50 {summary['p50_ms']} ms  p90 {summary['p90_ms']} ms  "
+          f"p99 {summary['p99_ms']} ms  max {summary['max_ms']} ms")
+
+
+def print_comparison(result):
+    print('Latency delta (current - baseline):')
+    for key, d in result['latency'].items():
+        sign = '+' if d['delta'] >= 0 else ''
+        print(f"  {key:8} {d['baseline']:>9} -> {d['current']:>9}  ({sign}{d['delta']} ms, {sign}{d['delta_pct']}%)")
+    if result['mode_mismatches']:
+        print(f"⚠️  {result['mode_mismatches']} responses chose a different mode "
+              f"(is CALC_REPLAY_SEEDING=1 on both targets?)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded calculator traffic.')
+    parser.add_argument('log', help='Log written by CALC_RECORD_PATH')
+    parser.add_argument('--target', required=True, help='Base URL of the build under test')
+    parser.add_argument('--compare', help='Base URL of a second build to replay against')
+    parser.add_argument('--baseline', help='Report saved by an earlier --save run')
+    parser.add_argument('--save', help='Write per-request results to this file')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Time compression factor (0 = as fast as possible)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0, help='Base seed for per-request RNGs')
+    parser.add_argument('--limit', type=int, help='Only replay the first N requests')
+    args = parser.parse_args(argv)
+
+    entries = list(read_log(args.log))
+    if args.limit:
+        entries = entries[:args.limit]
+    if not entries:
+        print('Nothing to replay.')
+        return 1
+
+    results = replay(entries, args.target, args.speed, args.concurrency, args.seed)
+    print_summary(args.target, summarize(results))
+
+    baseline = None
+    if args.compare:
+        baseline = replay(entries, args.compare, args.speed, args.concurrency, args.seed)
+        print_summary(args.compare, summarize(baseline))
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    if baseline is not None:
+        print_comparison(compare(results, baseline))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'target': args.target, 'summary': summarize(results), 'results': results}, f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
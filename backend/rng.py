@@ -0,0 +1,35 @@
+"""
+The chaos engine's source of randomness.
+
+Behaves like the `random` module, but a request can be given its own seeded
+generator (see recorder.py / replay.py) so the same modes and easter eggs
+fire every time it is replayed, even when many requests run concurrently.
+"""
+import os
+import random
+import threading
+
+_shared = random.Random()
+_local = threading.local()
+
+# Forked workers (gunicorn --preload) would otherwise all roll the same dice
+os.register_at_fork(after_in_child=_shared.seed)
+
+
+class RequestRandom:
+    """Proxy to the current thread's seeded generator, or the shared one."""
+
+    def __getattr__(self, name):
+        return getattr(getattr(_local, 'rng', _shared), name)
+
+
+def seed_request(seed):
+    """Give the current thread (i.e. request) its own deterministic generator."""
+    _local.rng = random.Random(seed)
+
+
+def clear_request_seed():
+    _local.__dict__.pop('rng', None)
+
+
+rng = RequestRandom()
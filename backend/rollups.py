@@ -0,0 +1,198 @@
+"""
+Incrementally maintained usage rollups (per minute / hour / day).
+
+Each response is counted in memory under every granularity at once; the
+counts are written with one batched upsert every few seconds, from a
+background thread, so a slow database never holds up a request. Because hour
+and day buckets are maintained directly, "downsampling" old data is just
+deleting minute (and later hour) rows once they age past their retention.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from breaker import db_deadline
+from models import db, UsageRollup
+
+GRANULARITIES = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+# How long each granularity is kept before only the coarser ones remain
+RETENTION = {
+    'minute': timedelta(hours=48),
+    'hour': timedelta(days=90),
+    'day': None,  # forever
+}
+
+UPSERT_CHUNK = 500
+
+# Response modes that are really errors, tracked under the 'error' dimension
+ERROR_MODES = {'invalid_input', 'chaos_error', 'empty_input', 'rate_limited', 'overloaded'}
+
+
+def bucket_start(moment, granularity):
+    """Floor a UTC datetime to the start of its bucket."""
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupAccumulator:
+    """
+    Collects counts in memory and upserts them into usage_rollups in batches.
+    The upsert goes through `breaker` (if given) with `timeout` seconds to
+    get its write in, like the other stats writes.
+    """
+
+    def __init__(self, app, flush_interval=10.0, max_pending=1000, prune_interval=3600.0,
+                 breaker=None, timeout=None):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.prune_interval = prune_interval
+        self.breaker = breaker
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._last_prune = 0.0
+        self._flusher_pid = None
+        self._wake = None
+
+    def record(self, payload, now=None):
+        """Count one response dict from the calculator."""
+        now = now or datetime.utcnow()
+        mode = payload.get('mode')
+        dimensions = []
+        if mode in ERROR_MODES:
+            dimensions.append(('error', mode))
+        elif mode:
+            dimensions.append(('mode', mode))
+        if payload.get('easter_egg'):
+            dimensions.append(('easter_egg', payload['easter_egg']))
+        if not dimensions:
+            return
+
+        self._ensure_flusher()
+        with self._lock:
+            for granularity in GRANULARITIES:
+                start = bucket_start(now, granularity)
+                for dimension, key in dimensions:
+                    self._pending[(granularity, start, dimension, key[:50])] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()  # don't wait for the interval
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork(), so every worker checks for its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._wake = threading.Event()
+            thread = threading.Thread(target=self._flush_loop, args=(self._wake,),
+                                      name='usage-rollup-flusher', daemon=True)
+            thread.start()
+            self._flusher_pid = os.getpid()
+
+    def _flush_loop(self, wake):
+        while True:
+            wake.wait(self.flush_interval)
+            wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything pending in one upsert. Safe to call from any thread."""
+        # Only one flusher at a time; others just keep accumulating
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+            if pending:
+                try:
+                    if self.breaker is not None:
+                        self.breaker.call(lambda: self._upsert(pending))
+                    else:
+                        self._upsert(pending)
+                except Exception as e:
+                    print(f'Usage rollup flush error: {e}')
+                    with self._lock:
+                        # Try again next time, unless we're piling up too much
+                        if len(self._pending) + len(pending) <= self.max_pending * 10:
+                            self._pending.update(pending)
+                    return
+            if time.monotonic() - self._last_prune >= self.prune_interval:
+                self._last_prune = time.monotonic()
+                self.prune()
+        finally:
+            self._flush_lock.release()
+
+    def _upsert(self, pending):
+        rows = [
+            {'granularity': g, 'bucket_start': start, 'dimension': dim, 'key': key, 'count': n}
+            for (g, start, dim, key), n in pending.items()
+        ]
+        with self.app.app_context():
+            try:
+                with db_deadline(self.timeout, commit=True):
+                    # Chunked to stay well under SQLite's bound-parameter limit
+                    for i in range(0, len(rows), UPSERT_CHUNK):
+                        stmt = sqlite_insert(UsageRollup).values(rows[i:i + UPSERT_CHUNK])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=['granularity', 'bucket_start', 'dimension', 'key'],
+                            set_={'count': UsageRollup.count + stmt.excluded.count}
+                        )
+                        db.session.execute(stmt)
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def prune(self, now=None):
+        """Drop buckets older than their granularity's retention."""
+        now = now or datetime.utcnow()
+        with self.app.app_context():
+            try:
+                for granularity, keep in RETENTION.items():
+                    if keep is None:
+                        continue
+                    db.session.execute(delete(UsageRollup).where(
+                        UsageRollup.granularity == granularity,
+                        UsageRollup.bucket_start < now - keep
+                    ))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f'Usage rollup prune error: {e}')
+
+
+def history(granularity, dimension=None, since=None, until=None):
+    """
+    Read a time series straight from the rollup table.
+    Returns [{'bucket_start': iso, 'counts': {dimension: {key: n}}}, ...] oldest first.
+    """
+    query = UsageRollup.query.filter(UsageRollup.granularity == granularity)
+    if dimension:
+        query = query.filter(UsageRollup.dimension == dimension)
+    if since:
+        query = query.filter(UsageRollup.bucket_start >= since)
+    if until:
+        query = query.filter(UsageRollup.bucket_start < until)
+
+    buckets = {}
+    for row in query.order_by(UsageRollup.bucket_start).all():
+        counts = buckets.setdefault(row.bucket_start, {})
+        counts.setdefault(row.dimension, {})[row.key] = row.count
+    return [{'bucket_start': start.isoformat(), 'counts': counts}
+            for start, counts in buckets.items()]
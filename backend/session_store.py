@@ -0,0 +1,220 @@
+"""
+Bounded in-memory per-session state: recent expressions, last result,
+counters and the rate-limit token bucket.
+
+Entries live in fixed slots of parallel arrays (no object per session), with
+the LRU order kept as a doubly linked list over slot numbers. Capacity is
+fixed up front, so memory is predictable: when the store is full the least
+recently used session is evicted, and sessions idle for longer than the TTL
+are treated as new. Optionally snapshotted to a JSON file so a restart
+doesn't forget everyone.
+"""
+import json
+import math
+import os
+import threading
+import time
+from array import array
+
+NIL = -1
+
+
+class SessionStore:
+    """
+    session_id -> slot. Every public method is O(1).
+    """
+
+    def __init__(self, capacity=200000, ttl=1800.0, recent_size=5):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.recent_size = recent_size
+        self._lock = threading.Lock()
+        self._index = {}  # session_id -> slot
+
+        self._keys = [None] * capacity
+        self._recent = [()] * capacity  # tuple of the last few expressions
+        self._last_result = array('d', [math.nan]) * capacity
+        self._last_seen = array('d', bytes(8 * capacity))
+        self._calculations = array('q', bytes(8 * capacity))
+        self._sevens = array('q', bytes(8 * capacity))
+        self._tokens = array('d', bytes(8 * capacity))
+        self._tokens_updated = array('d', bytes(8 * capacity))
+
+        # LRU list: _head is the most recent slot, _tail the least
+        self._prev = array('l', [NIL]) * capacity
+        self._next = array('l', [NIL]) * capacity
+        self._head = NIL
+        self._tail = NIL
+        self._free = list(range(capacity - 1, -1, -1))
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    # Slot and LRU bookkeeping below: callers hold self._lock
+
+    def _unlink(self, slot):
+        prev, nxt = self._prev[slot], self._next[slot]
+        if prev != NIL:
+            self._next[prev] = nxt
+        else:
+            self._head = nxt
+        if nxt != NIL:
+            self._prev[nxt] = prev
+        else:
+            self._tail = prev
+        self._prev[slot] = self._next[slot] = NIL
+
+    def _push_front(self, slot):
+        self._next[slot] = self._head
+        self._prev[slot] = NIL
+        if self._head != NIL:
+            self._prev[self._head] = slot
+        self._head = slot
+        if self._tail == NIL:
+            self._tail = slot
+
+    def _release(self, slot):
+        self._unlink(slot)
+        del self._index[self._keys[slot]]
+        self._keys[slot] = None
+        self._recent[slot] = ()
+        self._free.append(slot)
+
+    def _reset(self, slot):
+        self._recent[slot] = ()
+        self._last_result[slot] = math.nan
+        self._calculations[slot] = 0
+        self._sevens[slot] = 0
+        self._tokens[slot] = math.nan  # a new bucket starts full, whatever its size
+
+    def _slot(self, session_id, now):
+        """The session's slot, created (or reset if expired) as needed, moved to the front."""
+        slot = self._index.get(session_id)
+        if slot is not None:
+            if now - self._last_seen[slot] > self.ttl:
+                self.expired += 1
+                self._reset(slot)
+            self._unlink(slot)
+        else:
+            # Expired sessions at the cold end go first; they'd be dropped anyway
+            while self._tail != NIL and now - self._last_seen[self._tail] > self.ttl:
+                self.expired += 1
+                self._release(self._tail)
+            if not self._free:
+                self.evicted += 1
+                self._release(self._tail)
+            slot = self._free.pop()
+            self._keys[slot] = session_id
+            self._index[session_id] = slot
+            self._reset(slot)
+        self._push_front(slot)
+        self._last_seen[slot] = now
+        return slot
+
+    def take_token(self, session_id, rate, burst, now=None):
+        """
+        Token bucket rate limit: `rate` tokens per second, at most `burst` saved up.
+        Returns (allowed, retry_after seconds).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = self._slot(session_id, now)
+            tokens = self._tokens[slot]
+            if math.isnan(tokens):
+                tokens = float(burst)
+            else:
+                tokens = min(burst, tokens + (now - self._tokens_updated[slot]) * rate)
+            self._tokens_updated[slot] = now
+            if tokens >= 1:
+                self._tokens[slot] = tokens - 1
+                return True, 0.0
+            self._tokens[slot] = tokens
+            return False, (max(0.0, (1 - tokens) / rate) if rate else 60.0)
+
+    def record(self, session_id, expression, result=None, sevens=0, now=None):
+        """Remember one calculation for a session."""
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = self._slot(session_id, now)
+            self._calculations[slot] += 1
+            self._sevens[slot] += sevens
+            if isinstance(expression, str):
+                self._recent[slot] = (self._recent[slot] + (expression[:100],))[-self.recent_size:]
+            self._last_result[slot] = result if isinstance(result, (int, float)) else math.nan
+
+    def get(self, session_id, now=None):
+        """The session's state as a dict, or None if unknown or expired."""
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = self._index.get(session_id)
+            if slot is None or now - self._last_seen[slot] > self.ttl:
+                return None
+            last_result = self._last_result[slot]
+            return {
+                'recent_expressions': list(self._recent[slot]),
+                'last_result': None if math.isnan(last_result) else last_result,
+                'calculations': self._calculations[slot],
+                'sevens_pressed': self._sevens[slot],
+                'last_seen': self._last_seen[slot],
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._index),
+                'capacity': self.capacity,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
+
+    def snapshot(self, path):
+        """Write every live session (coldest first) to path, atomically."""
+        with self._lock:
+            rows = []
+            slot = self._tail
+            while slot != NIL:
+                result = self._last_result[slot]
+                rows.append([
+                    self._keys[slot], self._last_seen[slot], self._calculations[slot],
+                    self._sevens[slot], None if math.isnan(self._tokens[slot]) else self._tokens[slot],
+                    self._tokens_updated[slot],
+                    None if math.isnan(result) or math.isinf(result) else result,
+                    list(self._recent[slot]),
+                ])
+                slot = self._prev[slot]
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'sessions': rows}, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f'Session snapshot error: {e}')
+
+    def restore(self, path, now=None):
+        """Load a snapshot written by snapshot(); expired sessions are skipped."""
+        now = time.time() if now is None else now
+        try:
+            with open(path, encoding='utf-8') as f:
+                rows = json.load(f).get('sessions', [])
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f'Session restore error: {e}')
+            return 0
+        restored = 0
+        with self._lock:
+            # Coldest first, so the LRU order comes back as it was
+            for session_id, last_seen, calcs, sevens, tokens, updated, result, recent in rows:
+                if now - last_seen > self.ttl:
+                    continue
+                slot = self._slot(session_id, last_seen)
+                self._calculations[slot] = calcs
+                self._sevens[slot] = sevens
+                self._tokens[slot] = math.nan if tokens is None else tokens
+                self._tokens_updated[slot] = updated
+                self._last_result[slot] = math.nan if result is None else result
+                self._recent[slot] = tuple(recent)[-self.recent_size:]
+                restored += 1
+        return restored
@@ -0,0 +1,262 @@
+"""
+Shared-memory leaderboard counters for single-host, multi-worker deployments.
+
+Every worker process owns one slot in a shared segment and only ever writes
+to that slot, so increments need no cross-process locking. One process on the
+host (whoever holds the flush lock) periodically adds the summed deltas to the
+SQLite GlobalStats row. Readers see SQLite + whatever hasn't been flushed yet.
+
+How much of the segment has been flushed is recorded in the database
+(shm_counter_flushes), in the same transaction as the GlobalStats update, and
+read back in the same SELECT as the counters. So a reader never counts a
+flush twice, and neither does a flusher that died right after committing.
+
+Segment layout (all little-endian int64):
+    header: magic, slot count, segment id
+    slot:   owner pid, sevens, calcs, time
+"""
+import fcntl
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, GlobalStats, SharedCounterFlush
+from storage import SQLiteStorage, STAT_FIELDS
+
+MAGIC = 0x3253434C43  # "CLCS2"
+HEADER_WORDS = 3
+SLOT_WORDS = 4
+WORD = 8
+
+
+class SharedCounters:
+    """
+    The raw shared segment: per-worker slots, and a random id telling this
+    segment apart from earlier ones (e.g. from before a reboot).
+    """
+
+    def __init__(self, name, slots=64):
+        size = (HEADER_WORDS + slots * SLOT_WORDS) * WORD
+        self.name = name
+        self._lock_path = os.path.join(tempfile.gettempdir(), f'{name}.lock')
+        with _FileLock(self._lock_path):
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+                created = False
+            # The segment outlives any single worker; don't let the resource
+            # tracker unlink it when the process that created it exits.
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+            self._words = self._shm.buf.cast('q')
+            if created:
+                self._words[0] = MAGIC
+                self._words[1] = slots
+                self._words[2] = random.SystemRandom().getrandbits(62)
+            elif self._words[0] != MAGIC:
+                raise RuntimeError(f'Shared memory segment {name!r} is not a counter segment '
+                                   f'(or is from an older version; stop every worker and remove it)')
+        self.slots = self._words[1]
+        self.segment_id = self._words[2]
+        self._slot = None
+        self._slot_pid = None
+        self._local_lock = threading.Lock()
+
+    def _slot_base(self, index):
+        return HEADER_WORDS + index * SLOT_WORDS
+
+    def _claim_slot(self):
+        """Take over a free slot (or one whose worker died) for this process."""
+        pid = os.getpid()
+        with _FileLock(self._lock_path):
+            for index in range(self.slots):
+                base = self._slot_base(index)
+                owner = self._words[base]
+                if owner == pid or owner == 0 or not _pid_alive(owner):
+                    # Counts left behind by a dead worker stay in the slot and
+                    # keep being summed; we simply continue from them.
+                    self._words[base] = pid
+                    self._slot = index
+                    self._slot_pid = pid
+                    return
+        raise RuntimeError(f'All {self.slots} shared counter slots are taken')
+
+    def add(self, sevens_pressed=0, calculations_performed=0, time_wasted=0):
+        """Bump this worker's slot. Aligned 8-byte stores, read without locks."""
+        with self._local_lock:
+            if self._slot_pid != os.getpid():
+                self._claim_slot()
+            base = self._slot_base(self._slot)
+            self._words[base + 1] += sevens_pressed
+            self._words[base + 2] += calculations_performed
+            self._words[base + 3] += time_wasted
+
+    def totals(self):
+        """Sum of every slot, ever."""
+        sums = [0, 0, 0]
+        for index in range(self.slots):
+            base = self._slot_base(index)
+            for i in range(3):
+                sums[i] += self._words[base + 1 + i]
+        return sums
+
+    def close(self):
+        self._words.release()
+        self._shm.close()
+
+
+class _FileLock:
+    """flock() on a lock file, usable as a context manager."""
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self._fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def abandon(self):
+        """Drop an fd inherited across fork() without unlocking the parent's lock."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMemoryStorage(SQLiteStorage):
+    """
+    SQLite storage with the three GlobalStats counters moved into shared memory.
+    The M+ void is untouched and still lives in SQLite.
+    """
+    name = 'shm'
+
+    def __init__(self, app, segment_name='fked_calc_stats', slots=64, flush_interval=5.0):
+        super().__init__()
+        self.app = app
+        self.counters = SharedCounters(segment_name, slots)
+        self.flush_interval = flush_interval
+        self._flusher_pid = None
+        self._flush_lock = _FileLock(
+            os.path.join(tempfile.gettempdir(), f'{segment_name}.flush.lock'),
+            blocking=False
+        )
+        self._holds_flush_lock = False
+        self._flushed = None  # totals as of this process's last flush
+
+    def incr_stats(self, sevens_pressed=0, calculations_performed=0, time_wasted=0):
+        self._ensure_flusher()
+        self.counters.add(sevens_pressed, calculations_performed, time_wasted)
+
+    def get_stats(self):
+        # The counters and how much of this segment they include, in one statement
+        row = db.session.execute(
+            select(GlobalStats.sevens_pressed, GlobalStats.calculations_performed, GlobalStats.time_wasted,
+                   SharedCounterFlush.sevens_pressed, SharedCounterFlush.calculations_performed,
+                   SharedCounterFlush.time_wasted)
+            .outerjoin(SharedCounterFlush, SharedCounterFlush.segment_id == self.counters.segment_id)
+            .limit(1)
+        ).first()
+        # Read after the row: totals only grow, so they always cover what it says was flushed
+        totals = self.counters.totals()
+        if row is None:
+            return dict(zip(STAT_FIELDS, totals))
+        return {
+            field: (row[i] or 0) + totals[i] - (row[3 + i] or 0)
+            for i, field in enumerate(STAT_FIELDS)
+        }
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork(), so every worker checks for its own
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flush_lock.abandon()
+        self._holds_flush_lock = False
+        thread = threading.Thread(target=self._flush_loop, name='shm-stats-flusher', daemon=True)
+        thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            # Only one process per host flushes; the rest keep trying in case it dies
+            if not self._holds_flush_lock:
+                self._holds_flush_lock = self._flush_lock.acquire()
+            if self._holds_flush_lock:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f'Shared stats flush error: {e}')
+
+    def flush(self):
+        """
+        Add everything counted since the last flush to the GlobalStats row.
+        The delta is worked out in SQL against the recorded flush marker, and
+        the marker moves in the same transaction, so running this again (or
+        after a crash at any point) never adds the same counts twice.
+        """
+        totals = self.counters.totals()
+        if totals == self._flushed:
+            return
+        segment_id = self.counters.segment_id
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(GlobalStats).values({
+                        field: getattr(GlobalStats, field) + total - func.coalesce(
+                            select(getattr(SharedCounterFlush, field))
+                            .where(SharedCounterFlush.segment_id == segment_id)
+                            .scalar_subquery(), 0)
+                        for field, total in zip(STAT_FIELDS, totals)
+                    })
+                )
+                marker = sqlite_insert(SharedCounterFlush).values(
+                    segment_id=segment_id, **dict(zip(STAT_FIELDS, totals)))
+                db.session.execute(marker.on_conflict_do_update(
+                    index_elements=['segment_id'],
+                    set_={**{field: getattr(marker.excluded, field) for field in STAT_FIELDS},
+                          'updated_at': datetime.utcnow()}
+                ))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        self._flushed = totals
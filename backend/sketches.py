@@ -0,0 +1,163 @@
+"""
+Probabilistic sketches: fixed memory no matter how much traffic we see.
+"""
+import hashlib
+import heapq
+import math
+from array import array
+
+HLL_PRECISION = 12  # 4096 registers -> 4 KB, ~1.6% standard error
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+
+
+def _hash64(item):
+    if not isinstance(item, bytes):
+        item = str(item).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    Cardinality estimator. add() and count() are O(1): the harmonic sum and
+    the number of empty registers are kept up to date as registers change.
+    Sketches with the same precision merge by taking register-wise maxima.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f'Expected {self.m} registers, got {len(self.registers)}')
+        self._recount()
+
+    def _recount(self):
+        self._inverse_sum = sum(2.0 ** -r for r in self.registers)
+        self._zeros = self.registers.count(0)
+
+    def add(self, item):
+        """Returns True if the sketch changed."""
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        old = self.registers[index]
+        if rank <= old:
+            return False
+        self.registers[index] = rank
+        self._inverse_sum += 2.0 ** -rank - 2.0 ** -old
+        if old == 0:
+            self._zeros -= 1
+        return True
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / self._inverse_sum
+        if estimate <= 2.5 * m and self._zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / self._zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Fold another sketch into this one (in place)."""
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLogs with different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        self._recount()
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.precision, self.registers)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data[0], data[1:])
+
+
+class CountMinSketch:
+    """
+    Approximate frequency counts in width x depth counters. Estimates never
+    undercount; conservative update keeps overcounting low. Counters are
+    floats so the whole sketch can be decayed.
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('d', bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, item):
+        # Two 64-bit halves of one hash give `depth` independent-enough indexes
+        if not isinstance(item, bytes):
+            item = str(item).encode('utf-8')
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item, amount=1.0):
+        """Count an item; returns its new estimate."""
+        indexes = self._indexes(item)
+        estimate = min(row[i] for row, i in zip(self.rows, indexes)) + amount
+        for row, i in zip(self.rows, indexes):
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, item):
+        return min(row[i] for row, i in zip(self.rows, self._indexes(item)))
+
+    def decay(self, factor):
+        """Multiply every counter by factor (0 < factor < 1) to age old traffic out."""
+        for n, row in enumerate(self.rows):
+            self.rows[n] = array('d', (value * factor for value in row))
+
+
+class HeavyHitters:
+    """
+    The k items with the highest estimates seen so far, in a lazily cleaned
+    min-heap: most offers are below the current minimum and cost O(1).
+    """
+
+    def __init__(self, k=50):
+        self.k = k
+        self.counts = {}
+        self._heap = []
+
+    def _clean_top(self):
+        while self._heap and self.counts.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def offer(self, item, estimate):
+        if item in self.counts:
+            self.counts[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+        elif len(self.counts) < self.k:
+            self.counts[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+        else:
+            self._clean_top()
+            if estimate <= self._heap[0][0]:
+                return
+            _, evicted = heapq.heappop(self._heap)
+            del self.counts[evicted]
+            self.counts[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+        if len(self._heap) > 4 * self.k:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def decay(self, factor):
+        self.counts = {item: count * factor for item, count in self.counts.items()}
+        self._rebuild()
+
+    def top(self, n):
+        return sorted(self.counts.items(), key=lambda pair: pair[1], reverse=True)[:n]
@@ -0,0 +1,181 @@
+"""
+Slow-query log: every SQL statement is timed through SQLAlchemy's cursor
+events, and the ones over the threshold land in a bounded in-memory ring
+together with the shape of their parameters (never the values) and the
+query plan.
+
+Each distinct statement is run through EXPLAIN QUERY PLAN once, the first
+time it's seen. A plan that scans a whole table is logged right away, fast
+or not: on a 50-row table a full scan takes microseconds, and it's much
+nicer to find out before the table has a million rows. (A scan that a LIMIT
+cuts short doesn't count; one that has to sort the table first does.)
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from sqlalchemy import event
+
+MAX_STATEMENT_LENGTH = 2000
+MAX_PLANS = 1000  # distinct statements we remember a plan (and totals) for
+EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'with', 'replace')
+# A LIMIT on the statement itself (the last clause), not one inside a subquery
+_LIMITED = re.compile(r'\bLIMIT\s+[^\s()]+(?:\s+OFFSET\s+[^\s()]+)?\s*;?\s*$', re.IGNORECASE)
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters, so the log never holds user data."""
+    if executemany:
+        rows = list(parameters)
+        return {'batch': len(rows), 'row': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def is_full_scan(plan, statement=''):
+    """
+    True if any step of an EXPLAIN QUERY PLAN reads a whole table. A scan
+    under the statement's LIMIT stops early, unless the rows go through a
+    temp b-tree first (ORDER BY RANDOM() LIMIT 1 still reads every row).
+    """
+    steps = [step.upper() for step in plan or ()]
+    scans = any(detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail
+                for detail in steps)
+    if not scans:
+        return False
+    if _LIMITED.search(statement) and not any('USE TEMP B-TREE' in detail for detail in steps):
+        return False
+    return True
+
+
+class SlowQueryLog:
+    """
+    Attach with instrument(engine). Thread-safe; recording is O(1) except for
+    the one EXPLAIN per new statement.
+    """
+
+    def __init__(self, threshold_ms=50.0, capacity=500, explain=True):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=capacity)
+        self._statements = OrderedDict()  # statement -> plan, full_scan and timing totals
+        self.recorded = 0
+
+    def instrument(self, engine):
+        explain = self.explain and engine.dialect.name == 'sqlite'
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('calc_query_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get('calc_query_started')
+            if not started:
+                return
+            elapsed = time.perf_counter() - started.pop()
+            self._observe(cursor, statement, parameters, executemany, elapsed, explain)
+
+        @event.listens_for(engine, 'handle_error')
+        def _error(exception_context):
+            conn = exception_context.connection
+            started = conn.info.get('calc_query_started') if conn is not None else None
+            if started:
+                elapsed = time.perf_counter() - started.pop()
+                if elapsed >= self.threshold:
+                    # Usually a busy database or a query that hit its deadline
+                    self._record(exception_context.statement or '', exception_context.parameters,
+                                 False, elapsed, None, reason='error',
+                                 error=f'{type(exception_context.original_exception).__name__}')
+
+    def _observe(self, cursor, statement, parameters, executemany, elapsed, explain):
+        with self._lock:
+            known = self._statements.get(statement)
+            if known is not None:
+                self._statements.move_to_end(statement)
+                known['executions'] += 1
+                known['total_ms'] += elapsed * 1000
+                known['max_ms'] = max(known['max_ms'], elapsed * 1000)
+        new = known is None
+        if new:
+            plan = self._explain(cursor, statement, parameters, executemany) if explain else None
+            known = {'plan': plan, 'full_scan': is_full_scan(plan, statement), 'executions': 1,
+                     'slow': 0, 'total_ms': elapsed * 1000, 'max_ms': elapsed * 1000}
+            with self._lock:
+                self._statements[statement] = known
+                while len(self._statements) > MAX_PLANS:
+                    self._statements.popitem(last=False)
+
+        if elapsed >= self.threshold:
+            with self._lock:
+                known['slow'] += 1
+            self._record(statement, parameters, executemany, elapsed, known['plan'], reason='slow',
+                         full_scan=known['full_scan'])
+        elif new and known['full_scan']:
+            self._record(statement, parameters, executemany, elapsed, known['plan'], reason='full_scan',
+                         full_scan=True)
+
+    @staticmethod
+    def _explain(cursor, statement, parameters, executemany):
+        if not statement.lstrip().lower().startswith(EXPLAINABLE):
+            return None
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        try:
+            # A raw DBAPI cursor on the same connection: no events, same transaction
+            explain_cursor = cursor.connection.cursor()
+            try:
+                rows = explain_cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            finally:
+                explain_cursor.close()
+        except Exception as e:
+            return [f'(no plan: {e})']
+        return [row[-1] for row in rows]
+
+    def _record(self, statement, parameters, executemany, elapsed, plan, reason, full_scan=False,
+                error=None):
+        entry = {
+            'at': datetime.utcnow().isoformat(),
+            'reason': reason,
+            'duration_ms': round(elapsed * 1000, 3),
+            'statement': statement[:MAX_STATEMENT_LENGTH],
+            'parameters': parameter_shape(parameters, executemany),
+            'plan': plan,
+            'full_scan': full_scan,
+        }
+        if error:
+            entry['error'] = error
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+    def entries(self, limit=None):
+        """Newest first."""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def statements(self, limit=20):
+        """The distinct statements with the most total time, with their plans."""
+        with self._lock:
+            items = [(statement, dict(info)) for statement, info in self._statements.items()]
+        items.sort(key=lambda item: item[1]['total_ms'], reverse=True)
+        out = []
+        for statement, info in items[:limit]:
+            info['statement'] = statement[:MAX_STATEMENT_LENGTH]
+            info['total_ms'] = round(info['total_ms'], 3)
+            info['max_ms'] = round(info['max_ms'], 3)
+            out.append(info)
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._statements.clear()
@@ -0,0 +1,366 @@
+"""
+Storage backends for the Useless Leaderboard counters and the M+ void.
+
+SQLite (the local funny_calculator.db) is the default. The Redis backend
+speaks plain RESP over a socket, so every node in a multi-node deployment
+shares the same "global" numbers and the same void. The shm backend (see
+shm_counters.py) keeps the counters in shared memory for prefork workers.
+"""
+import json
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+from sqlalchemy import func, select, update
+
+from breaker import db_deadline
+from models import db, GlobalMemory, GlobalStats
+
+STAT_FIELDS = ('sevens_pressed', 'calculations_performed', 'time_wasted')
+
+# How many void entries to sample per MR when trying to dodge your own numbers
+RECALL_SAMPLE_SIZE = 8
+
+
+class StorageError(Exception):
+    """Raised when a storage backend cannot talk to its server."""
+
+
+class RespError(str):
+    """An error reply from the server (e.g. WRONGTYPE)."""
+
+
+class SQLiteStorage:
+    """
+    The original storage: GlobalStats row + GlobalMemory table in SQLite.
+    """
+    name = 'sqlite'
+
+    def __init__(self, call_timeout=None):
+        # Max seconds the stats update may wait on a locked database
+        self.call_timeout = call_timeout
+
+    def incr_stats(self, sevens_pressed=0, calculations_performed=0, time_wasted=0):
+        """Add to the global counters."""
+        try:
+            # The commit too: taking the write lock is where a busy database makes us wait
+            with db_deadline(self.call_timeout, commit=True):
+                # Added in SQL: a read-then-write in Python loses counts when
+                # several processes update the row at once
+                db.session.execute(update(GlobalStats).values(
+                    sevens_pressed=GlobalStats.sevens_pressed + sevens_pressed,
+                    calculations_performed=GlobalStats.calculations_performed + calculations_performed,
+                    time_wasted=GlobalStats.time_wasted + time_wasted,
+                ))
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get_stats(self):
+        """Return the global counters as a dict (or None if never initialized)."""
+        stats = GlobalStats.query.first()
+        return stats.to_dict() if stats else None
+
+    def memory_save(self, value, session_id=None):
+        """Throw a value into the void. Returns {'id': ..., 'saved_at': datetime}."""
+        memory = GlobalMemory(value=value, user_session=session_id)
+        db.session.add(memory)
+        db.session.flush()
+        saved = {'id': memory.id, 'saved_at': memory.saved_at}
+        db.session.commit()
+        return saved
+
+    def memory_recall(self, session_id=None):
+        """
+        Pull a random value out of the void, preferring someone else's.
+        Returns {'value': ..., 'saved_at': datetime} or None if the void is empty.
+        """
+        memories = []
+        if session_id:
+            memories = GlobalMemory.query.filter(
+                GlobalMemory.user_session != session_id
+            ).all()
+        if not memories:
+            memories = GlobalMemory.query.all()
+        if not memories:
+            return None
+        memory = random.choice(memories)
+        return {'value': memory.value, 'saved_at': memory.saved_at}
+
+    def memory_get(self, memory_id):
+        """One memory by id (as picked by recall_index), or None."""
+        memory = db.session.get(GlobalMemory, memory_id)
+        if memory is None:
+            return None
+        return {'value': memory.value, 'saved_at': memory.saved_at}
+
+    def memory_count(self):
+        """Number of values floating in the void."""
+        return GlobalMemory.query.count()
+
+    def memory_export(self, since_id=0, since=None, page_size=5000):
+        """
+        Yield pages (lists of (id, value, saved_at)) of the void in id order,
+        starting after since_id and optionally only rows saved at/after since.
+        Keyset pagination: each page is one indexed range query on its own
+        short-lived connection, so no read transaction outlives a page and
+        writers are never blocked for long. Rows saved after the export
+        started are left for the next pull.
+        """
+        with db.engine.connect() as conn:
+            upper = conn.execute(select(func.max(GlobalMemory.id))).scalar()
+        last_id = since_id
+        while upper is not None and last_id < upper:
+            query = (select(GlobalMemory.id, GlobalMemory.value, GlobalMemory.saved_at)
+                     .where(GlobalMemory.id > last_id, GlobalMemory.id <= upper)
+                     .order_by(GlobalMemory.id)
+                     .limit(page_size))
+            if since is not None:
+                query = query.where(GlobalMemory.saved_at >= since)
+            with db.engine.connect() as conn:
+                page = conn.execute(query).all()
+            if not page:
+                return
+            last_id = page[-1][0]
+            yield page
+
+
+# =============================================================================
+# REDIS (RESP) BACKEND
+# =============================================================================
+
+class RespConnection:
+    """
+    Minimal RESP2 client. Just enough for INCRBY/MGET/SADD/SRANDMEMBER/SCARD,
+    ZADD/ZRANGEBYSCORE and pipelining; any server that speaks the Redis protocol will do.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, timeout=2.0):
+        """Build a connection from a redis://[:password@]host[:port][/db] URL."""
+        parsed = urlparse(url)
+        db_index = parsed.path.lstrip('/')
+        return cls(
+            host=parsed.hostname or '127.0.0.1',
+            port=parsed.port or 6379,
+            db=int(db_index) if db_index else 0,
+            password=parsed.password,
+            timeout=timeout,
+        )
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(setup)
+            for _ in setup:
+                reply = self._read_reply()
+                if isinstance(reply, RespError):
+                    raise StorageError(str(reply))
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    @staticmethod
+    def _encode(args):
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            else:
+                data = str(arg).encode('utf-8')
+            out.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(out)
+
+    def _send(self, commands):
+        self._sock.sendall(b''.join(self._encode(cmd) for cmd in commands))
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise StorageError('Connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            # Returned, not raised, so the rest of a pipeline is still drained
+            return RespError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            length = int(rest)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise StorageError(f'Unknown RESP reply type: {line!r}')
+
+    def pipeline(self, commands):
+        """Send all commands in one write and read back every reply in order."""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._send(commands)
+                replies = [self._read_reply() for _ in commands]
+            except (OSError, ValueError, StorageError) as e:
+                self.close()
+                raise StorageError(f'Redis connection error: {e}') from e
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise StorageError(str(reply))
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+
+class RedisStorage:
+    """
+    Redis-protocol backend.
+    Counters are plain INCRBY keys; the void is a set of JSON entries sampled
+    with SRANDMEMBER, so MR costs one round trip no matter how big it gets.
+    Each entry is also kept in a sorted set scored by its id, for memory_get
+    and keyset-paginated exports (entries saved before ids existed are only
+    in the set: recallable and counted, but not exported).
+    """
+    name = 'redis'
+
+    def __init__(self, connection, prefix='calc:'):
+        self.conn = connection
+        self.prefix = prefix
+        self.void_key = prefix + 'void'
+        self.void_ids_key = prefix + 'void:ids'
+        self.next_id_key = prefix + 'void:next_id'
+
+    def _stat_key(self, field):
+        return f'{self.prefix}stats:{field}'
+
+    def incr_stats(self, sevens_pressed=0, calculations_performed=0, time_wasted=0):
+        """Add to the global counters in a single pipelined write."""
+        deltas = {
+            'sevens_pressed': sevens_pressed,
+            'calculations_performed': calculations_performed,
+            'time_wasted': time_wasted,
+        }
+        commands = [('INCRBY', self._stat_key(field), amount)
+                    for field, amount in deltas.items() if amount]
+        if commands:
+            self.conn.pipeline(commands)
+
+    def get_stats(self):
+        values = self.conn.execute('MGET', *[self._stat_key(f) for f in STAT_FIELDS])
+        return {field: int(value or 0) for field, value in zip(STAT_FIELDS, values)}
+
+    def memory_save(self, value, session_id=None):
+        """Throw a value into the void. Returns {'id': ..., 'saved_at': datetime}."""
+        memory_id = self.conn.execute('INCRBY', self.next_id_key, 1)
+        saved_at = datetime.utcnow()
+        entry = json.dumps({
+            'i': memory_id,
+            'v': value,
+            's': session_id,
+            't': saved_at.isoformat(),
+            # Nonce so two people saving the same value at the same moment both count
+            'n': uuid.uuid4().hex[:12],
+        }, separators=(',', ':'))
+        self.conn.pipeline([
+            ('SADD', self.void_key, entry),
+            ('ZADD', self.void_ids_key, memory_id, entry),
+        ])
+        return {'id': memory_id, 'saved_at': saved_at}
+
+    def memory_recall(self, session_id=None):
+        sample = self.conn.execute('SRANDMEMBER', self.void_key, RECALL_SAMPLE_SIZE) or []
+        if not sample:
+            return None
+        entries = [json.loads(raw) for raw in sample]
+        strangers = [e for e in entries if e.get('s') != session_id] if session_id else entries
+        entry = random.choice(strangers or entries)
+        return {'value': entry['v'], 'saved_at': datetime.fromisoformat(entry['t'])}
+
+    def memory_get(self, memory_id):
+        """One memory by id, or None."""
+        raw = self.conn.execute('ZRANGEBYSCORE', self.void_ids_key, memory_id, memory_id)
+        if not raw:
+            return None
+        entry = json.loads(raw[0])
+        return {'value': entry['v'], 'saved_at': datetime.fromisoformat(entry['t'])}
+
+    def memory_count(self):
+        return self.conn.execute('SCARD', self.void_key)
+
+    def memory_export(self, since_id=0, since=None, page_size=5000):
+        """
+        Yield pages (lists of (id, value, saved_at)) of the void in id order,
+        like SQLiteStorage.memory_export: one ZRANGEBYSCORE per page, starting
+        after the last id seen. Memories saved after the export started are
+        left for the next pull.
+        """
+        upper = int(self.conn.execute('MGET', self.next_id_key)[0] or 0)
+        last_id = since_id
+        while last_id < upper:
+            raw = self.conn.execute('ZRANGEBYSCORE', self.void_ids_key, f'({last_id}', upper,
+                                    'LIMIT', 0, page_size)
+            if not raw:
+                return
+            entries = [json.loads(item) for item in raw]
+            last_id = entries[-1]['i']
+            page = [(e['i'], e['v'], datetime.fromisoformat(e['t'])) for e in entries]
+            if since is not None:
+                page = [row for row in page if row[2] >= since]
+            if page:
+                yield page
+
+
+def create_storage(app):
+    """Build the storage backend selected by app.config['STORAGE_BACKEND']."""
+    backend = app.config.get('STORAGE_BACKEND', 'sqlite')
+    if backend == 'sqlite':
+        return SQLiteStorage(call_timeout=app.config.get('DB_CALL_TIMEOUT'))
+    if backend == 'redis':
+        connection = RespConnection.from_url(
+            app.config.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+            timeout=app.config.get('REDIS_TIMEOUT', 2.0),
+        )
+        return RedisStorage(connection, prefix=app.config.get('REDIS_KEY_PREFIX', 'calc:'))
+    if backend == 'shm':
+        from shm_counters import SharedMemoryStorage
+        return SharedMemoryStorage(
+            app,
+            segment_name=app.config.get('SHM_SEGMENT_NAME', 'fked_calc_stats'),
+            slots=app.config.get('SHM_SLOTS', 64),
+            flush_interval=app.config.get('SHM_FLUSH_INTERVAL', 5.0),
+        )
+    raise ValueError(f'Unknown storage backend: {backend}')
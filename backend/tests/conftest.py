@@ -0,0 +1,49 @@
+"""
+Shared fixtures. The backend modules import each other flat (`from models
+import db`), as they do when run from backend/, so put backend/ on the path.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+# app.py configures itself at import time: give it a throwaway database,
+# honour X-Replay-Seed (deterministic chaos) and don't rate-limit the tests
+os.environ['CALC_DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='calc-tests-'), 'calculator.db')
+os.environ['CALC_REPLAY_SEEDING'] = '1'
+os.environ['CALC_SESSION_BURST'] = '100000'
+
+
+@pytest.fixture
+def db_app(tmp_path):
+    """A bare Flask app on a fresh SQLite file, with the GlobalStats row in place."""
+    from flask import Flask
+    from models import db, GlobalStats
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(GlobalStats(sevens_pressed=0, calculations_performed=0, time_wasted=0))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def calculator():
+    """The real app module (app.py), on the throwaway database."""
+    import app as calculator
+    return calculator
+
+
+@pytest.fixture
+def client(calculator):
+    return calculator.app.test_client()
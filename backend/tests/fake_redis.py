@@ -0,0 +1,163 @@
+"""
+An in-process RESP2 server for testing storage.RespConnection/RedisStorage.
+
+Implements the handful of commands RedisStorage uses (plus AUTH/SELECT),
+on one thread per client. Tests can queue error replies and drop every
+open connection to exercise the client's error and reconnect paths.
+"""
+import random
+import socket
+import threading
+
+
+class FakeRedis:
+    def __init__(self, password=None):
+        self.password = password
+        self.dbs = {}
+        self.commands = []      # every command received, decoded
+        self.connections = 0    # connections accepted so far
+        self._errors = []       # error replies to send instead of the next results
+        self._clients = []
+        self._lock = threading.Lock()
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(('127.0.0.1', 0))
+        self._listener.listen()
+        self.port = self._listener.getsockname()[1]
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.port}/0'
+
+    def fail_next(self, message):
+        """Reply to the next command with -message instead of running it."""
+        with self._lock:
+            self._errors.append(message)
+
+    def drop_connections(self):
+        """Close every client connection, as a restarting server would."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+        self.drop_connections()
+
+    # -- server side --------------------------------------------------------
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._clients.append(sock)
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        reader = sock.makefile('rb')
+        state = {'db': 0, 'authed': self.password is None}
+        try:
+            while True:
+                command = self._read_command(reader)
+                if command is None:
+                    return
+                sock.sendall(self._dispatch(command, state))
+        except OSError:
+            return
+        finally:
+            reader.close()
+
+    @staticmethod
+    def _read_command(reader):
+        line = reader.readline()
+        if not line:
+            return None
+        assert line[:1] == b'*', line
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = reader.readline()
+            assert header[:1] == b'$', header
+            args.append(reader.read(int(header[1:-2]) + 2)[:-2].decode('utf-8'))
+        return args
+
+    def _dispatch(self, command, state):
+        with self._lock:
+            self.commands.append(command)
+            if self._errors:
+                return b'-%s\r\n' % self._errors.pop(0).encode()
+        name, args = command[0].upper(), command[1:]
+        if name == 'AUTH':
+            if args[0] != self.password:
+                return b'-WRONGPASS invalid password\r\n'
+            state['authed'] = True
+            return b'+OK\r\n'
+        if not state['authed']:
+            return b'-NOAUTH Authentication required.\r\n'
+        if name == 'SELECT':
+            state['db'] = int(args[0])
+            return b'+OK\r\n'
+        data = self.dbs.setdefault(state['db'], {})
+        with self._lock:
+            if name == 'INCRBY':
+                value = data.get(args[0], 0)
+                if not isinstance(value, int):
+                    return b'-WRONGTYPE Operation against a key holding the wrong kind of value\r\n'
+                data[args[0]] = value + int(args[1])
+                return b':%d\r\n' % data[args[0]]
+            if name == 'MGET':
+                return self._array([None if data.get(key) is None else str(data[key]) for key in args])
+            if name == 'SADD':
+                members = data.setdefault(args[0], set())
+                if not isinstance(members, set):
+                    return b'-WRONGTYPE Operation against a key holding the wrong kind of value\r\n'
+                added = len(set(args[1:]) - members)
+                members.update(args[1:])
+                return b':%d\r\n' % added
+            if name == 'SRANDMEMBER':
+                members = sorted(data.get(args[0], set()))
+                return self._array(random.sample(members, min(int(args[1]), len(members))))
+            if name == 'SCARD':
+                return b':%d\r\n' % len(data.get(args[0], set()))
+            if name == 'ZADD':
+                scores = data.setdefault(args[0], {})
+                if not isinstance(scores, dict):
+                    return b'-WRONGTYPE Operation against a key holding the wrong kind of value\r\n'
+                pairs = list(zip(args[1::2], args[2::2]))
+                added = sum(member not in scores for _, member in pairs)
+                scores.update((member, float(score)) for score, member in pairs)
+                return b':%d\r\n' % added
+            if name == 'ZRANGEBYSCORE':
+                low, high = args[1], float(args[2])
+                if low.startswith('('):
+                    in_range = lambda score: float(low[1:]) < score <= high
+                else:
+                    in_range = lambda score: float(low) <= score <= high
+                scores = data.get(args[0], {})
+                members = sorted((m for m in scores if in_range(scores[m])), key=lambda m: (scores[m], m))
+                if len(args) > 3 and args[3].upper() == 'LIMIT':
+                    members = members[int(args[4]):int(args[4]) + int(args[5])]
+                return self._array(members)
+        return b"-ERR unknown command '%s'\r\n" % command[0].encode()
+
+    @staticmethod
+    def _array(items):
+        out = [b'*%d\r\n' % len(items)]
+        for item in items:
+            if item is None:
+                out.append(b'$-1\r\n')
+            else:
+                data = item.encode('utf-8')
+                out.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(out)
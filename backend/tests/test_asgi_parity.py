@@ -0,0 +1,171 @@
+"""The ASGI server answers like the Flask app, route for route."""
+import asyncio
+import json
+
+import pytest
+
+import asgi
+
+CLIENT = '127.0.0.1'
+
+
+class Reply:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers  # lower-case names
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def via_flask(client, method, path, body=None, headers=None):
+    response = client.open(path, method=method, json=body, headers=headers or {})
+    return Reply(response.status_code, {k.lower(): v for k, v in response.headers.items()}, response.data)
+
+
+def via_asgi(method, path, body=None, headers=None):
+    path, _, query = path.partition('?')
+    raw = b'' if body is None else json.dumps(body).encode()
+    header_list = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if body is not None:
+        header_list.append((b'content-type', b'application/json'))
+    messages = []
+
+    async def run():
+        incoming = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+
+        async def receive():
+            return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        await asgi.app({
+            'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+            'headers': header_list, 'client': (CLIENT, 50000), 'server': ('localhost', 80),
+            'scheme': 'http', 'http_version': '1.1', 'root_path': '',
+        }, receive, send)
+
+    asyncio.run(run())
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start['headers']}
+    return Reply(start['status'], headers, b''.join(m.get('body', b'') for m in messages[1:]))
+
+
+def both(client, method, path, body=None, headers=None):
+    return via_flask(client, method, path, body, headers), via_asgi(method, path, body, headers)
+
+
+def assert_same_json(flask, native):
+    assert (native.status, native.json()) == (flask.status, flask.json())
+    assert native.headers['content-type'] == flask.headers['content-type'] == 'application/json'
+
+
+def test_seeded_calculation(client):
+    body = {'expression': '6*7+1', 'session_id': 'parity'}
+    flask, native = both(client, 'POST', '/api/calculate', body, {'X-Replay-Seed': 'parity-1'})
+    assert_same_json(flask, native)
+
+
+def test_easter_egg(client):
+    assert_same_json(*both(client, 'POST', '/api/calculate', {'expression': '42'}))
+
+
+def test_invalid_calculation(client):
+    assert_same_json(*both(client, 'POST', '/api/calculate', {'nope': 1}, {'X-Replay-Seed': 'parity-2'}))
+
+
+def test_partial(client):
+    flask, native = both(client, 'POST', '/api/calculate/partial', {'expression': '2e5+(1', 'session_id': 'p'})
+    assert native.status == flask.status == 200
+    bodies = native.json(), flask.json()
+    for body in bodies:
+        body.pop('preview')  # its wording is picked at random
+    assert bodies[0] == bodies[1]
+
+
+def test_memory_save_and_recall(client):
+    assert_same_json(*both(client, 'POST', '/api/memory/save', {'value': '1234', 'session_id': 'parity'}))
+    assert_same_json(*both(client, 'POST', '/api/memory/save', {}))
+    assert_same_json(*both(client, 'GET', '/api/memory/count'))
+    # Which memory comes back is random; what comes back isn't
+    flask, native = both(client, 'GET', '/api/memory/recall?session_id=parity')
+    assert native.status == flask.status == 200
+    assert native.json().keys() == flask.json().keys()
+
+
+def test_stats(client):
+    assert_same_json(*both(client, 'GET', '/api/stats'))
+
+
+@pytest.mark.parametrize('path', ['/', '/style.css', '/script.js'])
+@pytest.mark.parametrize('encoding', ['', 'gzip', 'br, gzip'])
+def test_assets_and_not_modified(calculator, client, path, encoding):
+    if path[1:] not in calculator.assets:
+        pytest.skip('asset pipeline is off')
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    flask, native = both(client, 'GET', path, headers=headers)
+    assert native.status == flask.status == 200
+    assert native.body == flask.body
+    for name in ('etag', 'cache-control', 'vary', 'content-type', 'content-encoding', 'content-length'):
+        assert native.headers.get(name) == flask.headers.get(name), name
+
+    flask, native = both(client, 'GET', path, headers={**headers, 'If-None-Match': flask.headers['etag']})
+    assert native.status == flask.status == 304
+    assert native.body == flask.body == b''
+    assert native.headers['etag'] == flask.headers['etag']
+
+
+def test_bridged_routes(client):
+    flask, native = both(client, 'POST', '/api/format', {'numbers': [7, 42], 'formats': ['roman', 'hex']})
+    assert_same_json(flask, native)
+    assert native.json()['results'][1]['formatted'] == {'roman': 'XLII', 'hex': '2A'}
+    assert_same_json(*both(client, 'GET', '/api/leaderboard/rank?session_id=parity'))
+    assert_same_json(*both(client, 'GET', '/api/health'))
+
+
+def test_an_exception_is_a_json_500(calculator, client, monkeypatch):
+    def broken():
+        raise RuntimeError('the stats are on fire')
+
+    monkeypatch.setattr(calculator, 'stats_payload', broken)
+    flask, native = both(client, 'GET', '/api/stats')
+    assert_same_json(flask, native)
+    assert native.status == 500
+    assert native.json() == calculator.INTERNAL_ERROR
+
+
+def test_websocket_frames(calculator):
+    frames = [
+        'not json',
+        json.dumps({'id': 1, 'type': 'partial', 'expression': '1.5e3*2'}),
+        json.dumps({'id': 2, 'expression': '42', 'session_id': 'ws'}),
+        json.dumps({'id': 3, 'expression': '1+1'}),
+    ]
+    sent = []
+
+    async def run():
+        incoming = [{'type': 'websocket.connect'}] + \
+            [{'type': 'websocket.receive', 'text': raw} for raw in frames] + \
+            [{'type': 'websocket.disconnect', 'code': 1000}]
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi.app({'type': 'websocket', 'path': '/api/ws', 'client': (CLIENT, 50000),
+                        'headers': []}, receive, send)
+
+    asyncio.run(run())
+    assert sent[0] == {'type': 'websocket.accept'}
+    replies = [json.loads(m['text']) for m in sent[1:]]
+    # flask-sock's channel answers every frame with socket_frame()
+    with calculator.app.app_context():
+        expected = [json.loads(calculator.socket_frame(raw, CLIENT)) for raw in frames]
+    for frame in replies + expected:
+        frame['payload'].pop('preview', None)  # the partial's wording is picked at random
+    assert replies == expected
+    assert [r['id'] for r in replies] == [None, 1, 2, 3]
@@ -0,0 +1,45 @@
+"""batch.py: a fresh database, several workers, every calculation counted."""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import BACKEND
+
+LINES = 400
+
+
+def run_batch(tmp_path, *args):
+    expressions = tmp_path / 'expressions.txt'
+    expressions.write_text(''.join(f'{n} + 7\n' for n in range(LINES)))
+    env = {**os.environ, 'CALC_DATABASE_PATH': str(tmp_path / 'fresh.db')}
+    return subprocess.run([sys.executable, 'batch.py', str(expressions), *args],
+                          cwd=BACKEND, env=env, capture_output=True, text=True, timeout=120)
+
+
+def counters(tmp_path):
+    with sqlite3.connect(tmp_path / 'fresh.db') as conn:
+        return conn.execute('SELECT calculations_performed, sevens_pressed FROM global_stats').fetchone()
+
+
+def test_every_line_is_counted_on_a_fresh_database(tmp_path):
+    result = run_batch(tmp_path, '--workers', '4', '--chunk-size', '25', '--stats', '--seed', '1')
+    assert result.returncode == 0, result.stderr
+    answers = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [a['line'] for a in answers] == list(range(1, LINES + 1))
+    assert 'already exists' not in result.stderr
+
+    sevens = sum(f'{n} + 7'.count('7') for n in range(LINES))
+    assert counters(tmp_path) == (LINES, sevens)
+
+    # And again on the now existing database
+    assert run_batch(tmp_path, '--workers', '4', '--chunk-size', '25', '--stats').returncode == 0
+    assert counters(tmp_path) == (2 * LINES, 2 * sevens)
+
+
+def test_without_stats_nothing_is_counted(tmp_path):
+    result = run_batch(tmp_path, '--workers', '2', '--no-db')
+    assert result.returncode == 0, result.stderr
+    assert len(result.stdout.splitlines()) == LINES
+    assert counters(tmp_path) == (0, 0)
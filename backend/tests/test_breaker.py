@@ -0,0 +1,36 @@
+"""CircuitBreaker: half-open probes."""
+import pytest
+
+from breaker import CircuitBreaker, CircuitOpenError, HALF_OPEN
+
+
+def half_open():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0)
+    breaker._on_failure('test')
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def interrupted():
+    raise KeyboardInterrupt
+
+
+def test_only_one_probe_at_a_time():
+    breaker = half_open()
+    seen = []
+
+    def probe():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: None)
+        seen.append('probed')
+
+    breaker.call(probe)
+    assert seen == ['probed'] and breaker.short_circuited == 1
+
+
+def test_an_interrupted_probe_lets_the_next_caller_probe():
+    breaker = half_open()
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupted)
+    assert breaker.call(lambda: 'recovered') == 'recovered'
+    assert breaker.short_circuited == 0
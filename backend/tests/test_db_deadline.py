@@ -0,0 +1,59 @@
+"""db_deadline: a locked database costs a call its timeout, not SQLite's default five seconds."""
+import sqlite3
+import time
+
+import pytest
+
+from breaker import db_deadline
+from models import db, GlobalStats
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def reader(db_app):
+    """Another connection in the middle of a read: the UPDATE gets through, the COMMIT has to wait."""
+    with db_app.app_context():
+        path = db.engine.url.database
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('BEGIN')
+    conn.execute('SELECT * FROM global_stats').fetchall()
+    yield conn
+    conn.close()
+
+
+def busy_timeout():
+    with db.engine.connect() as conn:
+        return conn.exec_driver_sql('PRAGMA busy_timeout').scalar()
+
+
+def test_incr_stats_commit_is_bounded_by_the_deadline(db_app, reader):
+    storage = SQLiteStorage(call_timeout=0.2)
+    with db_app.app_context():
+        default_timeout = busy_timeout()
+        started = time.monotonic()
+        with pytest.raises(Exception, match='locked'):
+            storage.incr_stats(calculations_performed=1)
+        assert time.monotonic() - started < 1.5
+        assert busy_timeout() == default_timeout
+
+    reader.execute('ROLLBACK')
+    with db_app.app_context():
+        storage.incr_stats(calculations_performed=1)
+        assert GlobalStats.query.first().calculations_performed == 1  # the failed one left no trace
+        assert busy_timeout() == default_timeout
+
+
+def test_commit_happens_at_the_end_of_the_block(db_app):
+    with db_app.app_context():
+        with db_deadline(0.5, commit=True):
+            GlobalStats.query.first().time_wasted = 99
+        db.session.remove()
+        assert GlobalStats.query.first().time_wasted == 99
+
+
+def test_no_commit_unless_asked(db_app):
+    with db_app.app_context():
+        with db_deadline(0.5):
+            GlobalStats.query.first().time_wasted = 99
+        db.session.rollback()
+        assert GlobalStats.query.first().time_wasted == 0
@@ -0,0 +1,33 @@
+"""Number words past the named scales, and where /api/format draws the line."""
+import pytest
+
+from formatting import LANGUAGES, MAX_WORD_DIGITS, to_words
+
+
+@pytest.mark.parametrize('n, language, words', [
+    (10 ** 36, 'english', 'one thousand decillion'),
+    (2 * 10 ** 21 + 80, 'french', 'deux mille trillions quatre-vingts'),
+    (10 ** 24, 'spanish', 'un millón de trillones'),
+    (1001 * 10 ** 18, 'german', 'eintausendeine Trillionen'),
+    (10 ** 24 + 3, 'japanese', '一万垓三 (ichiman gai san)'),
+    (-7 * 10 ** 99, 'english', 'negative seven decillion decillion decillion'),
+])
+def test_past_the_named_scales(n, language, words):
+    assert to_words(n, language) == words
+
+
+@pytest.mark.parametrize('language', LANGUAGES)
+def test_every_length_is_spelled_out(language):
+    for digits in range(1, MAX_WORD_DIGITS + 1):
+        words = to_words(int('9' * digits), language)
+        assert words and not any(ch.isdigit() for ch in words), (digits, words)
+
+
+def test_format_rejects_numbers_too_long_for_words(client):
+    too_long = 10 ** MAX_WORD_DIGITS * 5
+    response = client.post('/api/format', json={'numbers': [7, too_long], 'formats': ['words:french']})
+    assert response.status_code == 400
+    assert str(MAX_WORD_DIGITS) in response.get_json()['message']
+
+    response = client.post('/api/format', json={'numbers': [7, too_long], 'formats': ['hex']})
+    assert response.status_code == 200
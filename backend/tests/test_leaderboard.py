@@ -0,0 +1,202 @@
+"""The per-session leaderboard: ranking, syncing between workers, and its memory cap."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+
+from breaker import CircuitBreaker
+from leaderboard import Leaderboard, RankedSkipList
+from models import db, SessionStats
+
+
+def make_board(app, **kwargs):
+    board = Leaderboard(app, checkpoint_interval=3600, **kwargs)
+    board.load()
+    return board
+
+
+def play(board, session_id, times, sevens=0):
+    for _ in range(times):
+        board.record(session_id, sevens)
+
+
+def stored(app, session_id):
+    with app.app_context():
+        row = db.session.get(SessionStats, session_id)
+        db.session.remove()
+        return row.calculations if row else 0
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def statements(db_app):
+    """SQL run against the test database, from any thread."""
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append((threading.current_thread(), statement))
+
+    with db_app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_skip_list_ranks():
+    ranking = RankedSkipList()
+    for key in [5, 1, 4, 2, 3]:
+        ranking.insert(key)
+    assert [ranking.rank(k) for k in range(1, 6)] == [1, 2, 3, 4, 5]
+    assert ranking.slice(2, 2) == [2, 3]
+    assert ranking.remove(3) and not ranking.remove(3)
+    assert ranking.rank(4) == 3 and len(ranking) == 4
+
+
+def test_ranking_order(db_app):
+    board = make_board(db_app)
+    play(board, 'sloth', 1)
+    play(board, 'keen', 3)
+    play(board, 'lucky', 3, sevens=1)
+    assert [e['session_id'] for e in board.top()] == ['lucky', 'keen', 'sloth']
+    assert board.rank('keen') == {'rank': 2, 'total': 3, 'calculations': 3, 'sevens_pressed': 0}
+    assert board.rank('nobody') is None
+
+
+@pytest.mark.parametrize('odd_id', [123, 4.5, None, ('a',), ['a']])
+def test_non_string_session_ids_are_not_ranked(db_app, odd_id):
+    board = make_board(db_app)
+    play(board, 'abc', 1)
+    play(board, odd_id, 1)  # same score as 'abc': comparing the keys used to raise
+    assert len(board) == 1
+    assert board.rank('abc')['rank'] == 1
+    assert board.top() == [{'rank': 1, 'session_id': 'abc', 'calculations': 1, 'sevens_pressed': 0}]
+
+
+def test_mixed_session_id_types_through_the_api(client):
+    client.post('/api/calculate', json={'expression': '42', 'session_id': 'abc'})
+    response = client.post('/api/calculate', json={'expression': '42', 'session_id': 123})
+    assert response.status_code == 200
+    assert response.get_json()['mode'] == 'easter_egg'
+    response = client.get('/api/leaderboard')
+    assert response.status_code == 200
+    assert all(isinstance(e['player'], str) for e in response.get_json()['leaders'])
+
+
+def test_workers_converge_at_each_checkpoint(db_app):
+    first, second = make_board(db_app), make_board(db_app)
+    play(first, 'alice', 3)
+    play(second, 'bob', 2)
+    play(second, 'alice', 1)
+
+    first.checkpoint()
+    second.checkpoint()
+    first.checkpoint()
+    for board in (first, second):
+        assert board.rank('alice')['calculations'] == 4
+        assert board.rank('bob') == {'rank': 2, 'total': 2, 'calculations': 2, 'sevens_pressed': 0}
+
+    # What a worker hasn't checkpointed yet stays on top of what it reads back
+    play(second, 'bob', 5)
+    first.checkpoint()
+    second.checkpoint()
+    assert second.rank('bob')['calculations'] == 7
+    assert first.rank('bob')['calculations'] == 2  # until its next checkpoint
+    first.checkpoint()
+    assert first.rank('bob')['calculations'] == 7
+
+
+def test_a_new_worker_starts_from_the_database(db_app):
+    board = make_board(db_app)
+    play(board, 'veteran', 4, sevens=2)
+    board.checkpoint()
+    assert make_board(db_app).rank('veteran') == {
+        'rank': 1, 'total': 1, 'calculations': 4, 'sevens_pressed': 8}
+
+
+def test_memory_is_capped_at_the_top_sessions(db_app):
+    board = make_board(db_app, capacity=3)
+    for n in range(1, 7):
+        play(board, f'player{n}', n)
+    assert len(board._scores) == 3
+
+    board.checkpoint()
+    assert len(board._scores) == 3
+    assert len(board) == 6
+    assert [e['session_id'] for e in board.top()] == ['player6', 'player5', 'player4']
+    assert board.rank('player4') == {'rank': 3, 'total': 6, 'calculations': 4, 'sevens_pressed': 0}
+    # Below the top, sessions are counted but not ranked
+    assert board.rank('player2') is None
+    assert stored(db_app, 'player2') == 2
+
+
+def test_an_evicted_session_can_climb_back(db_app):
+    board = make_board(db_app, capacity=2)
+    play(board, 'big', 10)
+    play(board, 'medium', 5)
+    play(board, 'small', 1)
+    assert 'small' not in board._scores and board.rank('small') is None
+    board.checkpoint()
+    assert stored(db_app, 'small') == 1  # not lost
+
+    play(board, 'small', 9)  # 10 now, though this worker only has the deltas...
+    assert board.rank('small') is None
+    board.checkpoint()  # ...until the checkpoint reads the whole score back
+    assert [e['session_id'] for e in board.top()] == ['big', 'small']
+    assert board.rank('small') == {'rank': 2, 'total': 3, 'calculations': 10, 'sevens_pressed': 0}
+
+
+def test_requests_never_touch_the_database(db_app, statements):
+    board = Leaderboard(db_app, checkpoint_interval=0.05, capacity=2)
+    board.load()
+    statements.clear()
+    play(board, 'big', 10)
+    play(board, 'medium', 5)
+    play(board, 'small', 1)  # evicted
+    for session_id in ('big', 'small', 'nobody'):
+        board.rank(session_id)
+    board.top()
+    assert [s for thread, s in statements if thread is threading.current_thread()] == []
+
+    # The checkpoint happens on its own thread
+    assert wait_for(lambda: stored(db_app, 'big') == 10)
+
+
+def test_an_open_breaker_keeps_the_deltas_for_later(db_app):
+    breaker = CircuitBreaker('stats', failure_threshold=1, reset_timeout=3600)
+    breaker._on_failure('test')
+    board = make_board(db_app, breaker=breaker)
+    play(board, 'patient', 3)
+    board.checkpoint()
+    assert stored(db_app, 'patient') == 0
+    assert breaker.short_circuited == 1
+
+    breaker._on_success()
+    play(board, 'patient', 1)
+    board.checkpoint()
+    assert stored(db_app, 'patient') == 4
+    assert board.rank('patient')['calculations'] == 4
+
+
+def test_an_open_stats_breaker_skips_the_leaderboard_too(calculator):
+    breaker = calculator.breakers['stats']
+    for _ in range(breaker.failure_threshold):
+        breaker._on_failure('test')
+    try:
+        assert breaker.snapshot()['state'] == 'open'
+        calculator.record_stats(1, 0.5, session_id='while-it-was-down')
+    finally:
+        breaker._on_success()
+    assert calculator.leaderboard.rank('while-it-was-down') is None
+    with calculator.app.app_context():
+        calculator.record_stats(1, 0.5, session_id='after-it-came-back')
+    assert calculator.leaderboard.rank('after-it-came-back')['calculations'] == 1
@@ -0,0 +1,88 @@
+"""PartialEvaluator: typing keystroke by keystroke gives what parsing afresh gives."""
+import random
+
+import pytest
+
+from partial import PartialEvaluator
+
+EXPRESSIONS = [
+    '2e5',
+    '2e5+1',
+    '1.5e3*2',
+    '2e-3',
+    '2e+5-1',
+    '.5e2',
+    '2+.5',
+    '3.25*4',
+    'sqrt(16)+2**3',
+    '2^3^2',
+    '-(1+2)*3',
+    'sin(pi/2)+e',
+    'abs(-3) / 2',
+    '1/0+2',
+    '1/(2-2)+3',
+    '2e)',
+    '2 e5',
+    '1.2.3',
+    '2+#3',
+]
+
+
+def without_reuse(result):
+    return {k: v for k, v in result.items() if k != 'reused'}
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_keystrokes_match_a_fresh_parse(expression):
+    typing, fresh = PartialEvaluator(), PartialEvaluator()
+    for end in range(1, len(expression) + 1):
+        prefix = expression[:end]
+        assert without_reuse(typing.evaluate(prefix, 'typist')) == \
+            without_reuse(fresh.evaluate(prefix)), prefix
+
+
+def test_typing_an_exponent():
+    partials = PartialEvaluator()
+    seen = [partials.evaluate(prefix, 's')['value'] for prefix in ('1', '1.', '1.5', '1.5e', '1.5e3')]
+    assert seen == [1, 1, 1.5, 1.5, 1500]
+    partials.evaluate('1.5e3*', 's')
+    # The whole number is committed once an operator follows it
+    assert partials.evaluate('1.5e3*2', 's') == {'value': 3000, 'error': None, 'complete': True, 'reused': 5}
+
+
+def test_backspacing_out_of_an_error():
+    partials = PartialEvaluator()
+    assert partials.evaluate('2+*', 's')['error'] == 'syntax'
+    assert partials.evaluate('2+*3', 's')['error'] == 'syntax'
+    assert partials.evaluate('2+3', 's')['value'] == 5
+
+
+def test_backspacing_and_retyping():
+    partials, fresh = PartialEvaluator(), PartialEvaluator()
+    for text in ('8', '8+', '8', '85', '85+', '85+1'):
+        assert without_reuse(partials.evaluate(text, 's')) == without_reuse(fresh.evaluate(text)), text
+    assert partials.evaluate('85+1', 's')['value'] == 86
+
+
+def test_editing_in_the_middle():
+    partials = PartialEvaluator()
+    partials.evaluate('12+3*', 's')
+    assert partials.evaluate('1+3*', 's')['reused'] == 0
+    assert partials.evaluate('1+3*4', 's')['value'] == 13
+    partials.evaluate('2*3+', 's')
+    assert partials.evaluate('2*43+', 's')['value'] == 86
+
+
+def test_random_edits_match_a_fresh_parse():
+    rnd = random.Random(39)
+    alphabet = '0123456789.e+-*/()^ sqrtpi'
+    typing, fresh = PartialEvaluator(), PartialEvaluator()
+    for _ in range(300):
+        text = ''
+        for _ in range(25):
+            position = rnd.randint(0, len(text))
+            if text and rnd.random() < 0.3:
+                text = text[:position - 1] + text[position:]  # backspace
+            else:
+                text = text[:position] + rnd.choice(alphabet) + text[position:]
+            assert without_reuse(typing.evaluate(text, 'fuzz')) == without_reuse(fresh.evaluate(text)), text
@@ -0,0 +1,18 @@
+"""prefork.warm_up: what the master builds before forking."""
+import sys
+
+import prefork
+
+
+def test_warm_up_loads_what_the_workers_would(calculator):
+    sys.modules.pop('pi_digits', None)
+    warmed = prefork.warm_up(calculator)
+    assert warmed['easter_eggs'] == len(prefork.WARM_EASTER_EGGS)
+    assert warmed['expressions'] == len(prefork.WARM_EXPRESSIONS)
+    assert 'pi_digits' in sys.modules
+    assert [calculator.safe_eval(e) for e in prefork.WARM_EXPRESSIONS] == [5.0, 4.0, 16.0]
+
+
+def test_the_warm_inputs_hit_their_easter_eggs(calculator):
+    eggs = [calculator.check_easter_eggs(expression)['easter_egg'] for expression in prefork.WARM_EASTER_EGGS]
+    assert eggs == ['hitchhikers_guide', 'commitment', 'pi_digits', 'times_zero', 'nice', 'nice']
@@ -0,0 +1,80 @@
+"""RecencyIndex: saves are indexed as they happen, other workers' on the next sync."""
+import pytest
+from sqlalchemy import event
+
+from models import db, GlobalMemory
+from recall_index import RecencyIndex
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def index(db_app):
+    index = RecencyIndex(db_app, sync_interval=3600)
+    index.sync(force=True)
+    return index
+
+
+@pytest.fixture
+def statements(db_app):
+    """SQL run against the test database, as it happens."""
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    with db_app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def save(app, value, session_id=None):
+    with app.app_context():
+        saved = SQLiteStorage().memory_save(value, session_id)
+        db.session.remove()
+    return saved
+
+
+def indexed_ids(index):
+    return list(index._ids)
+
+
+def test_own_saves_are_indexed_without_a_query(db_app, index, statements):
+    for value in ('1', '2', '3'):
+        saved = save(db_app, value, 'me')
+        del statements[:]
+        index.add(saved['id'], saved['saved_at'], 'me')
+        assert statements == []
+    assert indexed_ids(index) == [1, 2, 3]
+    assert index._by_session['me'] == [0, 1, 2]
+
+
+def test_other_workers_saves_wait_for_the_sync(db_app, index):
+    save(db_app, 'theirs', 'them')  # another worker: nobody add()s it here
+    mine = save(db_app, 'mine', 'me')
+    index.add(mine['id'], mine['saved_at'], 'me')
+    assert len(index) == 0  # not the next id: left to the sync, to keep ids in order
+
+    index.sync(force=True)
+    assert indexed_ids(index) == [1, 2]
+
+
+def test_a_sync_after_an_add_indexes_nothing_twice(db_app, index):
+    saved = save(db_app, '7', 'me')
+    index.add(saved['id'], saved['saved_at'], 'me')
+    index.add(saved['id'], saved['saved_at'], 'me')
+    index.sync(force=True)
+    assert indexed_ids(index) == [1]
+
+
+def test_save_through_the_app_is_recallable_at_once(calculator, client):
+    index = calculator.recall_index
+    before = len(index)
+    response = client.post('/api/memory/save', json={'value': '1234', 'session_id': 'saver'})
+    assert response.status_code == 200
+    assert len(index) == before + 1
+    with calculator.app.app_context():
+        newest = db.session.query(db.func.max(GlobalMemory.id)).scalar()
+    assert index._ids[-1] == newest
+    assert index.sample_id('someone else') is not None
@@ -0,0 +1,77 @@
+"""RollupAccumulator: counts are written off the request thread, through the breaker."""
+import sqlite3
+import threading
+import time
+
+from breaker import CircuitBreaker
+from models import db, UsageRollup
+from rollups import RollupAccumulator
+
+
+def stored(app, key):
+    with app.app_context():
+        row = UsageRollup.query.filter_by(granularity='day', key=key).first()
+        return row.count if row else 0
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_record_never_writes_on_the_calling_thread(db_app, monkeypatch):
+    usage = RollupAccumulator(db_app, flush_interval=0.05)
+    writers = []
+    upsert = usage._upsert
+    monkeypatch.setattr(usage, '_upsert', lambda pending: (writers.append(threading.current_thread()),
+                                                           upsert(pending)))
+    for _ in range(3):
+        usage.record({'mode': 'gaslighting'})
+
+    assert wait_for(lambda: stored(db_app, 'gaslighting') == 3)
+    assert threading.current_thread() not in writers
+
+
+def test_a_full_buffer_wakes_the_flusher_early(db_app):
+    usage = RollupAccumulator(db_app, flush_interval=3600, max_pending=3)
+    usage.record({'mode': 'literal'})
+    usage.record({'mode': 'oversharer', 'easter_egg': 'nice'})  # 3 dimensions x 3 granularities
+    assert wait_for(lambda: stored(db_app, 'nice') == 1)
+
+
+def test_an_open_breaker_keeps_the_counts_for_later(db_app):
+    breaker = CircuitBreaker('stats', failure_threshold=1, reset_timeout=3600)
+    breaker._on_failure('test')
+    usage = RollupAccumulator(db_app, flush_interval=3600, breaker=breaker)
+    usage.record({'mode': 'maintenance'})
+    usage.flush()
+    assert stored(db_app, 'maintenance') == 0
+    assert breaker.short_circuited == 1
+
+    breaker._on_success()
+    usage.flush()
+    assert stored(db_app, 'maintenance') == 1
+
+
+def test_a_locked_database_costs_the_flush_its_timeout(db_app):
+    with db_app.app_context():
+        path = db.engine.url.database
+    reader = sqlite3.connect(path, isolation_level=None)
+    reader.execute('BEGIN')
+    reader.execute('SELECT * FROM global_stats').fetchall()
+
+    usage = RollupAccumulator(db_app, flush_interval=3600, timeout=0.2)
+    usage.record({'mode': 'union_strike'})
+    started = time.monotonic()
+    usage.flush()
+    assert time.monotonic() - started < 1.5
+    reader.execute('ROLLBACK')
+    reader.close()
+
+    usage.flush()  # the counts were kept, not lost
+    assert stored(db_app, 'union_strike') == 1
+
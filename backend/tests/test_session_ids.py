@@ -0,0 +1,65 @@
+"""session_id comes straight from the client: anything but a short string means no session."""
+import json
+
+import pytest
+
+ODD_SESSION_IDS = [['x'], {'a': 1}, 123, 4.5, True, '', 'x' * 51]
+
+
+@pytest.mark.parametrize('session_id', ODD_SESSION_IDS)
+def test_calculate_with_an_odd_session_id(calculator, client, session_id):
+    response = client.post('/api/calculate', json={'expression': '6*7', 'session_id': session_id},
+                           headers={'X-Replay-Seed': '1'})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['mode'] != 'chaos_error', payload
+    assert payload['actual_result'] == 42
+
+
+@pytest.mark.parametrize('session_id', ODD_SESSION_IDS)
+def test_odd_session_ids_are_not_tracked(calculator, client, session_id):
+    sessions, ranked = len(calculator.sessions), len(calculator.leaderboard)
+    for seed in range(5):
+        client.post('/api/calculate', json={'expression': '1+2', 'session_id': session_id},
+                    headers={'X-Replay-Seed': str(seed)})
+    assert len(calculator.sessions) == sessions
+    assert len(calculator.leaderboard) == ranked
+
+
+def test_a_string_session_id_is_tracked(calculator, client):
+    client.post('/api/calculate', json={'expression': '7+7', 'session_id': 'session_tracked'},
+                headers={'X-Replay-Seed': '1'})
+    assert calculator.sessions.get('session_tracked')['calculations'] == 1
+    assert calculator.leaderboard.rank('session_tracked')['calculations'] == 1
+
+
+@pytest.mark.parametrize('session_id', ODD_SESSION_IDS)
+def test_partial_and_memory_with_an_odd_session_id(client, session_id):
+    response = client.post('/api/calculate/partial', json={'expression': '2+3', 'session_id': session_id})
+    assert response.status_code == 200
+    assert response.get_json()['partial_result'] == 5
+
+    response = client.post('/api/memory/save', json={'value': '5', 'session_id': session_id})
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+
+
+@pytest.mark.parametrize('session_id', ODD_SESSION_IDS)
+def test_websocket_frame_with_an_odd_session_id(calculator, session_id):
+    with calculator.app.app_context():
+        frame = json.loads(calculator.socket_frame(
+            json.dumps({'id': 1, 'expression': '6*7', 'session_id': session_id}), '127.0.0.1'))
+    assert frame['status'] == 200
+    assert frame['payload']['mode'] != 'chaos_error'
+
+
+@pytest.mark.parametrize('session_id', ['', 'x' * 51])
+def test_query_string_session_ids_are_cleaned(calculator, client, monkeypatch, session_id):
+    seen = []
+    recall = calculator.storage.memory_recall
+    monkeypatch.setattr(calculator.storage, 'memory_recall', lambda sid=None: (seen.append(sid), recall(sid))[1])
+    monkeypatch.setattr(calculator.leaderboard, 'rank', lambda sid: seen.append(sid))
+    client.get('/api/memory/recall', query_string={'session_id': session_id, 'weighting': 'uniform'})
+    response = client.get('/api/leaderboard/rank', query_string={'session_id': session_id})
+    assert response.get_json()['rank'] is None
+    assert seen == [None]  # recalled as nobody, and never looked up on the leaderboard
@@ -0,0 +1,128 @@
+"""SharedMemoryStorage: counts show up exactly once, before and after flushes."""
+import os
+import tempfile
+import threading
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, GlobalStats, SharedCounterFlush
+from shm_counters import SharedMemoryStorage
+
+
+@pytest.fixture
+def segment_name():
+    name = f'test_calc_{uuid.uuid4().hex[:12]}'
+    yield name
+    for storage in _opened:
+        storage.counters.close()
+    _opened.clear()
+    try:
+        shared_memory.SharedMemory(name=name).unlink()
+    except FileNotFoundError:
+        pass
+    for suffix in ('.lock', '.flush.lock'):
+        try:
+            os.unlink(os.path.join(tempfile.gettempdir(), name + suffix))
+        except FileNotFoundError:
+            pass
+
+
+_opened = []
+
+
+def make_storage(app, name):
+    # A long interval: these tests flush by hand
+    storage = SharedMemoryStorage(app, segment_name=name, slots=4, flush_interval=3600)
+    _opened.append(storage)
+    return storage
+
+
+def db_counters(app):
+    with app.app_context():
+        return GlobalStats.query.first().to_dict()
+
+
+def test_counts_are_seen_once_before_and_after_a_flush(db_app, segment_name):
+    storage = make_storage(db_app, segment_name)
+    storage.incr_stats(sevens_pressed=2, calculations_performed=1, time_wasted=10)
+    storage.incr_stats(calculations_performed=1, time_wasted=5)
+    expected = {'sevens_pressed': 2, 'calculations_performed': 2, 'time_wasted': 15}
+
+    with db_app.app_context():
+        assert storage.get_stats() == expected
+    assert db_counters(db_app) == {'sevens_pressed': 0, 'calculations_performed': 0, 'time_wasted': 0}
+
+    storage.flush()
+    assert db_counters(db_app) == expected
+    with db_app.app_context():
+        assert storage.get_stats() == expected
+
+    storage.flush()  # nothing new: nothing added
+    assert db_counters(db_app) == expected
+
+
+def test_a_reader_right_after_the_commit_counts_once(db_app, segment_name):
+    storage = make_storage(db_app, segment_name)
+    storage.incr_stats(calculations_performed=3)
+    seen = []
+
+    def read_from_another_thread(session):
+        def read():
+            with db_app.app_context():
+                seen.append(storage.get_stats()['calculations_performed'])
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join()
+
+    event.listen(Session, 'after_commit', read_from_another_thread)
+    try:
+        storage.flush()
+    finally:
+        event.remove(Session, 'after_commit', read_from_another_thread)
+    assert seen == [3]
+
+
+def test_a_flush_repeated_by_another_process_adds_nothing(db_app, segment_name):
+    # E.g. the flusher committed and died before it could note that it had
+    storage = make_storage(db_app, segment_name)
+    storage.incr_stats(calculations_performed=3, time_wasted=30)
+    storage.flush()
+
+    successor = make_storage(db_app, segment_name)
+    successor.flush()
+    assert db_counters(db_app)['calculations_performed'] == 3
+
+    storage.incr_stats(calculations_performed=1)
+    successor.flush()
+    assert db_counters(db_app)['calculations_performed'] == 4
+    with db_app.app_context():
+        assert successor.get_stats()['calculations_performed'] == 4
+
+
+def test_the_marker_moves_with_the_counters(db_app, segment_name):
+    storage = make_storage(db_app, segment_name)
+    storage.incr_stats(sevens_pressed=1, calculations_performed=1, time_wasted=7)
+    storage.flush()
+    with db_app.app_context():
+        marker = db.session.get(SharedCounterFlush, storage.counters.segment_id)
+        assert (marker.sevens_pressed, marker.calculations_performed, marker.time_wasted) == (1, 1, 7)
+
+
+def test_a_new_segment_starts_from_zero(db_app, segment_name):
+    storage = make_storage(db_app, segment_name)
+    storage.incr_stats(calculations_performed=5)
+    storage.flush()
+    shared_memory.SharedMemory(name=segment_name).unlink()
+
+    # Same name, new segment (say, after a reboot): its own id, its own marker
+    fresh = make_storage(db_app, segment_name)
+    assert fresh.counters.segment_id != storage.counters.segment_id
+    fresh.incr_stats(calculations_performed=2)
+    with db_app.app_context():
+        assert fresh.get_stats()['calculations_performed'] == 7
+    fresh.flush()
+    assert db_counters(db_app)['calculations_performed'] == 7
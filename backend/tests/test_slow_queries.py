@@ -0,0 +1,47 @@
+"""SlowQueryLog: which plans count as reading a whole table."""
+import pytest
+from sqlalchemy import create_engine, text
+
+from slow_queries import SlowQueryLog, is_full_scan
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE quotes (id INTEGER PRIMARY KEY, author TEXT, text TEXT)'))
+        conn.execute(text('CREATE INDEX ix_quotes_author ON quotes (author)'))
+    yield engine
+    engine.dispose()
+
+
+def flagged(engine, statement):
+    log = SlowQueryLog(threshold_ms=60000)
+    log.instrument(engine)
+    with engine.connect() as conn:
+        for _ in range(2):
+            conn.execute(text(statement), {'n': 1}).fetchall()
+    return [e for e in log.entries() if e['reason'] == 'full_scan']
+
+
+@pytest.mark.parametrize('statement, full_scan', [
+    ('SELECT * FROM quotes', True),
+    ('SELECT * FROM quotes WHERE text = :n', True),
+    ('SELECT * FROM quotes ORDER BY random() LIMIT :n', True),  # sorts every row first
+    ('SELECT author, count(*) FROM quotes GROUP BY text LIMIT :n', True),
+    ('SELECT * FROM quotes WHERE id IN (SELECT id FROM quotes WHERE text = :n LIMIT 5)', True),
+    ('SELECT * FROM quotes LIMIT :n', False),  # e.g. Query.first()
+    ('SELECT * FROM quotes LIMIT :n OFFSET 3', False),
+    ('SELECT * FROM quotes ORDER BY id LIMIT :n', False),  # walks the primary key
+    ('SELECT * FROM quotes WHERE id = :n', False),
+    ('SELECT * FROM quotes WHERE author = :n', False),
+])
+def test_full_scans_are_flagged_once(engine, statement, full_scan):
+    assert len(flagged(engine, statement)) == (1 if full_scan else 0)
+
+
+def test_plans_without_a_statement():
+    assert is_full_scan(['SCAN quotes'])
+    assert not is_full_scan(['SEARCH quotes USING INTEGER PRIMARY KEY (rowid=?)'])
+    assert not is_full_scan(['SCAN quotes USING COVERING INDEX ix_quotes_author'])
+    assert not is_full_scan(None)
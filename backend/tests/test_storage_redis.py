@@ -0,0 +1,147 @@
+"""RespConnection and RedisStorage against the in-process fake server."""
+import json
+from datetime import datetime
+
+import pytest
+
+from fake_redis import FakeRedis
+from storage import RedisStorage, RespConnection, StorageError
+
+
+@pytest.fixture
+def server():
+    server = FakeRedis()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def storage(server):
+    connection = RespConnection.from_url(server.url, timeout=2.0)
+    yield RedisStorage(connection, prefix='test:')
+    connection.close()
+
+
+def test_incr_stats_is_one_pipelined_write(server, storage):
+    storage.incr_stats(sevens_pressed=2, calculations_performed=1, time_wasted=15)
+    storage.incr_stats(calculations_performed=1, time_wasted=5)
+
+    assert storage.get_stats() == {'sevens_pressed': 2, 'calculations_performed': 2, 'time_wasted': 20}
+    # Zero deltas aren't sent at all
+    assert [c for c in server.commands if c[0] == 'INCRBY'] == [
+        ['INCRBY', 'test:stats:sevens_pressed', '2'],
+        ['INCRBY', 'test:stats:calculations_performed', '1'],
+        ['INCRBY', 'test:stats:time_wasted', '15'],
+        ['INCRBY', 'test:stats:calculations_performed', '1'],
+        ['INCRBY', 'test:stats:time_wasted', '5'],
+    ]
+
+
+def test_get_stats_before_anything_was_counted(storage):
+    assert storage.get_stats() == {'sevens_pressed': 0, 'calculations_performed': 0, 'time_wasted': 0}
+
+
+def test_memory_void_round_trip(server, storage):
+    assert storage.memory_recall() is None
+    storage.memory_save('42', 'me')
+    storage.memory_save('42', 'me')  # the nonce keeps both
+    storage.memory_save('7', 'someone else')
+
+    assert storage.memory_count() == 3
+    assert server.commands[-1] == ['SCARD', 'test:void']
+    for _ in range(20):
+        memory = storage.memory_recall('me')
+        assert memory['value'] == '7'  # never our own while there's a stranger's
+    entries = [json.loads(raw) for raw in server.dbs[0]['test:void']]
+    assert sorted(e['v'] for e in entries) == ['42', '42', '7']
+
+
+def test_recall_samples_with_srandmember(server, storage):
+    storage.memory_save('1', 'a')
+    storage.memory_recall('b')
+    assert server.commands[-1] == ['SRANDMEMBER', 'test:void', '8']
+
+
+def test_memory_ids_like_sqlite(storage):
+    first = storage.memory_save('42', 'me')
+    second = storage.memory_save('7')
+    assert (first['id'], second['id']) == (1, 2)
+    assert isinstance(first['saved_at'], datetime)
+    assert storage.memory_get(2) == {'value': '7', 'saved_at': second['saved_at']}
+    assert storage.memory_get(3) is None
+
+
+def test_export_pages_in_id_order(server, storage):
+    saved = [storage.memory_save(str(n)) for n in range(7)]
+    # A value from before the void had ids: recallable, not exportable
+    server.dbs[0]['test:void'].add(json.dumps({'v': 'old', 's': None, 't': '2020-01-01T00:00:00'}))
+
+    pages = list(storage.memory_export(page_size=3))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [(i, v) for page in pages for i, v, _ in page] == [(n + 1, str(n)) for n in range(7)]
+    assert [i for page in storage.memory_export(since_id=5) for i, _, _ in page] == [6, 7]
+    since = saved[4]['saved_at']
+    assert [v for page in storage.memory_export(since=since) for _, v, _ in page] == ['4', '5', '6']
+
+
+def test_the_app_exports_a_redis_void(calculator, client, storage, monkeypatch):
+    monkeypatch.setattr(calculator, 'storage', storage)
+    monkeypatch.setattr(calculator, 'recall_index', None)
+    assert client.post('/api/memory/save', json={'value': 42, 'session_id': 'me'}).status_code == 200
+    response = client.get('/api/memory/export')
+    assert response.status_code == 200
+    assert [json.loads(line)['value'] for line in response.get_data(as_text=True).splitlines()] == ['42']
+
+
+def test_reconnects_after_the_server_drops_the_connection(server, storage):
+    storage.incr_stats(calculations_performed=1)
+    assert server.connections == 1
+
+    server.drop_connections()
+    # The in-flight call fails (it may or may not have been applied)...
+    with pytest.raises(StorageError):
+        storage.get_stats()
+    # ...and the next one gets a fresh connection
+    assert storage.get_stats()['calculations_performed'] == 1
+    assert server.connections == 2
+
+
+def test_error_replies_raise_after_draining_the_pipeline(server, storage):
+    server.fail_next('WRONGTYPE Operation against a key holding the wrong kind of value')
+    with pytest.raises(StorageError, match='WRONGTYPE'):
+        storage.incr_stats(sevens_pressed=1, calculations_performed=1, time_wasted=1)
+
+    # The replies after the error were read, so the connection is still in step
+    assert storage.get_stats() == {'sevens_pressed': 0, 'calculations_performed': 1, 'time_wasted': 1}
+    assert server.connections == 1
+
+
+def test_unknown_command_is_an_error(storage):
+    with pytest.raises(StorageError, match='unknown command'):
+        storage.conn.execute('FLUSHEVERYTHING')
+
+
+def test_auth_and_select_on_connect(server):
+    server.password = 'hunter2'
+    connection = RespConnection.from_url(f'redis://:hunter2@127.0.0.1:{server.port}/3')
+    try:
+        RedisStorage(connection).incr_stats(calculations_performed=4)
+    finally:
+        connection.close()
+    assert server.commands[:2] == [['AUTH', 'hunter2'], ['SELECT', '3']]
+    assert server.dbs[3]['calc:stats:calculations_performed'] == 4
+
+
+def test_wrong_password(server):
+    server.password = 'hunter2'
+    connection = RespConnection.from_url(f'redis://:nope@127.0.0.1:{server.port}/0')
+    with pytest.raises(StorageError, match='WRONGPASS'):
+        connection.execute('SCARD', 'x')
+
+
+def test_unreachable_server(server):
+    port = server.port
+    server.close()
+    connection = RespConnection('127.0.0.1', port, timeout=0.5)
+    with pytest.raises(StorageError):
+        connection.execute('SCARD', 'x')
@@ -0,0 +1,53 @@
+"""FileExporter: every process rotates a file of its own."""
+import json
+import os
+
+import pytest
+
+from tracing import FileExporter, Tracer
+
+
+def trace_names(path):
+    with open(path) as f:
+        batches = [json.loads(line) for line in f]
+    return [span['name'] for batch in batches
+            for resource in batch['resourceSpans']
+            for scope in resource['scopeSpans']
+            for span in scope['spans']]
+
+
+def export_one(exporter, name):
+    with Tracer(exporter, sample_rate=1.0).trace(name):
+        pass
+    exporter.shutdown()
+
+
+def test_one_process_writes_the_configured_path(tmp_path):
+    exporter = FileExporter(str(tmp_path / 'traces.jsonl'), flush_interval=0.01)
+    export_one(exporter, 'single')
+    assert exporter.path == str(tmp_path / 'traces.jsonl')
+    assert trace_names(exporter.path) == ['single']
+
+
+def test_per_process_puts_the_pid_in_the_name(tmp_path):
+    exporter = FileExporter(str(tmp_path / 'traces.jsonl'), flush_interval=0.01, per_process=True)
+    export_one(exporter, 'spawned')
+    assert exporter.path == str(tmp_path / f'traces.{os.getpid()}.jsonl')
+    assert trace_names(exporter.path) == ['spawned']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+def test_a_forked_worker_writes_its_own_file(tmp_path):
+    exporter = FileExporter(str(tmp_path / 'traces.jsonl'), flush_interval=0.01)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            export_one(exporter, 'worker')
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert trace_names(tmp_path / f'traces.{pid}.jsonl') == ['worker']
+    export_one(exporter, 'master')
+    assert trace_names(tmp_path / 'traces.jsonl') == ['master']
+    assert set(os.listdir(tmp_path)) == {'traces.jsonl', f'traces.{pid}.jsonl'}
@@ -0,0 +1,52 @@
+"""UniqueVisitors: sketches are merged off the request thread, through the breaker."""
+import threading
+import time
+
+from breaker import CircuitBreaker
+from models import StatsSketch
+from sketches import HyperLogLog
+from visitors import ALL_TIME, SKETCH_NAME, UniqueVisitors
+
+
+def stored(app):
+    with app.app_context():
+        row = StatsSketch.query.filter_by(name=SKETCH_NAME, period=ALL_TIME).first()
+        return HyperLogLog.from_bytes(row.data).count() if row else 0
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_add_never_writes_on_the_calling_thread(db_app, monkeypatch):
+    visitors = UniqueVisitors(db_app, flush_interval=0.05)
+    writers = []
+    merge = visitors._merge
+    monkeypatch.setattr(visitors, '_merge', lambda snapshot: (writers.append(threading.current_thread()),
+                                                              merge(snapshot))[1])
+    for n in range(20):
+        visitors.add(f'human-{n}')
+        time.sleep(0.01)  # well past the interval: add() used to flush inline here
+
+    assert wait_for(lambda: stored(db_app) == 20)
+    assert writers and threading.current_thread() not in writers
+
+
+def test_an_open_breaker_keeps_the_visitors_for_later(db_app):
+    breaker = CircuitBreaker('stats', failure_threshold=1, reset_timeout=3600)
+    breaker._on_failure('test')
+    visitors = UniqueVisitors(db_app, flush_interval=3600, breaker=breaker)
+    visitors.add('patient')
+    visitors.flush()
+    assert stored(db_app) == 0
+    assert breaker.short_circuited == 1
+    assert visitors.count() == 1
+
+    breaker._on_success()
+    visitors.flush()
+    assert stored(db_app) == 1
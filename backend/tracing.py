@@ -0,0 +1,365 @@
+"""
+Per-request tracing, exported as OTLP JSON (the OpenTelemetry file exporter
+format: one ExportTraceServiceRequest per line) to a rotating local file.
+Point an OpenTelemetry collector's filelog/otlpjsonfile receiver at it, or
+just grep it.
+
+A request's spans are kept in memory until the request ends; then the whole
+trace is either dropped or handed to a background thread that writes them
+out in batches. Requests never wait on the disk.
+
+Which traces are kept:
+    - a random sample_rate of them (head sampling), and
+    - every trace slower than slow_ms (tail sampling), so the p999 request
+      you're chasing is always there even at a tiny sample rate.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+MAX_SPANS_PER_TRACE = 512
+MAX_ATTRIBUTE_LENGTH = 500
+
+_current = contextvars.ContextVar('calc_trace_span', default=None)
+
+
+class _NoopSpan:
+    """Stand-in when the request isn't being traced; costs one method call."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        return self
+
+    def finish(self, error=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ('trace_id', 'root', 'spans', 'sampled', 'dropped')
+
+    def __init__(self, trace_id, sampled):
+        self.trace_id = trace_id
+        self.root = None
+        self.spans = []
+        self.sampled = sampled
+        self.dropped = 0
+
+
+class Span:
+    """One timed operation. Use as a context manager, or call finish()."""
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'error', '_token')
+
+    def __init__(self, trace, span_id, parent_id, name, kind, attributes):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.error = None
+        self.end_ns = None
+        self._token = None
+        self.start_ns = time.time_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def finish(self, error=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f'{type(error).__name__}: {error}'
+        if len(self.trace.spans) < MAX_SPANS_PER_TRACE:
+            self.trace.spans.append(self)
+        else:
+            self.trace.dropped += 1
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.finish(exc)
+        return False
+
+
+class Tracer:
+    """
+    Creates spans under whatever span is current in this context. Without an
+    exporter every call returns NOOP_SPAN.
+    """
+
+    def __init__(self, exporter=None, sample_rate=0.01, slow_ms=250.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ns = int(slow_ms * 1e6) if slow_ms else None
+        self._random = random.Random()  # not the chaos rng: replays must not change
+        # Forked workers must not hand out each other's trace ids
+        os.register_at_fork(after_in_child=self._random.seed)
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def _id(self, bits):
+        return f'{self._random.getrandbits(bits):0{bits // 4}x}'
+
+    def start_trace(self, name, kind=SPAN_KIND_SERVER, **attributes):
+        """
+        Start the root span of a new trace and make it current. Returns
+        NOOP_SPAN if this trace can't possibly be kept. Pair with end_trace().
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        sampled = self._random.random() < self.sample_rate
+        if not sampled and self.slow_ns is None:
+            return NOOP_SPAN
+        trace = _Trace(self._id(128), sampled)
+        root = trace.root = Span(trace, self._id(64), None, name, kind, attributes)
+        root.__enter__()
+        return root
+
+    def end_trace(self, root, error=None):
+        """Finish the root span and export the trace if it's sampled or slow."""
+        if root is NOOP_SPAN:
+            return
+        try:
+            _current.reset(root._token)
+        except ValueError:
+            _current.set(None)  # ended from a different context than it started in
+        root.finish(error)
+        trace = root.trace
+        if trace.sampled or root.end_ns - root.start_ns >= self.slow_ns:
+            if trace.dropped:
+                root.attributes['trace.dropped_spans'] = trace.dropped
+            self.exporter.export(trace.spans)
+
+    def trace(self, name, kind=SPAN_KIND_SERVER, **attributes):
+        """start_trace()/end_trace() as a context manager."""
+        return _TraceScope(self, name, kind, attributes)
+
+    def span(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        """A child of the current span (a context manager), or NOOP_SPAN outside a trace."""
+        parent = _current.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(parent.trace, self._id(64), parent.span_id, name, kind, attributes)
+
+    def root(self):
+        """The current trace's root span (for tagging the whole request), or NOOP_SPAN."""
+        current = _current.get()
+        return current.trace.root if current is not None else NOOP_SPAN
+
+    def instrument_engine(self, engine):
+        """A client span per SQL statement executed inside a trace."""
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            span = self.span('db.query', kind=SPAN_KIND_CLIENT, **{
+                'db.system': engine.dialect.name,
+                'db.statement': statement[:MAX_ATTRIBUTE_LENGTH],
+            })
+            if span is not NOOP_SPAN:
+                if executemany:
+                    span.attributes['db.batch_size'] = len(parameters)
+                conn.info.setdefault('calc_trace_spans', []).append(span)
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            spans = conn.info.get('calc_trace_spans')
+            if spans:
+                span = spans.pop()
+                if cursor.rowcount is not None and cursor.rowcount >= 0:
+                    span.attributes['db.rows_affected'] = cursor.rowcount
+                span.finish()
+
+        @event.listens_for(engine, 'handle_error')
+        def _error(exception_context):
+            conn = exception_context.connection
+            spans = conn.info.get('calc_trace_spans') if conn is not None else None
+            if spans:
+                spans.pop().finish(exception_context.original_exception)
+
+
+class _TraceScope:
+    __slots__ = ('tracer', 'name', 'kind', 'attributes', 'root')
+
+    def __init__(self, tracer, name, kind, attributes):
+        self.tracer, self.name, self.kind, self.attributes = tracer, name, kind, attributes
+
+    def __enter__(self):
+        self.root = self.tracer.start_trace(self.name, self.kind, **self.attributes)
+        return self.root
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.end_trace(self.root, exc)
+        return False
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}  # int64 is a string in proto3 JSON
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)[:MAX_ATTRIBUTE_LENGTH]}
+
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)}
+            for key, value in attributes.items() if value is not None]
+
+
+def encode_otlp(spans, resource):
+    """An OTLP/JSON ExportTraceServiceRequest for a list of finished spans."""
+    encoded = []
+    for span in spans:
+        item = {
+            'traceId': span.trace.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': span.kind,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': _otlp_attributes(span.attributes),
+            'status': {'code': STATUS_ERROR, 'message': span.error} if span.error else {},
+        }
+        if span.parent_id:
+            item['parentSpanId'] = span.parent_id
+        encoded.append(item)
+    return {'resourceSpans': [{
+        'resource': {'attributes': _otlp_attributes(resource)},
+        'scopeSpans': [{'scope': {'name': 'fked-calculator'}, 'spans': encoded}],
+    }]}
+
+
+class FileExporter:
+    """
+    Background batch writer. export() never blocks: when the queue is full
+    (the disk can't keep up) traces are dropped and counted instead.
+
+    Rotation renames the file, so two processes must never rotate the same
+    one: a forked worker writes to its own "<name>.<pid><ext>" instead, and
+    per_process=True does that from the start (for servers whose workers
+    import the app themselves rather than being forked from a loaded master).
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5, batch_size=512,
+                 flush_interval=2.0, queue_size=10000, resource=None, per_process=False):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.resource = resource or {'service.name': 'fked-calculator'}
+        self.dropped = 0
+        self.exported = 0
+        self._queue_size = queue_size
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._handler = self._open(per_process)
+        self._start()
+        atexit.register(self.shutdown)
+
+    @property
+    def path(self):
+        return self._handler.baseFilename
+
+    def _open(self, per_process):
+        path = self._path
+        if per_process:
+            root, ext = os.path.splitext(path)
+            path = f'{root}.{os.getpid()}{ext}'
+        return RotatingFileHandler(path, maxBytes=self._max_bytes, backupCount=self._backups,
+                                   encoding='utf-8', delay=True)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self._queue_size)
+        self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, spans):
+        # Threads don't survive fork(): a preforked worker starts its own writer,
+        # on its own file (every write was flushed, so closing our copy loses nothing)
+        if self._pid != os.getpid():
+            self._handler.close()
+            self._handler = self._open(per_process=True)
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            batch = list(spans)
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    more = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                batch.extend(more)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, spans):
+        try:
+            line = json.dumps(encode_otlp(spans, self.resource), separators=(',', ':'))
+            self._handler.emit(logging.makeLogRecord({'msg': line}))
+            self._handler.flush()
+            self.exported += len(spans)
+        except Exception as e:
+            print(f'Trace export error: {e}')
+
+    def shutdown(self, timeout=5.0):
+        """Write out whatever is queued (called at exit)."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+        self._handler.close()
+
+    def stats(self):
+        return {'exported_spans': self.exported, 'dropped_traces': self.dropped,
+                'queued_traces': self._queue.qsize()}
@@ -0,0 +1,69 @@
+"""
+"Most popular calculations right now".
+
+Expressions are normalized and counted in a count-min sketch, with a small
+heavy-hitters heap on top. Every window the whole thing is decayed, so
+yesterday's favourite fades and memory stays fixed however wild the input.
+"""
+import re
+import threading
+import time
+
+from sketches import CountMinSketch, HeavyHitters
+
+MAX_EXPRESSION_LENGTH = 100
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_expression(expression):
+    """'2 × 3 ' and '2*3' are the same calculation. None if not worth tracking."""
+    if not isinstance(expression, str):
+        return None
+    normalized = _WHITESPACE.sub('', expression).lower()
+    normalized = normalized.replace('×', '*').replace('÷', '/')
+    if not normalized or len(normalized) > MAX_EXPRESSION_LENGTH:
+        return None
+    return normalized
+
+
+class TrendingExpressions:
+    """
+    Decayed popularity of expressions. With the default half-life of one
+    window, a score is roughly "uses in the last couple of windows".
+    """
+
+    def __init__(self, top_k=50, window_seconds=300.0, decay_factor=0.5):
+        self.top_k = top_k
+        self.window_seconds = window_seconds
+        self.decay_factor = decay_factor
+        self._lock = threading.Lock()
+        self._sketch = CountMinSketch()
+        self._hitters = HeavyHitters(top_k)
+        self._window_started = time.monotonic()
+        self.seen = 0
+
+    def _maybe_decay(self):
+        elapsed = time.monotonic() - self._window_started
+        if elapsed < self.window_seconds:
+            return
+        windows = int(elapsed // self.window_seconds)
+        factor = self.decay_factor ** windows
+        self._sketch.decay(factor)
+        self._hitters.decay(factor)
+        self._window_started += windows * self.window_seconds
+
+    def add(self, expression):
+        normalized = normalize_expression(expression)
+        if normalized is None:
+            return
+        with self._lock:
+            self._maybe_decay()
+            estimate = self._sketch.add(normalized)
+            self._hitters.offer(normalized, estimate)
+            self.seen += 1
+
+    def top(self, limit=10):
+        with self._lock:
+            self._maybe_decay()
+            return [{'expression': expr, 'score': round(score, 2)}
+                    for expr, score in self._hitters.top(limit)]
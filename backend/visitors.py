@@ -0,0 +1,141 @@
+"""
+"Unique humans who wasted time here" - a HyperLogLog of session ids.
+
+Every worker keeps its own sketches (all-time and one per UTC day) and a
+background thread periodically merges them into the stats_sketches rows. Merging is a
+register-wise max, so it is idempotent: local sketches are never reset, and a
+merge lost to a concurrent writer is simply healed by the next flush.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from breaker import db_deadline
+from models import db, StatsSketch
+from sketches import HyperLogLog
+
+SKETCH_NAME = 'unique_sessions'
+ALL_TIME = 'all'
+
+
+class UniqueVisitors:
+    """
+    O(1) per request, a few KB of memory, however many sessions show up.
+    Requests never touch the database: merges go through `breaker` (if given)
+    with `timeout` seconds to get their write in.
+    """
+
+    def __init__(self, app, flush_interval=60.0, keep_local_days=2, breaker=None, timeout=None):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.keep_local_days = keep_local_days
+        self.breaker = breaker
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = {ALL_TIME: HyperLogLog()}  # period -> this worker's sketch
+        self._view = HyperLogLog()  # persisted all-time sketch + ours, for count()
+        self._flusher_pid = None
+
+    def load(self):
+        """Start the all-time view from what's already persisted."""
+        with self.app.app_context():
+            row = StatsSketch.query.filter_by(name=SKETCH_NAME, period=ALL_TIME).first()
+        if row:
+            with self._lock:
+                self._view.merge(HyperLogLog.from_bytes(row.data))
+
+    def add(self, session_key, now=None):
+        day = (now or datetime.utcnow()).strftime('%Y-%m-%d')
+        self._ensure_flusher()
+        with self._lock:
+            self._local[ALL_TIME].add(session_key)
+            self._local.setdefault(day, HyperLogLog()).add(session_key)
+            self._view.add(session_key)
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork(), so every worker checks for its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._flush_loop, name='visitor-sketch-flusher', daemon=True)
+            thread.start()
+            self._flusher_pid = os.getpid()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def count(self):
+        """Estimated number of distinct sessions, ever."""
+        with self._lock:
+            return self._view.count()
+
+    def flush(self):
+        """Merge this worker's sketches into the persisted ones. Safe to call from any thread."""
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                snapshot = {period: sketch.copy() for period, sketch in self._local.items()}
+            try:
+                if self.breaker is not None:
+                    merged_all = self.breaker.call(lambda: self._merge(snapshot))
+                else:
+                    merged_all = self._merge(snapshot)
+            except Exception as e:
+                # Nothing to put back: the local sketches are never reset
+                print(f'Unique visitor sketch flush error: {e}')
+                return
+
+            oldest_kept = (datetime.utcnow() - timedelta(days=self.keep_local_days)).strftime('%Y-%m-%d')
+            with self._lock:
+                # Pick up other workers' visitors, without losing any added meanwhile
+                self._view = merged_all.merge(self._local[ALL_TIME])
+                for period in [p for p in self._local if p != ALL_TIME and p < oldest_kept]:
+                    del self._local[period]
+        finally:
+            self._flush_lock.release()
+
+    def _merge(self, snapshot):
+        """Max the snapshot into the persisted rows; returns the merged all-time sketch."""
+        merged_all = None
+        with self.app.app_context():
+            try:
+                with db_deadline(self.timeout, commit=True):
+                    for period, sketch in snapshot.items():
+                        row = StatsSketch.query.filter_by(name=SKETCH_NAME, period=period).first()
+                        if row:
+                            sketch.merge(HyperLogLog.from_bytes(row.data))
+                            row.data = sketch.to_bytes()
+                        else:
+                            db.session.add(StatsSketch(name=SKETCH_NAME, period=period,
+                                                       data=sketch.to_bytes()))
+                        if period == ALL_TIME:
+                            merged_all = sketch
+            except Exception:
+                db.session.rollback()
+                raise
+        return merged_all
+
+    def count_range(self, since, until):
+        """Distinct sessions seen between two UTC dates (inclusive), by merging daily sketches."""
+        since_key, until_key = since.strftime('%Y-%m-%d'), until.strftime('%Y-%m-%d')
+        merged = HyperLogLog()
+        rows = StatsSketch.query.filter(
+            StatsSketch.name == SKETCH_NAME,
+            StatsSketch.period != ALL_TIME,
+            StatsSketch.period >= since_key,
+            StatsSketch.period <= until_key
+        ).all()
+        for row in rows:
+            merged.merge(HyperLogLog.from_bytes(row.data))
+        with self._lock:
+            for period, sketch in self._local.items():
+                if period != ALL_TIME and since_key <= period <= until_key:
+                    merged.merge(sketch)
+        return merged.count()
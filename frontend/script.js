@@ -131,6 +131,7 @@ const statusMemory = document.getElementById('status-memory');
 
 function updateInputDisplay() {
     inputDisplay.textContent = currentExpression || '0';
+    schedulePartialPreview();
 }
 
 function updateOutputDisplay(text, author = '', mode = '') {
@@ -183,6 +184,131 @@ function clearOutput() {
     updateGapSection('Ready to calculate...');
 }
 
+// =============================================================================
+// CALCULATION CHANNEL (one WebSocket instead of a POST per "=")
+// =============================================================================
+
+const WS_URL = API_BASE_URL.replace(/^http/, 'ws') + '/ws';
+const WS_MAX_IN_FLIGHT = 16;            // frames sent but not yet answered
+const WS_MAX_BUFFERED_BYTES = 64 * 1024; // don't pile up more than this unsent
+const WS_RECONNECT_MAX_DELAY_MS = 60000;
+
+let calcSocket = null;
+let wsReconnectDelay = 2000;
+let nextFrameId = 1;
+const inFlightFrames = new Map();   // id -> {resolve, reject}
+const queuedFrames = [];            // waiting for room in the pipeline
+
+function connectCalcSocket() {
+    if (!('WebSocket' in window)) return;
+    
+    const socket = new WebSocket(WS_URL);
+    
+    socket.onopen = () => {
+        calcSocket = socket;
+        wsReconnectDelay = 2000;
+        drainQueuedFrames();
+    };
+    
+    socket.onmessage = (event) => {
+        let frame;
+        try {
+            frame = JSON.parse(event.data);
+        } catch (e) {
+            return;
+        }
+        const pending = inFlightFrames.get(frame.id);
+        if (!pending) return;
+        inFlightFrames.delete(frame.id);
+        pending.resolve({ ok: frame.status < 400, data: frame.payload });
+        drainQueuedFrames();
+    };
+    
+    socket.onclose = () => {
+        // No server support (or it went away): everything goes back to fetch()
+        calcSocket = null;
+        const orphans = [...inFlightFrames.values(), ...queuedFrames.splice(0)];
+        inFlightFrames.clear();
+        orphans.forEach(pending => pending.reject(new Error('socket closed')));
+        setTimeout(connectCalcSocket, wsReconnectDelay);
+        wsReconnectDelay = Math.min(wsReconnectDelay * 2, WS_RECONNECT_MAX_DELAY_MS);
+    };
+}
+
+function drainQueuedFrames() {
+    while (calcSocket && queuedFrames.length &&
+           inFlightFrames.size < WS_MAX_IN_FLIGHT &&
+           calcSocket.bufferedAmount < WS_MAX_BUFFERED_BYTES) {
+        const pending = queuedFrames.shift();
+        inFlightFrames.set(pending.frame.id, pending);
+        calcSocket.send(JSON.stringify(pending.frame));
+    }
+}
+
+function sendOverSocket(body) {
+    return new Promise((resolve, reject) => {
+        queuedFrames.push({ frame: { id: nextFrameId++, ...body }, resolve, reject });
+        drainQueuedFrames();
+    });
+}
+
+async function requestCalculation(body) {
+    if (calcSocket) {
+        try {
+            return await sendOverSocket(body);
+        } catch (e) {
+            // Channel dropped mid-flight; fall through to a plain request
+        }
+    }
+    const response = await fetch(`${API_BASE_URL}/calculate`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body)
+    });
+    return { ok: response.ok, data: await response.json() };
+}
+
+// Live preview while typing: every keystroke over the socket, debounced otherwise
+const PARTIAL_DEBOUNCE_MS = 300;
+let partialTimer = null;
+
+function schedulePartialPreview() {
+    clearTimeout(partialTimer);
+    if (!currentExpression || isCalculating || justCalculated) return;
+    if (calcSocket) {
+        requestPartialPreview(currentExpression);
+    } else {
+        partialTimer = setTimeout(() => requestPartialPreview(currentExpression), PARTIAL_DEBOUNCE_MS);
+    }
+}
+
+async function requestPartialPreview(expression) {
+    const body = { type: 'partial', expression, session_id: SESSION_ID };
+    try {
+        let data;
+        if (calcSocket) {
+            data = (await sendOverSocket(body)).data;
+        } else {
+            const response = await fetch(`${API_BASE_URL}/calculate/partial`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(body)
+            });
+            data = await response.json();
+        }
+        // Only show it if nothing happened in the meantime
+        if (expression === currentExpression && !isCalculating && !justCalculated && data.preview) {
+            updateGapSection(data.preview);
+        }
+    } catch (error) {
+        // A missing preview is not worth bothering anyone about
+    }
+}
+
 // =============================================================================
 // CALCULATION LOGIC
 // =============================================================================
@@ -211,19 +337,12 @@ async function calculate() {
     updateOutputDisplay('...');
     
     try {
-        const response = await fetch(`${API_BASE_URL}/calculate`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                expression: currentExpression
-            })
+        const { ok, data } = await requestCalculation({
+            expression: currentExpression,
+            session_id: SESSION_ID
         });
         
-        const data = await response.json();
-        
-        if (!response.ok) {
+        if (!ok) {
             handleErrorResponse(data);
             return;
         }
@@ -603,7 +722,7 @@ async function memoryRecall() {
     updateGapSection('Reaching into the void...', true);
     
     try {
-        const response = await fetch(`${API_BASE_URL}/memory/recall?session_id=${SESSION_ID}`);
+        const response = await fetch(`${API_BASE_URL}/memory/recall?session_id=${SESSION_ID}&weighting=recent`);
         const data = await response.json();
         
         if (data.success && data.value !== null) {
@@ -1433,6 +1552,9 @@ function init() {
     // Fetch initial stats for the Useless Leaderboard
     fetchStats();
     
+    // Persistent calculation channel (falls back to fetch if unavailable)
+    connectCalcSocket();
+    
     console.log('🧮 sioca - 911ab: The Useless Calculator initialized.');
     console.log('📦 Session ID:', SESSION_ID);
     console.log('🔗 Backend:', API_BASE_URL);
@@ -1459,10 +1581,12 @@ function updateStatsTicker(data) {
     const timeEl = document.getElementById('stat-time');
     const sevensEl = document.getElementById('stat-sevens');
     const calcsEl = document.getElementById('stat-calcs');
+    const humansEl = document.getElementById('stat-humans');
     
     if (timeEl) timeEl.textContent = data.time_wasted_formatted || '0 seconds';
     if (sevensEl) sevensEl.textContent = data.sevens_pressed?.toLocaleString() || '0';
     if (calcsEl) calcsEl.textContent = data.calculations_performed?.toLocaleString() || '0';
+    if (humansEl) humansEl.textContent = data.unique_humans?.toLocaleString() || '0';
 }
 
 // =============================================================================